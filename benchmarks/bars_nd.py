@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure the AST construction of a large BarsND grid.
+
+The grid is built once with ``BarsND._build_ast`` and once with the previous
+approach, a separate ``Bars1D`` shape per dataset. Both results must be
+identical.
+
+Usage::
+
+    python benchmarks/bars_nd.py [--datasets 100] [--length 1000]
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import argparse
+import random
+import timeit
+
+from tangible import ast
+from tangible.backends.openscad import OpenScadBackend
+from tangible.shapes.bars import Bars1D, BarsND
+
+
+def build_per_layer(shape):
+    """Build the AST of a BarsND shape with one Bars1D shape per dataset."""
+    layers = []
+    for i, dataset in enumerate(shape.data):
+        layer = Bars1D(dataset, shape.bar_width, shape.bar_depth)._build_ast()
+        if not shape.center_layers:
+            layer = layer.item
+        x_offset = (i % 2) * 0.1
+        layers.append(ast.Translate(x=x_offset, y=i * shape.bar_depth, z=0, item=layer))
+    y_offset = len(shape.data) / 2 * shape.bar_depth
+    return ast.Translate(x=0, y=-y_offset, z=0, item=ast.Union(items=layers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--datasets', type=int, default=100, help='number of datasets')
+    parser.add_argument('--length', type=int, default=1000, help='length of each dataset')
+    parser.add_argument('--number', type=int, default=5, help='number of runs')
+    args = parser.parse_args()
+
+    rand = random.Random(42)
+    data = [[rand.uniform(1, 100) for i in range(args.length)] for j in range(args.datasets)]
+    shape = BarsND(data, bar_width=1, bar_depth=1)
+
+    for center_layers in [False, True]:
+        shape.center_layers = center_layers
+        assert shape._build_ast() == build_per_layer(shape), 'Results differ'
+
+    row = '{:<24} {:>10.1f}ms'
+    print('{}x{} bars'.format(args.datasets, args.length))
+    for label, func in [
+        ('per layer (Bars1D)', lambda: build_per_layer(shape)),
+        ('BarsND._build_ast', shape._build_ast),
+        ('generate', lambda: OpenScadBackend(shape._build_ast()).generate()),
+    ]:
+        seconds = timeit.timeit(func, number=args.number) / args.number
+        print(row.format(label, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Measure the effect of balanced boolean operations on the render time.
+
+Every example shape is rendered twice, once as generated and once after
+``tangible.optimize.balance``. The command that renders a file is pluggable,
+``{input}`` is replaced by the path of the generated OpenSCAD file and
+``{output}`` by the path of the output file.
+
+Usage::
+
+    python benchmarks/csg_balance.py
+    python benchmarks/csg_balance.py --command "openscad --backend=manifold -o {output} {input}"
+    python benchmarks/csg_balance.py --dry-run
+
+With ``--dry-run``, nothing is rendered and only the estimated cost (see
+``tangible.analysis``) is reported.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import argparse
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+
+from tangible import analysis, optimize
+from tangible.backends.openscad import OpenScadBackend
+
+from output_modes import example_shapes
+
+
+DEFAULT_COMMAND = 'openscad -o {output} {input}'
+
+
+class CommandRunner(object):
+    """Render a file with an external command and measure the time."""
+
+    def __init__(self, template=DEFAULT_COMMAND, suffix='.stl'):
+        """
+        :param template: The command, ``{input}`` and ``{output}`` are replaced
+            by the file paths.
+        :type template: str
+        :param suffix: The suffix of the output file (default ``.stl``).
+        :type suffix: str
+
+        """
+        self.template = template
+        self.suffix = suffix
+
+    def __call__(self, path):
+        """Render the file and return the time in seconds."""
+        output = os.path.splitext(path)[0] + self.suffix
+        args = shlex.split(self.template.format(input=path, output=output))
+        with open(os.devnull, 'wb') as devnull:
+            start = time.time()
+            subprocess.check_call(args, stdout=devnull, stderr=devnull)
+            return time.time() - start
+
+
+class DryRunner(object):
+    """Don't render anything."""
+
+    def __call__(self, path):
+        return None
+
+
+def measure(runner, tree, directory, name, repeat=1):
+    """Write the tree to an OpenSCAD file and return the best render time."""
+    path = os.path.join(directory, name + '.scad')
+    with open(path, 'wb') as f:
+        OpenScadBackend(tree).write(f)
+    times = [runner(path) for i in range(repeat)]
+    return None if None in times else min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--command', default=DEFAULT_COMMAND,
+                        help='render command (default: %(default)r)')
+    parser.add_argument('--suffix', default='.stl', help='suffix of the output file')
+    parser.add_argument('--fanin', type=int, default=2, help='fan-in of the balanced trees')
+    parser.add_argument('--repeat', type=int, default=1, help='number of runs per file')
+    parser.add_argument('--dry-run', action='store_true', help='only report the estimated cost')
+    args = parser.parse_args()
+
+    runner = DryRunner() if args.dry_run else CommandRunner(args.command, args.suffix)
+    directory = tempfile.mkdtemp(prefix='tangible-benchmark-')
+    seconds = lambda value: '-' if value is None else '{:.2f}s'.format(value)
+
+    header = '{:<28} {:<9} {:>12} {:>10}'
+    row = '{:<28} {:<9} {:>12} {:>10}'
+    print(header.format('shape', 'tree', 'cost', 'time'))
+    try:
+        for name, shape in example_shapes():
+            original = shape._build_ast()
+            balanced = optimize.balance(original, args.fanin)
+            for label, tree in [('original', original), ('balanced', balanced)]:
+                cost = analysis.analyze(tree).cost
+                value = measure(runner, tree, directory, name + '-' + label, args.repeat)
+                print(row.format(name, label, cost, seconds(value)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare size and speed of the OpenSCAD output modes on the example shapes.
+
+Usage::
+
+    python benchmarks/output_modes.py
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import csv
+import io
+import os
+import timeit
+
+from tangible import scales
+from tangible.backends.openscad import OpenScadBackend
+from tangible.shapes.bars import Bars1D, BarsND
+from tangible.shapes.pie import AngleRadiusHeightPie3D
+from tangible.shapes.vertical import CircleTower1D, RhombusTower2D
+
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+
+def read_visits(filename):
+    with open(os.path.join(EXAMPLES, filename), 'r') as datafile:
+        return [(row['Day'], int(row['Visits'])) for row in csv.DictReader(datafile)]
+
+
+def example_shapes():
+    """Return the example shapes, built from the example datasets."""
+    september = [v for _, v in read_visits('analytics-sep-13.csv')]
+    scale = scales.linear([min(september), max(september)], [10, 50])
+    september = [scale(v) for v in september]
+
+    year = [[] for i in range(9)]
+    for day, visits in read_visits('analytics-full-13.csv'):
+        year[int(day.split('/', 1)[0]) - 1].append(visits)
+    flat = [v for month in year for v in month]
+    scale = scales.linear([min(flat), max(flat)], [10, 150])
+    year = [[scale(v) for v in month] for month in year]
+
+    return [
+        ('bars_1d', Bars1D(september, bar_width=10, bar_depth=10)),
+        ('barsnd', BarsND(year, bar_width=7, bar_depth=7)),
+        ('circle_tower_1d', CircleTower1D(september, layer_height=10)),
+        ('rhombus_tower_2d', RhombusTower2D([september, september[::-1]], layer_height=2)),
+        ('angle_radius_height_pie_3d',
+            AngleRadiusHeightPie3D([september[:12], september[:12], september[12:24]])),
+    ]
+
+
+MODES = [
+    ('default', {}),
+    ('precision=3', {'precision': 3}),
+    ('compact', {'compact': True}),
+    ('compact+precision=3', {'compact': True, 'precision': 3}),
+]
+
+
+def measure(shape, options, compression=None, number=5):
+    """Return the mean write time in milliseconds and the output size in
+    bytes."""
+    tree = shape._build_ast()
+
+    def run():
+        fileobj = io.BytesIO()
+        OpenScadBackend(tree, **options).write(fileobj, compression=compression)
+        return fileobj
+
+    size = len(run().getvalue())
+    seconds = timeit.timeit(run, number=number) / number
+    return seconds * 1000, size
+
+
+def main():
+    compressions = [None, 'gzip']
+    try:
+        import zstandard  # NOQA
+        compressions.append('zstd')
+    except ImportError:
+        pass
+
+    header = '{:<28} {:<22} {:<6} {:>10} {:>10}'
+    row = '{:<28} {:<22} {:<6} {:>8.2f}ms {:>10}'
+    print(header.format('shape', 'mode', 'comp.', 'time', 'bytes'))
+    for name, shape in example_shapes():
+        for mode, options in MODES:
+            for compression in compressions:
+                ms, size = measure(shape, options, compression)
+                print(row.format(name, mode, compression or '-', ms, size))
+
+
+if __name__ == '__main__':
+    main()
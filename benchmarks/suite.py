@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark all shapes at increasing data sizes.
+
+For every shape in ``tangible.shapes`` and every data size (the total number
+of datapoints), the AST build time, the OpenSCAD generation time, the number
+of AST nodes, the output size (including sidecar files) and the peak memory
+allocation are measured.
+The results are written to a JSON file named after the current commit, so
+that runs of different commits can be compared.
+
+Usage::
+
+    python benchmarks/suite.py [--sizes 10,100,1000] [--shapes Bars1D,BarsND]
+    python benchmarks/suite.py --compare benchmarks/results/abc1234.json
+
+Larger sizes of a shape are skipped once a single measurement takes longer
+than ``--max-seconds``.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import timeit
+
+from tangible import profiling
+from tangible.backends.openscad import OpenScadBackend
+from tangible.shapes import bars, pie, surface, vertical
+
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+
+
+def datasets(size, count, seed=0):
+    """Return ``count`` datasets of random values between 1 and 100 with
+    ``size`` datapoints in total."""
+    rng = random.Random(seed)
+    length = max(3, size // count)
+    return [[rng.uniform(1, 100) for i in range(length)] for j in range(count)]
+
+
+def grid(size):
+    """Return the number of rows of a grid with ``size`` cells."""
+    return max(2, int(size ** 0.5))
+
+
+# Factories that create a shape with the specified number of datapoints
+SHAPES = [
+    ('Bars1D', lambda n: bars.Bars1D(datasets(n, 1)[0], bar_width=1, bar_depth=1)),
+    ('BarsND', lambda n: bars.BarsND(datasets(n, grid(n)), bar_width=1, bar_depth=1)),
+    ('CircleTower1D', lambda n: vertical.CircleTower1D(datasets(n, 1)[0], layer_height=1)),
+    ('SquareTower1D', lambda n: vertical.SquareTower1D(datasets(n, 1)[0], layer_height=1)),
+    ('RectangleTower2D', lambda n: vertical.RectangleTower2D(datasets(n, 2), layer_height=1)),
+    ('RhombusTower2D', lambda n: vertical.RhombusTower2D(datasets(n, 2), layer_height=1)),
+    ('QuadrilateralTower4D',
+        lambda n: vertical.QuadrilateralTower4D(datasets(n, 4), layer_height=1)),
+    ('AnglePie1D', lambda n: pie.AnglePie1D(datasets(n, 1)[0])),
+    ('RadiusPie1D', lambda n: pie.RadiusPie1D(datasets(n, 1)[0])),
+    ('HeightPie1D', lambda n: pie.HeightPie1D(datasets(n, 1)[0])),
+    ('AngleRadiusPie2D', lambda n: pie.AngleRadiusPie2D(datasets(n, 2), height=2)),
+    ('AngleHeightPie2D', lambda n: pie.AngleHeightPie2D(datasets(n, 2))),
+    ('RadiusHeightPie2D', lambda n: pie.RadiusHeightPie2D(datasets(n, 2))),
+    ('AngleRadiusHeightPie3D', lambda n: pie.AngleRadiusHeightPie3D(datasets(n, 3))),
+    ('Surface2D', lambda n: surface.Surface2D(datasets(n, grid(n)))),
+]
+
+
+def measure(factory, size, repeat=3):
+    """Measure a shape with the specified number of datapoints.
+
+    The times are the best of ``repeat`` runs. The node count, output size
+    and peak memory are taken from a separate, profiled run, because memory
+    tracing slows down the code considerably.
+
+    """
+    shape = factory(size)
+    build = min(timeit.repeat(shape._build_ast, number=1, repeat=repeat))
+    backend = OpenScadBackend(shape._build_ast())
+    generate = min(timeit.repeat(backend.generate, number=1, repeat=repeat))
+    sidecar_bytes = sum(len(content) for content in backend.sidecars.values())
+    del backend
+    directory = tempfile.mkdtemp()
+    try:
+        with profiling.profile(memory=True) as p:
+            shape.save(os.path.join(directory, 'shape.scad'), OpenScadBackend)
+    finally:
+        shutil.rmtree(directory)
+    return {
+        'build_seconds': build,
+        'generate_seconds': generate,
+        'nodes': sum(p.node_counts.values()),
+        'output_bytes': p.output_bytes,
+        'sidecar_bytes': sidecar_bytes,
+        'peak_memory': p.peak_memory,
+    }
+
+
+def commit():
+    """Return the short hash of the current commit, or ``None``."""
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                         stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('ascii').strip()
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """Print the ratio of the results to a baseline and return the number of
+    regressions (ratios above the threshold). Times below ``min_seconds`` are
+    too noisy and never count as regression."""
+    previous = dict(((r['shape'], r['size']), r) for r in baseline['results'])
+    keys = ['build_seconds', 'generate_seconds', 'output_bytes', 'peak_memory']
+    regressions = 0
+    print()
+    print('Compared to {}:'.format(baseline.get('commit')))
+    print('{:<24} {:>8} {:>9} {:>9} {:>9} {:>9}'.format(
+        'shape', 'size', 'build', 'generate', 'bytes', 'memory'))
+    for result in results:
+        old = previous.get((result['shape'], result['size']))
+        if old is None:
+            continue
+        ratios = []
+        for key in keys:
+            ratio = result[key] / old[key] if old[key] else 1
+            regression = ratio > threshold
+            if key.endswith('_seconds') and max(result[key], old[key]) < min_seconds:
+                regression = False
+            regressions += regression
+            ratios.append('{:>8.2f}{}'.format(ratio, '!' if regression else ' '))
+        print('{:<24} {:>8} {}'.format(result['shape'], result['size'], ' '.join(ratios)))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma separated data sizes.')
+    parser.add_argument('--shapes', default=None, help='Comma separated shape names.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement.')
+    parser.add_argument('--max-seconds', type=float, default=30,
+                        help='Skip larger sizes of a shape if a run takes longer.')
+    parser.add_argument('--output', default=None,
+                        help='The JSON result file (default: results/<commit>.json).')
+    parser.add_argument('--compare', default=None, help='A JSON result file to compare with.')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Ratio above which a result counts as regression.')
+    parser.add_argument('--min-seconds', type=float, default=0.01,
+                        help='Shorter times never count as regression.')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    names = args.shapes.split(',') if args.shapes else [name for name, _ in SHAPES]
+    factories = dict(SHAPES)
+    unknown = set(names) - set(factories)
+    if unknown:
+        parser.error('Unknown shapes: {}'.format(', '.join(sorted(unknown))))
+
+    header = '{:<24} {:>8} {:>10} {:>10} {:>9} {:>12} {:>12}'
+    row = '{:<24} {:>8} {:>9.3f}s {:>9.3f}s {:>9} {:>12} {:>12}'
+    print(header.format('shape', 'size', 'build', 'generate', 'nodes', 'bytes', 'memory'))
+    results = []
+    for name in names:
+        for size in sizes:
+            result = measure(factories[name], size, args.repeat)
+            result.update(shape=name, size=size)
+            results.append(result)
+            print(row.format(name, size, result['build_seconds'], result['generate_seconds'],
+                             result['nodes'], result['output_bytes'] + result['sidecar_bytes'],
+                             result['peak_memory']))
+            if result['build_seconds'] + result['generate_seconds'] > args.max_seconds:
+                break
+
+    report = {
+        'commit': commit(),
+        'date': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS, '{}.json'.format(report['commit'] or 'local'))
+    if not os.path.isdir(os.path.dirname(os.path.abspath(output))):
+        os.makedirs(os.path.dirname(os.path.abspath(output)))
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print()
+    print('Results written to {}'.format(output))
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold, args.min_seconds):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
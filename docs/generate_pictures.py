@@ -1,26 +1,46 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+"""
+Generate the pictures of the shapes in the documentation.
+
+The OpenSCAD code of every example is generated in-process. Pictures whose
+code (and render command) didn't change since the last run are skipped, the
+remaining ones are rendered in parallel worker processes.
+
+Usage::
+
+    python generate_pictures.py [-v] [--force] [--jobs N] [--command CMD]
+
+In the render command, ``{input}`` is replaced by the path of the OpenSCAD
+file and ``{output}`` by the path of the picture.
+
+"""
 from __future__ import print_function, division, absolute_import, unicode_literals
 
+import argparse
+import hashlib
+import inspect
+import json
+import multiprocessing
 import os
 import re
-import inspect
+import runpy
+import shlex
+import shutil
 import subprocess
 import sys
+import tempfile
 
 from tangible import shapes
 
 
-# Get all shape classes
-pred = lambda c: inspect.isclass(c) and issubclass(c, shapes.base.Shape)
-vertical_classes = inspect.getmembers(shapes.vertical, pred)
-bars_classes = inspect.getmembers(shapes.bars, pred)
-pie_classes = inspect.getmembers(shapes.pie, pred)
-classes = vertical_classes + bars_classes + pie_classes
-
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXAMPLES = os.path.join(HERE, '..', 'examples')
+PICTURES = os.path.join(HERE, '_static', 'img', 'shapes')
+DEFAULT_COMMAND = 'openscad -o {output} --imgsize=400,260 {input}'
 
-# Get names of shape classes
-shape_names = [c[0] for c in classes]
+# File with the input hashes of the existing pictures
+HASHES = '.hashes.json'
 
 
 # Transform shape names
@@ -29,29 +49,127 @@ def convert(name):
     for i in range(4):
         s = re.sub('([^_])([A-Z][a-z]+)', r'\1_\2', s)
     return re.sub('([0-9]+)([A-Za-z]+)', r'_\1\2', s).lower()
-file_names = map(convert, shape_names)
 
 
-# Use -v parameter to output the cmds
-verbose = '-v' in sys.argv
+def example_names():
+    """Return the file names (without extension) of all shape classes."""
+    pred = lambda c: inspect.isclass(c) and issubclass(c, shapes.base.Shape)
+    classes = inspect.getmembers(shapes.vertical, pred) + \
+        inspect.getmembers(shapes.bars, pred) + \
+        inspect.getmembers(shapes.pie, pred)
+    return sorted(set(convert(c[0]) for c in classes))
 
 
-# Find and execute files
-for name in file_names:
-    print('Processing {}.py: '.format(name), end='')
-    cmds = [
-        'python ../examples/{0}.py > ../examples/{0}.scad',
-        'openscad -o _static/img/shapes/{0}.png --imgsize=400,260 ../examples/{0}.scad',
-        'rm ../examples/{0}.scad',
-    ]
-    if verbose:
-        print()
-        for cmd in cmds:
-            print('  %s' % cmd.format(name))
+def generate_code(name, examples=EXAMPLES):
+    """Run an example in-process and return the generated OpenSCAD code.
+
+    The examples print their code, stdout is suppressed while they run.
+
+    """
+    old_dir, old_stdout = os.getcwd(), sys.stdout
+    os.chdir(examples)
     try:
         with open(os.devnull, 'w') as devnull:
-            for cmd in cmds:
-                subprocess.check_call(cmd.format(name), shell=True, stderr=devnull)
-        print('OK')
-    except:
-        print('Failed')
+            sys.stdout = devnull
+            return runpy.run_path(name + '.py')['code']
+    finally:
+        sys.stdout = old_stdout
+        os.chdir(old_dir)
+
+
+def input_hash(code, command):
+    return hashlib.sha1((command + '\n' + code).encode('utf-8')).hexdigest()
+
+
+def render(job):
+    """Render a single picture in a worker process.
+
+    :param job: A ``(name, command, source, output)`` tuple.
+    :returns: A ``(name, error)`` tuple, ``error`` is ``None`` on success.
+
+    """
+    name, command, source, output = job
+    args = [arg.format(input=source, output=output) for arg in shlex.split(command)]
+    try:
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(args, stdout=devnull, stderr=devnull)
+    except (OSError, subprocess.CalledProcessError) as e:
+        return name, str(e)
+    return name, None
+
+
+def generate(names, pictures=PICTURES, examples=EXAMPLES, command=DEFAULT_COMMAND,
+             processes=None, force=False, log=print):
+    """Generate the pictures of the examples.
+
+    :returns: Dictionary mapping every name to ``'rendered'``, ``'skipped'``,
+        ``'missing'`` (no example) or ``'failed'``.
+
+    """
+    hash_path = os.path.join(pictures, HASHES)
+    hashes = {}
+    if os.path.exists(hash_path):
+        with open(hash_path, 'r') as f:
+            hashes = json.load(f)
+
+    status = {}
+    jobs = []
+    new_hashes = {}
+    directory = tempfile.mkdtemp()
+    try:
+        # Generate the code of all examples
+        for name in names:
+            if not os.path.exists(os.path.join(examples, name + '.py')):
+                status[name] = 'missing'
+                continue
+            code = generate_code(name, examples)
+            new_hashes[name] = input_hash(code, command)
+            output = os.path.join(pictures, name + '.png')
+            if not force and hashes.get(name) == new_hashes[name] and os.path.exists(output):
+                status[name] = 'skipped'
+                continue
+            path = os.path.join(directory, name + '.scad')
+            with open(path, 'w') as f:
+                f.write(code)
+            jobs.append((name, command, path, output))
+
+        # Render the changed pictures
+        if jobs:
+            pool = multiprocessing.Pool(processes)
+            try:
+                results = pool.map(render, jobs)
+            finally:
+                pool.close()
+                pool.join()
+            for name, error in results:
+                if error is None:
+                    status[name] = 'rendered'
+                    hashes[name] = new_hashes[name]
+                else:
+                    status[name] = 'failed'
+                    hashes.pop(name, None)
+                    log('{}: {}'.format(name, error))
+    finally:
+        shutil.rmtree(directory)
+
+    with open(hash_path, 'w') as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate the pictures of the shapes.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print the render errors.')
+    parser.add_argument('--force', action='store_true', help='Render all pictures.')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes.')
+    parser.add_argument('--command', default=DEFAULT_COMMAND, help='The render command.')
+    args = parser.parse_args()
+
+    log = print if args.verbose else (lambda message: None)
+    status = generate(example_names(), command=args.command, processes=args.jobs,
+                      force=args.force, log=log)
+    for name in sorted(status):
+        if status[name] != 'missing':
+            print('{}: {}'.format(name, status[name]))
+    if 'failed' in status.values():
+        sys.exit(1)
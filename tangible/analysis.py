@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis module.
+
+This module walks an AST and collects statistics that determine how expensive
+it is to render the model with a CAD tool. OpenSCAD evaluates 3D boolean
+operations with CGAL Nef polyhedra, which is by far the slowest part of the
+rendering process. The time needed grows with the number of facets that take
+part in each boolean operation.
+
+The estimated cost is given in abstract units (facets processed by CGAL). To
+convert it into a render time, time a few models on the target machine and
+use the ratio as ``seconds_per_unit``.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from collections import Counter
+from math import ceil, pi
+
+from . import ast
+
+
+# OpenSCAD defaults for the minimum fragment angle ($fa) and size ($fs)
+FRAGMENT_ANGLE = 12
+FRAGMENT_SIZE = 2
+
+
+def fragments(radius):
+    """Return the number of fragments OpenSCAD uses for a circle with the
+    specified radius, using the default ``$fa`` and ``$fs`` settings.
+
+    :param radius: The radius of the circle.
+    :type radius: int or float
+    :rtype: int
+
+    """
+    if radius < 1e-5:
+        return 3
+    return int(ceil(max(min(360 / FRAGMENT_ANGLE, radius * 2 * pi / FRAGMENT_SIZE), 5)))
+
+
+class Analysis(object):
+    """Result of :func:`analyze`.
+
+    :ivar node_counts: Number of nodes per AST type.
+    :ivar depth: Maximum nesting depth of the tree.
+    :ivar booleans: Number of 3D boolean operations.
+    :ivar max_fanin: Maximum number of children of a 3D boolean operation.
+    :ivar polyhedron_faces: Total number of faces in all polyhedra.
+    :ivar facets: Estimated number of facets of the resulting model.
+    :ivar cost: Estimated cost of the CGAL operations.
+
+    """
+    def __init__(self):
+        self.node_counts = Counter()
+        self.depth = 0
+        self.booleans = 0
+        self.max_fanin = 0
+        self.polyhedron_faces = 0
+        self.facets = 0
+        self.cost = 0
+
+    @property
+    def nodes(self):
+        """Total number of nodes."""
+        return sum(self.node_counts.values())
+
+    def estimated_seconds(self, seconds_per_unit):
+        """Convert the cost into a render time.
+
+        :param seconds_per_unit: The measured render time per cost unit.
+        :type seconds_per_unit: float
+        :rtype: float
+
+        """
+        return self.cost * seconds_per_unit
+
+    def as_dict(self):
+        """Return the analysis as a JSON serializable dictionary."""
+        return {
+            'nodes': self.nodes,
+            'node_counts': dict(self.node_counts),
+            'depth': self.depth,
+            'booleans': self.booleans,
+            'max_fanin': self.max_fanin,
+            'polyhedron_faces': self.polyhedron_faces,
+            'facets': self.facets,
+            'cost': self.cost,
+        }
+
+    def __repr__(self):
+        return '<Analysis: {} nodes, depth {}, {} booleans, cost {}>'.format(
+            self.nodes, self.depth, self.booleans, self.cost)
+
+
+def _outline_size(node):
+    """Return the estimated number of vertices of a 2D object."""
+    if isinstance(node, ast.CircleSector):
+        return int(ceil(fragments(node.radius) * node.angle / 360)) + 2
+    if isinstance(node, ast.Circle):
+        return fragments(node.radius)
+    if isinstance(node, ast.Rectangle):
+        return 4
+    if isinstance(node, ast.Polygon):
+        return len(node.points) - 1
+    if isinstance(node, (ast.Translate, ast.Rotate, ast.Scale, ast.Mirror)):
+        return _outline_size(node.item)
+    if isinstance(node, ast._BooleanOperation):
+        return sum(_outline_size(item) for item in node.items)
+    raise ValueError('Not a 2D object: {}'.format(node.__class__.__name__))
+
+
+def _walk(node, analysis, depth):
+    """Update the analysis with the statistics of the node and its children.
+
+    :returns: The estimated number of facets of the node.
+
+    """
+    box = node.bounds()
+    if box.zmin == box.zmax:
+        # 2D objects are processed with a polygon clipper, not CGAL. They are
+        # counted, but don't add to the cost.
+        _count_2d(node, analysis, depth)
+        return 0
+
+    analysis.node_counts[node.__class__.__name__] += 1
+    analysis.depth = max(analysis.depth, depth)
+
+    if isinstance(node, ast.Cube):
+        return 6
+    if isinstance(node, ast.Sphere):
+        n = fragments(node.radius)
+        return n * ((n + 1) // 2)
+    if isinstance(node, ast.Cylinder):
+        return fragments(max(node.radius1, node.radius2)) + 2
+    if isinstance(node, ast.Polyhedron):
+        faces = len(node.triangles) + len(node.quads)
+        analysis.polyhedron_faces += faces
+        return faces
+    if isinstance(node, ast.Surface):
+        rows, columns = len(node.heights), len(node.heights[0])
+        return 4 * (rows - 1) * (columns - 1) + 2 * (rows + columns - 2) + 1
+    if isinstance(node, (ast.Translate, ast.Rotate, ast.Scale, ast.Mirror)):
+        return _walk(node.item, analysis, depth + 1)
+    if isinstance(node, ast._BooleanOperation):
+        facets = [_walk(item, analysis, depth + 1) for item in node.items]
+        # OpenSCAD processes the children one after another, every operation
+        # involves the accumulated result and the next child.
+        analysis.booleans += 1
+        analysis.max_fanin = max(analysis.max_fanin, len(facets))
+        accumulated = facets[0]
+        for count in facets[1:]:
+            analysis.cost += accumulated + count
+            accumulated += count
+        return accumulated
+    if isinstance(node, ast.RotateExtrusion):
+        _count_2d(node.item, analysis, depth + 1)
+        box = node.item.bounds()
+        return _outline_size(node.item) * fragments(max(abs(box.xmin), abs(box.xmax)))
+    if isinstance(node, ast.LinearExtrusion):
+        _count_2d(node.item, analysis, depth + 1)
+        slices = 1
+        if node.twist:
+            radius = max((x * x + y * y) ** 0.5 for x, y, z in node.item.bounds().corners())
+            slices = max(2, int(ceil(abs(node.twist) / 360 * fragments(radius))))
+        return _outline_size(node.item) * slices + 2
+    raise ValueError('Unknown AST type: {}'.format(node.__class__.__name__))
+
+
+def _count_2d(node, analysis, depth):
+    analysis.node_counts[node.__class__.__name__] += 1
+    analysis.depth = max(analysis.depth, depth)
+    if isinstance(node, ast._BooleanOperation):
+        for item in node.items:
+            _count_2d(item, analysis, depth + 1)
+    elif hasattr(node, 'item'):
+        _count_2d(node.item, analysis, depth + 1)
+
+
+def analyze(target):
+    """Analyze the complexity of an AST.
+
+    Example::
+
+        >>> analysis = analyze(shape)
+        >>> if analysis.cost > 1000000:
+        ...     enqueue_slow(shape)
+
+    :param target: The AST or a shape.
+    :type target: :class:`tangible.ast.AST` or
+        :class:`tangible.shapes.base.BaseShape`
+    :rtype: :class:`Analysis`
+
+    """
+    node = target if isinstance(target, ast.AST) else target._build_ast()
+    analysis = Analysis()
+    analysis.facets = _walk(node, analysis, 1)
+    return analysis
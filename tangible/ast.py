@@ -8,11 +8,80 @@ representation of 3D objects. It is implemented using namedtuples.
 """
 from __future__ import print_function, division, absolute_import, unicode_literals
 
-from itertools import chain
+import copy
+from collections import namedtuple
+from itertools import chain, product
+from math import sin, cos, radians, sqrt, pi
 
 __VERSION__ = '1'
 
 
+### Bounding box ###
+
+class BoundingBox(namedtuple('BoundingBox', 'xmin ymin zmin xmax ymax zmax')):
+    """An axis aligned bounding box. 2D shapes have a height of 0."""
+    __slots__ = ()
+
+    @classmethod
+    def from_points(cls, points):
+        """Create the bounding box of a list of 2D or 3D points."""
+        columns = list(zip(*points))
+        if len(columns) == 2:
+            columns.append((0,))
+        xs, ys, zs = columns
+        return cls(min(xs), min(ys), min(zs), max(xs), max(ys), max(zs))
+
+    @property
+    def size(self):
+        """The size of the box as ``(x, y, z)`` tuple."""
+        return (self.xmax - self.xmin, self.ymax - self.ymin, self.zmax - self.zmin)
+
+    @property
+    def center(self):
+        """The center of the box as ``(x, y, z)`` tuple."""
+        return ((self.xmin + self.xmax) / 2, (self.ymin + self.ymax) / 2,
+                (self.zmin + self.zmax) / 2)
+
+    def corners(self):
+        """Return the 8 corners of the box."""
+        return list(product((self.xmin, self.xmax), (self.ymin, self.ymax),
+                            (self.zmin, self.zmax)))
+
+    def union(self, other):
+        """Return the smallest box containing both boxes."""
+        return BoundingBox(min(self.xmin, other.xmin), min(self.ymin, other.ymin),
+                           min(self.zmin, other.zmin), max(self.xmax, other.xmax),
+                           max(self.ymax, other.ymax), max(self.zmax, other.zmax))
+
+    def intersection(self, other):
+        """Return the intersection of both boxes. If the boxes don't overlap,
+        the result has a negative size."""
+        return BoundingBox(max(self.xmin, other.xmin), max(self.ymin, other.ymin),
+                           max(self.zmin, other.zmin), min(self.xmax, other.xmax),
+                           min(self.ymax, other.ymax), min(self.zmax, other.zmax))
+
+    def translated(self, x, y, z):
+        """Return a copy of the box, moved by the specified offsets."""
+        return BoundingBox(self.xmin + x, self.ymin + y, self.zmin + z,
+                           self.xmax + x, self.ymax + y, self.zmax + z)
+
+    def transformed(self, matrix):
+        """Return the bounding box of this box, transformed by an affine 3x4
+        matrix (see :meth:`Translate.matrix`)."""
+        (a, b, c, d), (e, f, g, h), (i, j, k, l) = matrix
+        return BoundingBox.from_points([
+            (a * x + b * y + c * z + d, e * x + f * y + g * z + h, i * x + j * y + k * z + l)
+            for x, y, z in self.corners()
+        ])
+
+
+def _determinant(m):
+    """Return the determinant of the linear part of an affine 3x4 matrix."""
+    return (m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1]) -
+            m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0]) +
+            m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]))
+
+
 ### Base class for AST types ###
 
 class AST(object):
@@ -20,9 +89,12 @@ class AST(object):
 
     def __eq__(self, other):
         """This method override ensures that two objects are considered equal
-        when their attributes match. Object identity is irrelevant."""
-        return isinstance(other, self.__class__) \
-            and self.__dict__ == other.__dict__
+        when their attributes match. Object identity is irrelevant. Private
+        attributes (e.g. caches) are ignored."""
+        if not isinstance(other, self.__class__):
+            return False
+        public = lambda obj: dict((k, v) for k, v in obj.__dict__.items() if k[0] != '_')
+        return public(self) == public(other)
 
     def __ne__(self, other):
         """Inverse of ``__eq__``."""
@@ -32,6 +104,74 @@ class AST(object):
         name = self.__class__.__name__
         return '<AST/{}: {}>'.format(name, id(self))
 
+    def bounds(self):
+        """Return the axis aligned bounding box of the object.
+
+        The bounding box is calculated analytically and propagated through
+        transformations and boolean operations. For rotated objects and
+        boolean operations, the result may be larger than the exact bounding
+        box. The result is cached, therefore AST objects should not be
+        modified after the first call.
+
+        :rtype: :class:`BoundingBox`
+
+        """
+        try:
+            return self._bounds
+        except AttributeError:
+            self._bounds = self._compute_bounds()
+            return self._bounds
+
+    def _compute_bounds(self):
+        raise NotImplementedError('Bounds of {} not implemented.'.format(self.__class__.__name__))
+
+    def estimate_volume(self):
+        """Return the volume of the object, calculated in closed form for
+        primitives and with the divergence theorem for polyhedra.
+
+        Children of a union are assumed not to overlap, which is the case for
+        all shapes generated by tangible. For differences and intersections,
+        the result is an upper bound. 2D objects have a volume of 0. The
+        result is cached, like the :meth:`bounds`.
+
+        :rtype: float
+
+        """
+        try:
+            return self._volume
+        except AttributeError:
+            self._volume = self._compute_volume()
+            return self._volume
+
+    def estimate_material(self, density, infill=1.0):
+        """Return the mass of a print of the object.
+
+        Lengths are assumed to be in millimeters.
+
+        :param density: The density of the material in g/cm³ (e.g. 1.24 for PLA).
+        :type density: int or float
+        :param infill: The infill ratio, between 0 and 1 (default 1).
+        :type infill: int or float
+        :returns: The mass in grams.
+        :rtype: float
+        :raises: ValueError if validation fails.
+
+        """
+        if density <= 0:
+            raise ValueError('Density must be > 0.')
+        if not 0 <= infill <= 1:
+            raise ValueError('Infill must be between 0 and 1.')
+        return self.estimate_volume() / 1000 * density * infill
+
+    def _compute_volume(self):
+        # 2D objects don't have a volume
+        return 0
+
+    def _compute_area(self):
+        """Return the area and the centroid of a 2D object as
+        ``(area, (x, y))`` tuple."""
+        raise NotImplementedError('Area of {} not implemented.'.format(self.__class__.__name__))
+
 
 ### 2D shapes ###
 
@@ -48,6 +188,13 @@ class Circle(AST):
             raise ValueError('Radius of a circle must be > 0.')
         self.radius = radius
 
+    def _compute_bounds(self):
+        r = self.radius
+        return BoundingBox(-r, -r, 0, r, r, 0)
+
+    def _compute_area(self):
+        return pi * self.radius ** 2, (0, 0)
+
 
 class CircleSector(Circle):
     """A circle sector (pizza slice)."""
@@ -67,6 +214,21 @@ class CircleSector(Circle):
             raise ValueError('Angle must be between 0 and 360.')
         self.angle = angle
 
+    def _compute_bounds(self):
+        # The sector starts at the positive Y axis and extends clockwise. Its
+        # extremes are the center, the end of the arc and the crossed axes.
+        angles = [0, self.angle] + [a for a in (90, 180, 270) if a < self.angle]
+        r = self.radius
+        points = [(0, 0)] + [(r * sin(radians(a)), r * cos(radians(a))) for a in angles]
+        return BoundingBox.from_points(points)
+
+    def _compute_area(self):
+        # The centroid lies on the bisector of the sector
+        alpha = radians(self.angle)
+        distance = 4 * self.radius * sin(alpha / 2) / (3 * alpha)
+        return (alpha / 2 * self.radius ** 2,
+                (distance * sin(alpha / 2), distance * cos(alpha / 2)))
+
 
 class Rectangle(AST):
     """A rectangle 2D shape."""
@@ -86,6 +248,12 @@ class Rectangle(AST):
         self.width = width
         self.height = height
 
+    def _compute_bounds(self):
+        return BoundingBox(0, 0, 0, self.width, self.height, 0)
+
+    def _compute_area(self):
+        return self.width * self.height, (self.width / 2, self.height / 2)
+
 
 class Polygon(AST):
     """A polygon 2D shape."""
@@ -105,6 +273,21 @@ class Polygon(AST):
             raise ValueError('A polygon consists of at least 3 points.')
         self.points = points
 
+    def _compute_bounds(self):
+        return BoundingBox.from_points(self.points)
+
+    def _compute_area(self):
+        # Shoelace formula
+        area = cx = cy = 0
+        for (x1, y1), (x2, y2) in zip(self.points, self.points[1:]):
+            cross = x1 * y2 - x2 * y1
+            area += cross
+            cx += (x1 + x2) * cross
+            cy += (y1 + y2) * cross
+        if not area:
+            return 0, (0, 0)
+        return abs(area) / 2, (cx / (3 * area), cy / (3 * area))
+
 
 # 3D shapes
 
@@ -131,6 +314,12 @@ class Cube(AST):
         self.height = height
         self.depth = depth
 
+    def _compute_bounds(self):
+        return BoundingBox(0, 0, 0, self.width, self.depth, self.height)
+
+    def _compute_volume(self):
+        return self.width * self.depth * self.height
+
 
 class Sphere(AST):
     """A sphere 3D shape."""
@@ -145,6 +334,13 @@ class Sphere(AST):
             raise ValueError('Radius of a sphere must be > 0.')
         self.radius = radius
 
+    def _compute_bounds(self):
+        r = self.radius
+        return BoundingBox(-r, -r, -r, r, r, r)
+
+    def _compute_volume(self):
+        return 4 / 3 * pi * self.radius ** 3
+
 
 class Cylinder(AST):
     """A cylinder 3D shape."""
@@ -169,6 +365,14 @@ class Cylinder(AST):
         self.radius1 = radius1
         self.radius2 = radius2
 
+    def _compute_bounds(self):
+        r = max(self.radius1, self.radius2)
+        return BoundingBox(-r, -r, 0, r, r, self.height)
+
+    def _compute_volume(self):
+        r1, r2 = self.radius1, self.radius2
+        return pi * self.height * (r1 * r1 + r1 * r2 + r2 * r2) / 3
+
 
 class Polyhedron(AST):
     """A polyhedron 3D shape. Supports both triangles and quads. Triangles and
@@ -210,6 +414,63 @@ class Polyhedron(AST):
         self.triangles = triangles
         self.quads = quads
 
+    def _compute_bounds(self):
+        return BoundingBox.from_points(self.points)
+
+    def _compute_volume(self):
+        # Divergence theorem: sum up the signed volumes of the tetrahedra
+        # formed by the origin and each (fan triangulated) face
+        p = self.points
+        volume = 0
+        for face in chain(self.triangles, self.quads):
+            x1, y1, z1 = p[face[0]]
+            for b, c in zip(face[1:-1], face[2:]):
+                (x2, y2, z2), (x3, y3, z3) = p[b], p[c]
+                volume += x1 * (y2 * z3 - y3 * z2) - y1 * (x2 * z3 - x3 * z2) + \
+                    z1 * (x2 * y3 - x3 * y2)
+        return abs(volume) / 6
+
+
+class Surface(AST):
+    """A height map 3D shape. The heights are arranged in a grid with a
+    spacing of 1, starting at the origin. Like in OpenSCAD, the object
+    extends down to ``z=0``, or to 1 below the lowest point if there are
+    heights below 1."""
+    def __init__(self, heights):
+        """
+        :param heights: The heights as list of rows. Row ``i`` is placed at
+            ``y=i``, column ``j`` at ``x=j``.
+        :type heights: list of lists
+        :raises: ValueError if validation fails.
+
+        """
+        if len(heights) < 2:
+            raise ValueError('A surface consists of at least 2 rows.')
+        lengths = set(map(len, heights))
+        if len(lengths) != 1:
+            raise ValueError('All rows of a surface must be of the same length.')
+        if lengths.pop() < 2:
+            raise ValueError('A surface consists of at least 2 columns.')
+        self.heights = heights
+
+    @property
+    def base(self):
+        """The z coordinate of the bottom of the object."""
+        return min(0, min(min(row) for row in self.heights) - 1)
+
+    def _compute_bounds(self):
+        top = max(max(row) for row in self.heights)
+        return BoundingBox(0, 0, self.base, len(self.heights[0]) - 1, len(self.heights) - 1, top)
+
+    def _compute_volume(self):
+        # Every cell is split into 4 triangles that meet at the mean height of
+        # the cell, the volume of the cell is the mean of its corner heights.
+        total = 0
+        for row1, row2 in zip(self.heights, self.heights[1:]):
+            total += sum(row1[:-1]) + sum(row1[1:]) + sum(row2[:-1]) + sum(row2[1:])
+        cells = (len(self.heights) - 1) * (len(self.heights[0]) - 1)
+        return total / 4 - cells * self.base
+
 
 ### Transformations ###
 
@@ -237,6 +498,21 @@ class Translate(AST):
         self.z = z
         self.item = item
 
+    def matrix(self):
+        """Return the transformation as affine 3x4 matrix (a 3-tuple of
+        4-tuples)."""
+        return ((1, 0, 0, self.x), (0, 1, 0, self.y), (0, 0, 1, self.z))
+
+    def _compute_bounds(self):
+        return self.item.bounds().translated(self.x, self.y, self.z)
+
+    def _compute_volume(self):
+        return self.item.estimate_volume()
+
+    def _compute_area(self):
+        area, (x, y) = self.item._compute_area()
+        return area, (x + self.x, y + self.y)
+
 
 class Rotate(AST):
     """A rotate transformation."""
@@ -268,6 +544,28 @@ class Rotate(AST):
         self.vector = vector
         self.item = item
 
+    def matrix(self):
+        """Return the transformation as affine 3x4 matrix. Like in OpenSCAD,
+        the object is rotated around the axis defined by the vector."""
+        length = sqrt(sum(v * v for v in self.vector))
+        x, y, z = [v / length for v in self.vector]
+        s, c = sin(radians(self.degrees)), cos(radians(self.degrees))
+        t = 1 - c
+        return ((t * x * x + c, t * x * y - s * z, t * x * z + s * y, 0),
+                (t * x * y + s * z, t * y * y + c, t * y * z - s * x, 0),
+                (t * x * z - s * y, t * y * z + s * x, t * z * z + c, 0))
+
+    def _compute_bounds(self):
+        return self.item.bounds().transformed(self.matrix())
+
+    def _compute_volume(self):
+        return self.item.estimate_volume() * abs(_determinant(self.matrix()))
+
+    def _compute_area(self):
+        area, (x, y) = self.item._compute_area()
+        (a, b, _, d), (e, f, _, h), _ = self.matrix()
+        return area * abs(a * f - b * e), (a * x + b * y + d, e * x + f * y + h)
+
 
 class Scale(AST):
     """A scale transformation."""
@@ -299,6 +597,21 @@ class Scale(AST):
         self.z = z
         self.item = item
 
+    def matrix(self):
+        """Return the transformation as affine 3x4 matrix."""
+        return ((self.x, 0, 0, 0), (0, self.y, 0, 0), (0, 0, self.z, 0))
+
+    def _compute_bounds(self):
+        return self.item.bounds().transformed(self.matrix())
+
+    def _compute_volume(self):
+        return self.item.estimate_volume() * abs(_determinant(self.matrix()))
+
+    def _compute_area(self):
+        area, (x, y) = self.item._compute_area()
+        (a, b, _, d), (e, f, _, h), _ = self.matrix()
+        return area * abs(a * f - b * e), (a * x + b * y + d, e * x + f * y + h)
+
 
 class Mirror(AST):
     """A mirror transformation."""
@@ -325,6 +638,25 @@ class Mirror(AST):
         self.vector = tuple(vector)
         self.item = item
 
+    def matrix(self):
+        """Return the transformation as affine 3x4 matrix."""
+        x, y, z = self.vector
+        f = 2 / (x * x + y * y + z * z)
+        return ((1 - f * x * x, -f * x * y, -f * x * z, 0),
+                (-f * x * y, 1 - f * y * y, -f * y * z, 0),
+                (-f * x * z, -f * y * z, 1 - f * z * z, 0))
+
+    def _compute_bounds(self):
+        return self.item.bounds().transformed(self.matrix())
+
+    def _compute_volume(self):
+        return self.item.estimate_volume() * abs(_determinant(self.matrix()))
+
+    def _compute_area(self):
+        area, (x, y) = self.item._compute_area()
+        (a, b, _, d), (e, f, _, h), _ = self.matrix()
+        return area * abs(a * f - b * e), (a * x + b * y + d, e * x + f * y + h)
+
 
 ### Boolean operations ###
 
@@ -350,17 +682,46 @@ class _BooleanOperation(AST):
 
 class Union(_BooleanOperation):
     """A union operation."""
-    pass
+
+    def _compute_volume(self):
+        return sum(item.estimate_volume() for item in self.items)
+
+    def _compute_area(self):
+        areas = [item._compute_area() for item in self.items]
+        total = sum(area for area, _ in areas)
+        if not total:
+            return 0, (0, 0)
+        return total, (sum(area * x for area, (x, y) in areas) / total,
+                       sum(area * y for area, (x, y) in areas) / total)
+
+    def _compute_bounds(self):
+        boxes = [item.bounds() for item in self.items]
+        return BoundingBox(min(b.xmin for b in boxes), min(b.ymin for b in boxes),
+                           min(b.zmin for b in boxes), max(b.xmax for b in boxes),
+                           max(b.ymax for b in boxes), max(b.zmax for b in boxes))
 
 
 class Difference(_BooleanOperation):
     """A difference operation."""
-    pass
+
+    def _compute_bounds(self):
+        return self.items[0].bounds()
+
+    def _compute_volume(self):
+        return self.items[0].estimate_volume()
 
 
 class Intersection(_BooleanOperation):
     """A intersection operation."""
-    pass
+
+    def _compute_bounds(self):
+        box = self.items[0].bounds()
+        for item in self.items[1:]:
+            box = box.intersection(item.bounds())
+        return box
+
+    def _compute_volume(self):
+        return min(item.estimate_volume() for item in self.items)
 
 
 ### Extrusions ###
@@ -385,6 +746,19 @@ class LinearExtrusion(AST):
         self.item = item
         self.twist = twist
 
+    def _compute_bounds(self):
+        box = self.item.bounds()
+        if self.twist:
+            # The twisted object stays within the circle around the origin
+            # that contains the whole 2D object
+            r = max(sqrt(x * x + y * y) for x, y, z in box.corners())
+            return BoundingBox(-r, -r, 0, r, r, self.height)
+        return BoundingBox(box.xmin, box.ymin, 0, box.xmax, box.ymax, self.height)
+
+    def _compute_volume(self):
+        # Twisting doesn't change the volume
+        return self.item._compute_area()[0] * self.height
+
 
 class RotateExtrusion(AST):
     """A rotational extrusion around the z axis."""
@@ -399,3 +773,66 @@ class RotateExtrusion(AST):
         if not isinstance(item, AST):
             raise ValueError('Item must be an AST type.')
         self.item = item
+
+    def _compute_bounds(self):
+        # The X axis of the 2D object becomes the radius, the Y axis the height
+        box = self.item.bounds()
+        r = max(abs(box.xmin), abs(box.xmax))
+        return BoundingBox(-r, -r, box.ymin, r, r, box.ymax)
+
+    def _compute_volume(self):
+        # Pappus's centroid theorem
+        area, (x, _) = self.item._compute_area()
+        return 2 * pi * abs(x) * area
+
+
+### Tree manipulation ###
+
+#: The transformation types.
+TRANSFORMATIONS = (Translate, Rotate, Scale, Mirror)
+
+
+def with_item(node, item):
+    """Return a copy of a transformation or extrusion with another item.
+    Cached values like the bounding box are dropped.
+
+    :param node: The transformation or extrusion.
+    :type node: tangible.ast.AST
+    :param item: The new item.
+    :type item: tangible.ast.AST
+    :returns: The copy.
+
+    """
+    clone = copy.copy(node)
+    clone.__dict__ = dict((k, v) for k, v in node.__dict__.items() if k[0] != '_')
+    clone.item = item
+    return clone
+
+
+def flatten_unions(node, predicate=None):
+    """Resolve unions into a flat list of their items, recursively.
+    Transformations of unions are distributed over the items.
+
+    Example::
+
+        >>> flatten_unions(Translate(1, 0, 0, Union([a, b])))
+        [Translate(1, 0, 0, a), Translate(1, 0, 0, b)]
+
+    :param node: The AST object.
+    :type node: tangible.ast.AST
+    :param predicate: If specified, only unions for which
+        ``predicate(union)`` is true are resolved (default ``None``).
+    :type predicate: callable
+    :returns: List of AST objects. Unmodified objects are shared with the
+        original AST.
+    :rtype: list
+
+    """
+    if isinstance(node, Union) and (predicate is None or predicate(node)):
+        return list(chain.from_iterable(flatten_unions(item, predicate) for item in node.items))
+    if isinstance(node, TRANSFORMATIONS) and isinstance(node.item, (Union,) + TRANSFORMATIONS):
+        items = flatten_unions(node.item, predicate)
+        if len(items) == 1 and items[0] is node.item:
+            return [node]
+        return [with_item(node, item) for item in items]
+    return [node]
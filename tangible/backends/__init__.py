@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Backends convert an AST into the source code of a CAD tool.
+
+Besides a single AST, all backends accept a *scene*: a list of objects that
+are placed on the same print plate. See :func:`scene_items`.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from tangible import ast
+
+
+def scene_items(scene):
+    """Normalize the input of a backend into a list of placed AST objects.
+
+    The scene can be a single AST object or a list. Every list item is either
+    an AST object, a shape or a ``(item, (x, y, z))`` tuple that places the
+    AST object or shape at the specified position.
+
+    :param scene: The AST object or list.
+    :returns: List of ``(node, offset)`` tuples. The offset is ``None`` for
+        items without a position.
+    :rtype: list of 2-tuples
+    :raises: ValueError if an item is invalid.
+
+    """
+    if not isinstance(scene, (list, tuple)):
+        scene = [scene]
+    items = []
+    for item in scene:
+        offset = None
+        if isinstance(item, tuple):
+            if len(item) != 2 or len(item[1]) != 3:
+                raise ValueError('Placed items must be (item, (x, y, z)) tuples.')
+            item, offset = item[0], tuple(item[1])
+        if hasattr(item, '_build_ast'):
+            item = item._build_ast()
+        if not isinstance(item, ast.AST):
+            raise ValueError('Scene items must be AST objects or shapes.')
+        items.append((item, offset))
+    return items
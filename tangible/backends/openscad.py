@@ -1,9 +1,120 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import, unicode_literals
 
+import gzip
+import hashlib
+import io
+import os
+from collections import Counter
 from contextlib import contextmanager
+from itertools import chain, islice
 
-from tangible import ast, utils
+from tangible import ast, mesh, optimize, profiling, utils
+from tangible.backends import scene_items
+
+
+def _strip_zeros(text, precision):
+    """Remove insignificant trailing zeros from a list of fixed point numbers,
+    e.g. ``[1.500, -0.000]`` becomes ``[1.5, 0]``.
+
+    Every pass removes one trailing zero from all numbers at once. After
+    ``precision`` passes, only significant digits are left.
+
+    """
+    for i in range(precision):
+        text = text.replace('0,', ',').replace('0]', ']')
+    text = text.replace('.,', ',').replace('.]', ']')
+    return text.replace('-0,', '0,').replace('-0]', '0]')
+
+
+def _format_number(value, precision):
+    """Format a number with the specified number of decimal places.
+
+    Trailing zeros are removed. If the precision is ``None``, the value is
+    returned unmodified.
+
+    :param value: The number to format.
+    :type value: int or float
+    :param precision: Number of decimal places, or ``None``.
+    :type precision: int
+    :returns: The formatted number.
+    :rtype: str
+
+    """
+    if precision is None:
+        return value
+    text = '%.*f' % (precision, value)
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
+
+
+def _format_vectors(vectors, precision, separator=', '):
+    """Format a list of equally sized vectors (e.g. points) as a nested
+    OpenSCAD list.
+
+    All values are formatted with a single string formatting operation,
+    which is much faster than formatting each value separately.
+
+    :param vectors: The vectors to format.
+    :type vectors: list of tuples
+    :param precision: Number of decimal places, or ``None`` to use ``repr``.
+    :type precision: int
+    :param separator: The separator between list items (default ``', '``).
+    :type separator: str
+    :returns: The formatted list.
+    :rtype: str
+
+    """
+    if precision is None and separator == ', ':
+        return repr([list(v) for v in vectors])
+    if not vectors:
+        return '[]'
+    value = '%r' if precision is None else '%.{}f'.format(precision)
+    vector = '[' + separator.join([value] * len(vectors[0])) + ']'
+    template = '[' + separator.join([vector] * len(vectors)) + ']'
+    text = template % tuple(chain.from_iterable(vectors))
+    return text if precision is None else _strip_zeros(text, precision)
+
+
+def _format_heightmap(heights, precision):
+    """Format a matrix of heights as OpenSCAD ``.dat`` file: One line per
+    row, values separated by spaces.
+
+    All values are formatted at once, see :func:`_format_vectors`.
+
+    """
+    text = _format_vectors(heights, precision)
+    return text[2:-2].replace('], [', '\n').replace(', ', ' ') + '\n'
+
+
+def _digest(node):
+    """Return a structural digest of an AST object.
+
+    Two objects that are equal (see :meth:`tangible.ast.AST.__eq__`) have the
+    same digest. The digest is cached on the object, so shared subtrees are
+    hashed only once.
+
+    """
+    try:
+        return node._digest
+    except AttributeError:
+        pass
+
+    def _encode(value):
+        if isinstance(value, ast.AST):
+            return _digest(value)
+        if isinstance(value, (list, tuple)):
+            return '[' + ','.join(_encode(v) for v in value) + ']'
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return repr(float(value))
+        return repr(value)
+
+    attributes = sorted((k, v) for k, v in node.__dict__.items() if k[0] != '_')
+    text = node.__class__.__name__ + ''.join(
+        '\0{}={}'.format(k, _encode(v)) for k, v in attributes)
+    node._digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    return node._digest
 
 
 class Statement(object):
@@ -19,6 +130,9 @@ class Statement(object):
     def render(self):
         return [self.text + self.suffix]
 
+    def iterlines(self, prefix, indent):
+        yield prefix + self.text + self.suffix
+
 
 EmptyStatement = Statement('', suffix='')
 
@@ -55,15 +169,27 @@ class Block(object):
         yield blk
         self.stack.pop(-1)
 
-    def render(self):
-        lines = self.title.render()
+    def iterlines(self, prefix, indent):
+        """Generate the lines of this block lazily.
+
+        :param prefix: The indentation of the block itself.
+        :type prefix: str
+        :param indent: The additional indentation of the children.
+        :type indent: str
+
+        """
+        yield prefix + self.title.text
         if self.prefix:
-            lines.append(self.prefix)
+            yield prefix + self.prefix
+        child_prefix = prefix + indent
         for child in self.children:
-            lines.extend(' ' * 4 + l for l in child.render())
+            for line in child.iterlines(child_prefix, indent):
+                yield line
         if self.suffix:
-            lines.append(self.suffix)
-        return lines
+            yield prefix + self.suffix
+
+    def render(self, indent=' ' * 4):
+        return list(self.iterlines('', indent))
 
 
 class Program(Block):
@@ -81,33 +207,185 @@ class Program(Block):
     def preamble(self, item):
         self._preamble.add(item)
 
-    def render(self):
-        lines = list(self._preamble)
+    def iterrender(self, compact=False):
+        """Generate the program code lazily, in small pieces.
+
+        :param compact: Whether to omit indentation and newlines.
+        :type compact: bool
+
+        """
+        indent, newline = ('', '') if compact else (' ' * 4, '\n')
+        sep = ''
         if self._preamble:
-            lines.append('')
+            if compact:
+                yield ''.join(l.strip() for item in self._preamble for l in item.splitlines())
+            else:
+                yield '\n'.join(self._preamble) + '\n'
+            sep = '\n'
         for child in self.children:
-            lines.extend(child.render())
-        return '\n'.join(lines)
+            for line in child.iterlines('', indent):
+                yield sep + line
+                sep = newline
+
+    def render(self, compact=False):
+        return ''.join(self.iterrender(compact))
 
 
 class OpenScadBackend(object):
     """Render AST to OpenSCAD source code."""
 
-    def __init__(self, ast):
+    def __init__(self, ast, precision=None, compact=False, sector_segments=None,
+                 merge_disjoint=False, mesh_threshold=None):
         """
-        :param ast: The AST that should be rendered.
-        :type ast: Any :class:`tangible.ast.AST` subclass
+        :param ast: The AST that should be rendered, or a scene with several
+            objects, see :func:`tangible.backends.scene_items`. Objects that
+            occur several times in a scene are generated once as a module.
+        :type ast: Any :class:`tangible.ast.AST` subclass or list
+        :param precision: If specified, all numbers are rounded to this many
+            decimal places. Trailing zeros are omitted. This results in
+            considerably smaller files that are parsed faster by OpenSCAD.
+            Default: ``None`` (full precision).
+        :type precision: int
+        :param compact: Whether to generate minified code without indentation,
+            newlines and optional whitespace (default ``False``).
+        :type compact: bool
+        :param sector_segments: If specified, circle sectors are converted to
+            plain polygons with this number of segments per full circle.
+            Otherwise they are generated with a ``circle_sector`` module that
+            requires a boolean operation in OpenSCAD for every sector
+            (default ``None``).
+        :type sector_segments: int
+        :param merge_disjoint: Whether to remove unions whose children don't
+            overlap, see :func:`tangible.optimize.merge_disjoint`. The
+            resulting objects are placed at the top level of the program
+            (default ``False``).
+        :type merge_disjoint: bool
+        :param mesh_threshold: If specified, polyhedra with more points than
+            this are written to binary STL sidecar files and imported, instead
+            of inlining the points in the source code. OpenSCAD parses large
+            literal lists very slowly (default ``None``). Shapes using this
+            option must be written with
+            :meth:`tangible.shapes.base.BaseShape.save`, ``render()`` refuses
+            code with sidecar files.
+        :type mesh_threshold: int
+
+        Some objects are not written into the OpenSCAD code directly, but into
+        separate files next to it (e.g. the heights of a surface). After the
+        code has been generated, the ``sidecars`` attribute contains a
+        dictionary that maps file names to file contents. Use
+        :meth:`write_sidecars` or :meth:`save` to write them.
 
         """
         self.ast = ast
+        self.precision = precision
+        self.compact = compact
+        self.sector_segments = sector_segments
+        self.merge_disjoint = merge_disjoint
+        self.mesh_threshold = mesh_threshold
+        self.sidecars = {}
 
     def generate(self):
         """Generate OpenSCAD source code from the AST."""
+        with profiling.phase('program'):
+            program = self._build_program()
+        with profiling.phase('code'):
+            return program.render(self.compact)
+
+    def iter_generate(self):
+        """Generate OpenSCAD source code from the AST lazily, in small pieces.
+        Joined together, the pieces are identical to the result of
+        :meth:`generate`."""
+        return self._build_program().iterrender(self.compact)
+
+    def write(self, fileobj, compression=None, chunk_lines=1000):
+        """Generate OpenSCAD source code from the AST and write it to a file.
+
+        The code is rendered and written in chunks, the complete source code is
+        never held in memory as a single string.
+
+        :param fileobj: A file-like object opened in binary mode.
+        :param compression: Either ``None``, ``'gzip'`` or ``'zstd'`` (default
+            ``None``). Compression with zstd requires the `zstandard
+            <https://pypi.org/project/zstandard/>`_ package.
+        :type compression: str
+        :param chunk_lines: Number of lines written at once (default 1000).
+        :type chunk_lines: int
+        :raises: ValueError if the compression type is unknown.
+
+        """
+        if compression is None:
+            stream = fileobj
+        elif compression == 'gzip':
+            stream = gzip.GzipFile(fileobj=fileobj, mode='wb')
+        elif compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError('zstd compression requires the zstandard package.')
+            stream = zstandard.ZstdCompressor().stream_writer(fileobj, closefd=False)
+        else:
+            raise ValueError('Unknown compression type: {!r}'.format(compression))
+        pieces = self.iter_generate()
+        chunk = ''.join(islice(pieces, chunk_lines))
+        while chunk:
+            stream.write(chunk.encode('utf-8'))
+            chunk = ''.join(islice(pieces, chunk_lines))
+        if stream is not fileobj:
+            stream.close()
+
+    def write_sidecars(self, directory):
+        """Write the sidecar files of the previously generated code into a
+        directory.
+
+        :param directory: The directory, usually the one containing the
+            OpenSCAD file.
+        :type directory: str
+
+        """
+        for filename, content in sorted(self.sidecars.items()):
+            if not isinstance(content, bytes):
+                content = content.encode('utf-8')
+            with io.open(os.path.join(directory, filename), 'wb') as f:
+                f.write(content)
+
+    def save(self, path, compression=None):
+        """Generate OpenSCAD source code and write it to the specified path,
+        together with all sidecar files.
+
+        :param path: The path of the OpenSCAD file.
+        :type path: str
+        :param compression: See :meth:`write`.
+        :type compression: str
+
+        """
+        with io.open(path, 'wb') as f:
+            self.write(f, compression=compression)
+        self.write_sidecars(os.path.dirname(path) or '.')
+
+    def _sidecar(self, name, extension, content):
+        """Register a sidecar file and return its file name. The name is
+        derived from the content, identical files are written only once."""
+        data = content if isinstance(content, bytes) else content.encode('utf-8')
+        filename = '{}-{}.{}'.format(name, hashlib.sha1(data).hexdigest()[:12], extension)
+        self.sidecars[filename] = content
+        return filename
+
+    def _build_program(self):
+        """Walk the AST and build the program structure."""
+        self.sidecars = {}
         prgm = Program()
         BLOCK = prgm.block
         STMT = prgm.statement
         PRE = prgm.preamble
         SEP = prgm.emptyline
+        separator = ',' if self.compact else ', '
+        NUM = lambda value: _format_number(value, self.precision)
+        VECS = lambda vectors: _format_vectors(vectors, self.precision, separator)
+        VEC = lambda vector: _format_vectors([vector], None, separator)[1:-1]
+        if self.compact:
+            # Strip optional whitespace from the templates
+            BLOCK = lambda text, *args: prgm.block(text.replace(', ', ','), *args)
+            STMT = lambda text, *args: prgm.statement(text.replace(', ', ','), *args)
 
         def _generate(node):
             """Recursive code generating function."""
@@ -123,12 +401,15 @@ class OpenScadBackend(object):
             # 2D shapes
 
             elif istype(ast.Circle):
-                STMT('circle({})', node.radius)
+                STMT('circle({})', NUM(node.radius))
             elif istype(ast.Rectangle):
-                STMT('square([{}, {}])', node.width, node.height)
+                STMT('square([{}, {}])', NUM(node.width), NUM(node.height))
             elif istype(ast.Polygon):
-                points = [list(p) for p in node.points]
-                STMT('polygon({0!r})', points[:-1])
+                STMT('polygon({})', VECS(node.points[:-1]))
+            elif istype(ast.CircleSector) and self.sector_segments:
+                points = utils.circle_sector_points(node.radius, node.angle,
+                                                    self.sector_segments)
+                STMT('polygon({})', VECS(points))
             elif istype(ast.CircleSector):
                 PRE('module circle_sector(r, a) {\n'
                     '    a1 = a % 360;\n'
@@ -159,37 +440,49 @@ class OpenScadBackend(object):
                     '        }\n'
                     '    }\n'
                     '};')
-                STMT('circle_sector({}, {})', node.radius, node.angle)
+                STMT('circle_sector({}, {})', NUM(node.radius), NUM(node.angle))
 
             # 3D shapes
 
             elif istype(ast.Cube):
-                STMT('cube([{}, {}, {}])', node.width, node.depth, node.height)
+                STMT('cube([{}, {}, {}])', NUM(node.width), NUM(node.depth), NUM(node.height))
             elif istype(ast.Sphere):
-                STMT('sphere({})', node.radius)
+                STMT('sphere({})', NUM(node.radius))
             elif istype(ast.Cylinder):
-                STMT('cylinder({}, {}, {})', node.height, node.radius1, node.radius2)
+                STMT('cylinder({}, {}, {})',
+                     NUM(node.height), NUM(node.radius1), NUM(node.radius2))
+            elif istype(ast.Polyhedron) and self.mesh_threshold is not None \
+                    and len(node.points) > self.mesh_threshold:
+                filename = self._sidecar('polyhedron', 'stl',
+                                         mesh.to_stl(mesh.Mesh.from_polyhedron(node)))
+                STMT('import("{}")', filename)
             elif istype(ast.Polyhedron):
-                points = [list(p) for p in node.points]
                 triangles = [list(t) for t in node.triangles] if node.triangles else []
                 if node.quads:
                     triangles.extend(utils._quads_to_triangles(node.quads))
-                template = 'polyhedron(\npoints={0!r},\n    triangles={1!r}\n)'
-                STMT(template, points, triangles)
+                if self.compact:
+                    template = 'polyhedron(points={0},triangles={1})'
+                else:
+                    template = 'polyhedron(\npoints={0},\n    triangles={1}\n)'
+                STMT(template, VECS(node.points), _format_vectors(triangles, None, separator))
+            elif istype(ast.Surface):
+                filename = self._sidecar('surface', 'dat',
+                                         _format_heightmap(node.heights, self.precision))
+                STMT('surface(file="{}")', filename)
 
             # Transformations
 
             elif istype(ast.Translate):
-                with BLOCK('translate([{}, {}, {}])', node.x, node.y, node.z):
+                with BLOCK('translate([{}, {}, {}])', NUM(node.x), NUM(node.y), NUM(node.z)):
                     _generate(node.item)
             elif istype(ast.Rotate):
-                with BLOCK('rotate({0}, {1!r})', node.degrees, list(node.vector)):
+                with BLOCK('rotate({}, {})', NUM(node.degrees), VEC(node.vector)):
                     _generate(node.item)
             elif istype(ast.Scale):
-                with BLOCK('scale([{}, {}, {}])', node.x, node.y, node.z):
+                with BLOCK('scale([{}, {}, {}])', NUM(node.x), NUM(node.y), NUM(node.z)):
                     _generate(node.item)
             elif istype(ast.Mirror):
-                with BLOCK('mirror({0!r})', list(node.vector)):
+                with BLOCK('mirror({})', VEC(node.vector)):
                     _generate(node.item)
 
             # Boolean operations
@@ -207,12 +500,49 @@ class OpenScadBackend(object):
             # Extrusions
 
             elif istype(ast.LinearExtrusion):
-                with BLOCK('linear_extrude({}, twist={})', node.height, node.twist):
+                with BLOCK('linear_extrude({}, twist={})', NUM(node.height), NUM(node.twist)):
                     _generate(node.item)
             elif istype(ast.RotateExtrusion):
                 with BLOCK('rotate_extrude()'):
                     _generate(node.item)
 
-        _generate(self.ast)
-
-        return prgm.render()
+        def _generate_part(i):
+            if i in modules:
+                STMT('{}()', modules[i])
+            elif self.merge_disjoint:
+                _generate(optimize.merge_disjoint(parts[i]))
+            else:
+                _generate(parts[i])
+
+        # Objects that occur several times in the scene are generated once,
+        # as a module. Identical objects are found by identity first and by
+        # their structural digest second.
+        items = scene_items(self.ast)
+        parts = []
+        indexes = []
+        by_id = {}
+        by_digest = {}
+        for node, offset in items:
+            i = by_id.get(id(node))
+            if i is None:
+                i = by_digest.setdefault(_digest(node), len(parts))
+                if i == len(parts):
+                    parts.append(node)
+                by_id[id(node)] = i
+            indexes.append(i)
+        modules = {}
+        counts = Counter(indexes)
+        for i in sorted(i for i in counts if counts[i] > 1):
+            name = 'part{}'.format(len(modules) + 1)
+            with BLOCK('module {}()', name):
+                _generate_part(i)
+            modules[i] = name
+
+        for i, (node, offset) in zip(indexes, items):
+            if offset is None:
+                _generate_part(i)
+            else:
+                with BLOCK('translate([{}, {}, {}])', *map(NUM, offset)):
+                    _generate_part(i)
+
+        return prgm
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Downsampling of long data series.
+
+Shapes emit one geometric element per datapoint. For very long series this
+results in models that are neither printable nor renderable in reasonable
+time. The functions in this module reduce a series to a maximum number of
+elements before the AST is built.
+
+All functions take a sequence of numbers and return a new list. If the series
+is already short enough, an unmodified copy is returned. Shapes with several
+datasets use :func:`downsample_datasets`, which keeps the datasets aligned.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+
+def _buckets(length, count):
+    """Return the boundaries of ``count`` evenly sized buckets.
+
+    :param length: The length of the series.
+    :type length: int
+    :param count: The number of buckets.
+    :type count: int
+    :returns: List of ``(start, stop)`` index pairs.
+    :rtype: list of 2-tuples
+
+    """
+    edges = [i * length // count for i in range(count + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _validate(max_elements, minimum):
+    if max_elements < minimum:
+        raise ValueError('max_elements must be >= {}.'.format(minimum))
+
+
+def bucket_mean(values, max_elements):
+    """Split the series into ``max_elements`` buckets and return the mean of
+    each bucket.
+
+    Example::
+
+        >>> bucket_mean([1, 3, 5, 7, 9, 11], 3)
+        [2.0, 6.0, 10.0]
+
+    :param values: The data series.
+    :type values: sequence type
+    :param max_elements: The maximum number of resulting datapoints.
+    :type max_elements: int
+    :returns: The downsampled series.
+    :rtype: list
+    :raises: ValueError if ``max_elements`` is smaller than 1.
+
+    """
+    _validate(max_elements, 1)
+    if len(values) <= max_elements:
+        return list(values)
+    return [sum(values[a:b]) / (b - a) for a, b in _buckets(len(values), max_elements)]
+
+
+def bucket_max(values, max_elements):
+    """Split the series into ``max_elements`` buckets and return the maximum
+    of each bucket.
+
+    Example::
+
+        >>> bucket_max([1, 3, 5, 7, 9, 11], 3)
+        [3, 7, 11]
+
+    :param values: The data series.
+    :type values: sequence type
+    :param max_elements: The maximum number of resulting datapoints.
+    :type max_elements: int
+    :returns: The downsampled series.
+    :rtype: list
+    :raises: ValueError if ``max_elements`` is smaller than 1.
+
+    """
+    _validate(max_elements, 1)
+    if len(values) <= max_elements:
+        return list(values)
+    return [max(values[a:b]) for a, b in _buckets(len(values), max_elements)]
+
+
+def _normalized(series):
+    """Scale every series to the range 0 to 1, so that several series can be
+    combined into a single metric. A single series is returned unmodified."""
+    if len(series) == 1:
+        return series
+    result = []
+    for values in series:
+        low, high = min(values), max(values)
+        scale = (high - low) or 1
+        result.append([(v - low) / scale for v in values])
+    return result
+
+
+def _minmax_indexes(series, max_elements):
+    """Return the indexes selected by :func:`minmax` for one or several
+    series of the same length. For several series, the minimum and maximum of
+    the sum of the normalized series are selected."""
+    values = [sum(column) for column in zip(*_normalized(series))]
+    indexes = []
+    for a, b in _buckets(len(values), max_elements // 2):
+        low = min(range(a, b), key=values.__getitem__)
+        high = max(range(a, b), key=values.__getitem__)
+        indexes.extend(sorted((low, high)))
+    return indexes
+
+
+def minmax(values, max_elements):
+    """Split the series into ``max_elements // 2`` buckets and keep both the
+    minimum and the maximum of each bucket, in their original order. Peaks and
+    valleys of the series are preserved.
+
+    Example::
+
+        >>> minmax([1, 9, 5, 2, 8, 3, 7, 4], 4)
+        [1, 9, 8, 3]
+
+    :param values: The data series.
+    :type values: sequence type
+    :param max_elements: The maximum number of resulting datapoints.
+    :type max_elements: int
+    :returns: The downsampled series.
+    :rtype: list
+    :raises: ValueError if ``max_elements`` is smaller than 2.
+
+    """
+    _validate(max_elements, 2)
+    if len(values) <= max_elements:
+        return list(values)
+    return [values[i] for i in _minmax_indexes([values], max_elements)]
+
+
+def _lttb_indexes(series, max_elements):
+    """Return the indexes selected by :func:`lttb` for one or several series
+    of the same length. For several series, the sum of the triangle areas of
+    the normalized series is maximized."""
+    series = _normalized(series)
+    length = len(series[0])
+    buckets = [(a + 1, b + 1) for a, b in _buckets(length - 2, max_elements - 2)]
+    buckets.append((length - 1, length))
+    indexes = [0]
+    prev_x = 0
+    for (a, b), (c, d) in zip(buckets[:-1], buckets[1:]):
+        dx = (c + d - 1) / 2 - prev_x
+        # Twice the triangle area, the constant factor is irrelevant
+        deltas = [(values, values[prev_x], sum(values[c:d]) / (d - c) - values[prev_x])
+                  for values in series]
+        area = lambda i: sum(abs(dx * (values[i] - prev_y) - (i - prev_x) * dy)
+                             for values, prev_y, dy in deltas)
+        prev_x = max(range(a, b), key=area)
+        indexes.append(prev_x)
+    indexes.append(length - 1)
+    return indexes
+
+
+def lttb(values, max_elements):
+    """Downsample the series using the *Largest-Triangle-Three-Buckets*
+    algorithm by Sveinn Steinarsson.
+
+    The first and the last datapoint are always kept. From each bucket in
+    between, the datapoint forming the largest triangle with the previously
+    selected point and the mean of the next bucket is selected. This preserves
+    the visual shape of the series very well.
+
+    :param values: The data series.
+    :type values: sequence type
+    :param max_elements: The maximum number of resulting datapoints.
+    :type max_elements: int
+    :returns: The downsampled series.
+    :rtype: list
+    :raises: ValueError if ``max_elements`` is smaller than 3.
+
+    """
+    _validate(max_elements, 3)
+    if len(values) <= max_elements:
+        return list(values)
+    return [values[i] for i in _lttb_indexes([values], max_elements)]
+
+
+METHODS = {
+    'mean': bucket_mean,
+    'max': bucket_max,
+    'minmax': minmax,
+    'lttb': lttb,
+}
+
+# Methods that select datapoints, with the minimum of max_elements and the
+# function returning the selected indexes
+_SELECTING = {
+    'minmax': (2, _minmax_indexes),
+    'lttb': (3, _lttb_indexes),
+}
+
+
+def downsample(values, max_elements, method='mean'):
+    """Reduce a data series to at most ``max_elements`` datapoints.
+
+    :param values: The data series.
+    :type values: sequence type
+    :param max_elements: The maximum number of resulting datapoints.
+    :type max_elements: int
+    :param method: The reduction method, one of ``mean``, ``max``, ``minmax``
+        or ``lttb`` (default ``mean``).
+    :type method: str
+    :returns: The downsampled series.
+    :rtype: list
+    :raises: ValueError if the method is unknown or ``max_elements`` is too
+        small for the selected method.
+
+    """
+    try:
+        func = METHODS[method]
+    except KeyError:
+        raise ValueError('Unknown downsampling method: {!r}'.format(method))
+    return func(values, max_elements)
+
+
+def downsample_datasets(datasets, max_elements, method='mean'):
+    """Reduce several datasets to at most ``max_elements`` datapoints each,
+    keeping them aligned.
+
+    The bucket methods (``mean`` and ``max``) use the same buckets for all
+    datasets of the same length. The selecting methods (``minmax`` and
+    ``lttb``) select the same indexes in all datasets, based on all of them,
+    so that e.g. the layers of a multi-dimensional tower still belong
+    together. Datasets of different lengths are reduced separately.
+
+    Example::
+
+        >>> downsample_datasets([[0, 10, 0, 0, 0], [0, 0, 0, 10, 0]], 4, 'minmax')
+        [[0, 10, 0, 0], [0, 0, 0, 10]]
+
+    :param datasets: The data series.
+    :type datasets: list of sequence types
+    :param max_elements: The maximum number of resulting datapoints per
+        dataset.
+    :type max_elements: int
+    :param method: The reduction method, see :func:`downsample`.
+    :type method: str
+    :returns: The downsampled series.
+    :rtype: list of lists
+    :raises: ValueError if the method is unknown or ``max_elements`` is too
+        small for the selected method.
+
+    """
+    lengths = set(len(values) for values in datasets)
+    if method not in _SELECTING or len(lengths) != 1:
+        return [downsample(values, max_elements, method) for values in datasets]
+    minimum, indexes = _SELECTING[method]
+    _validate(max_elements, minimum)
+    if lengths.pop() <= max_elements:
+        return [list(values) for values in datasets]
+    selected = indexes(datasets, max_elements)
+    return [[values[i] for i in selected] for values in datasets]
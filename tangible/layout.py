@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Layout module.
+
+This module arranges several shapes on the print beds of a 3D printer. The
+footprint of every shape is calculated from its bounding box and the shapes
+are packed with a skyline bin packing algorithm.
+
+The resulting plates are lists of ``(item, (x, y, z))`` tuples, which can be
+passed to a backend directly as scene (see
+:func:`tangible.backends.scene_items`).
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from . import ast
+
+
+EPSILON = 1e-9
+
+
+class _Skyline(object):
+    """The skyline of a single plate.
+
+    The skyline is a list of ``[x, y, width]`` segments, sorted by ``x``. It
+    describes the upper contour of the placed rectangles.
+
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.segments = [[0, 0, width]]
+
+    def _fit(self, i, width):
+        """Return the lowest ``y`` at which a rectangle starting at segment
+        ``i`` can be placed."""
+        end = self.segments[i][0] + width - EPSILON
+        y = 0
+        for sx, sy, sw in self.segments[i:]:
+            if sx >= end:
+                break
+            y = max(y, sy)
+        return y
+
+    def insert(self, width, height):
+        """Place a rectangle at the lowest possible position, preferring the
+        left side.
+
+        :returns: The ``(x, y)`` position, or ``None`` if the rectangle doesn't
+            fit.
+
+        """
+        best = None
+        for i, (x, _, _) in enumerate(self.segments):
+            if x + width > self.width + EPSILON:
+                break
+            y = self._fit(i, width)
+            if y + height <= self.height + EPSILON and (best is None or (y + height, x) < best):
+                best = (y + height, x, y, i)
+        if best is None:
+            return None
+        top, x, y, i = best
+
+        # Replace the covered segments with the top of the new rectangle
+        end = x + width
+        segments = self.segments[:i] + [[x, top, width]]
+        for sx, sy, sw in self.segments[i:]:
+            if sx + sw <= end + EPSILON:
+                continue
+            if sx < end:
+                segments.append([end, sy, sx + sw - end])
+            else:
+                segments.append([sx, sy, sw])
+
+        # Merge neighbouring segments of the same height
+        self.segments = [segments[0]]
+        for segment in segments[1:]:
+            if abs(self.segments[-1][1] - segment[1]) < EPSILON:
+                self.segments[-1][2] += segment[2]
+            else:
+                self.segments.append(segment)
+        return x, y
+
+
+def pack(items, bed_size, spacing=0):
+    """Arrange shapes on as few print beds as possible.
+
+    The shapes are sorted by the depth of their footprint and placed one
+    after another at the lowest free position of the first plate with enough
+    space. All shapes are moved so that they rest on ``z=0``.
+
+    Example::
+
+        >>> plates = pack(charts, bed_size=(200, 200), spacing=5)
+        >>> for i, plate in enumerate(plates):
+        ...     OpenScadBackend(plate).save('plate{}.scad'.format(i))
+
+    :param items: The shapes or AST objects.
+    :type items: list
+    :param bed_size: The ``(width, depth)`` of the print bed.
+    :type bed_size: 2-tuple
+    :param spacing: The minimum distance between two shapes (default 0).
+    :type spacing: int or float
+    :returns: List of plates. Every plate is a list of ``(item, (x, y, z))``
+        tuples, where ``item`` is the original shape or AST object and ``(x,
+        y, z)`` the translation that places it on the plate.
+    :rtype: list of lists
+    :raises: ValueError if a shape is larger than the print bed.
+
+    """
+    width, depth = bed_size
+    footprints = []
+    for item in items:
+        box = item.bounds()
+        if box.xmax - box.xmin > width + EPSILON or box.ymax - box.ymin > depth + EPSILON:
+            raise ValueError('Shape does not fit on the print bed: {!r}'.format(item))
+        footprints.append(box)
+
+    # The spacing is added to the right and back side of every shape, so the
+    # plate is enlarged by the same amount.
+    order = sorted(range(len(items)), key=lambda i: (
+        footprints[i].ymin - footprints[i].ymax, footprints[i].xmin - footprints[i].xmax))
+    skylines = []
+    plates = []
+    for i in order:
+        box = footprints[i]
+        size = (box.xmax - box.xmin + spacing, box.ymax - box.ymin + spacing)
+        for skyline, plate in zip(skylines, plates):
+            position = skyline.insert(*size)
+            if position is not None:
+                break
+        else:
+            skyline = _Skyline(width + spacing, depth + spacing)
+            plate = []
+            skylines.append(skyline)
+            plates.append(plate)
+            position = skyline.insert(*size)
+        x, y = position
+        plate.append((items[i], (x - box.xmin, y - box.ymin, -box.zmin)))
+    return plates
@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+"""
+Mesh module.
+
+This module converts AST objects into triangle meshes and provides functions
+to analyze these meshes, without the need to render them with a CAD tool.
+
+Like in OpenSCAD, the triangles of a mesh are in clockwise order when looking
+at them from outside.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import struct
+from collections import Counter
+from itertools import chain
+from math import sin, cos, radians, sqrt
+
+from . import ast, utils
+
+
+### Mesh type ###
+
+class Mesh(object):
+    """A triangle mesh."""
+    def __init__(self, points, triangles):
+        """
+        :param points: List of points.
+        :type points: list of 3-tuples
+        :param triangles: Triangles formed by a 3-tuple of point indexes.
+        :type triangles: list of 3-tuples
+
+        """
+        self.points = points
+        self.triangles = triangles
+
+    @classmethod
+    def from_polyhedron(cls, polyhedron):
+        """Create a mesh from a :class:`tangible.ast.Polyhedron`."""
+        triangles = [tuple(t) for t in polyhedron.triangles]
+        triangles.extend(utils._quads_to_triangles(polyhedron.quads))
+        return cls([tuple(p) for p in polyhedron.points], triangles)
+
+    def transformed(self, matrix):
+        """Return a copy of the mesh, transformed by an affine matrix.
+
+        :param matrix: A 3x4 matrix as 3-tuple of 4-tuples.
+        :returns: :class:`Mesh`
+
+        """
+        (a, b, c, d), (e, f, g, h), (i, j, k, l) = matrix
+        points = [(a * x + b * y + c * z + d, e * x + f * y + g * z + h,
+                   i * x + j * y + k * z + l) for x, y, z in self.points]
+        triangles = self.triangles
+        if ast._determinant(matrix) < 0:
+            # Mirroring reverses the orientation of the faces
+            triangles = [(t[0], t[2], t[1]) for t in triangles]
+        return Mesh(points, triangles)
+
+    def __repr__(self):
+        return '<Mesh: {} points, {} triangles>'.format(len(self.points), len(self.triangles))
+
+
+### Affine transformations ###
+
+IDENTITY = ((1, 0, 0, 0), (0, 1, 0, 0), (0, 0, 1, 0))
+
+
+def _multiply(m, n):
+    """Multiply two affine 3x4 matrices."""
+    rows = []
+    for r in m:
+        rows.append((
+            r[0] * n[0][0] + r[1] * n[1][0] + r[2] * n[2][0],
+            r[0] * n[0][1] + r[1] * n[1][1] + r[2] * n[2][1],
+            r[0] * n[0][2] + r[1] * n[1][2] + r[2] * n[2][2],
+            r[0] * n[0][3] + r[1] * n[1][3] + r[2] * n[2][3] + r[3],
+        ))
+    return tuple(rows)
+
+
+### Tessellation ###
+
+def _signed_area(ring):
+    """Return the signed area of a 2D ring (positive if counter-clockwise)."""
+    area = 0
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def _triangulate(ring):
+    """Triangulate a simple 2D polygon in clockwise order using ear clipping.
+
+    :returns: List of triangles (index 3-tuples) in clockwise order.
+
+    """
+    n = len(ring)
+    corners = [(ring[k - 1], ring[k], ring[(k + 1) % n]) for k in range(n)]
+    if all((b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0]) <= 0
+           for a, b, c in corners):
+        # Convex polygon, use a triangle fan
+        return [(0, k, k + 1) for k in range(1, n - 1)]
+    indexes = list(range(n))
+    triangles = []
+    guard = 0
+    while len(indexes) > 3 and guard < len(indexes):
+        n = len(indexes)
+        for k in range(n):
+            a, b, c = indexes[k - 1], indexes[k], indexes[(k + 1) % n]
+            (ax, ay), (bx, by), (cx, cy) = ring[a], ring[b], ring[c]
+            cross = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+            if cross >= 0:
+                continue  # Reflex or degenerated corner
+            if any(_in_triangle(ring[p], ring[a], ring[b], ring[c])
+                   for p in indexes if p not in (a, b, c)):
+                continue
+            triangles.append((a, b, c))
+            del indexes[k]
+            guard = 0
+            break
+        else:
+            guard += 1
+    # Fall back to a triangle fan for the rest (e.g. self-intersecting polygons)
+    triangles.extend((indexes[0], indexes[k], indexes[k + 1]) for k in range(1, len(indexes) - 1))
+    return triangles
+
+
+def _in_triangle(p, a, b, c):
+    """Whether point p lies inside the clockwise triangle a, b, c."""
+    def side(p1, p2, p3):
+        return (p2[0] - p1[0]) * (p3[1] - p1[1]) - (p2[1] - p1[1]) * (p3[0] - p1[0])
+    return side(a, b, p) < 0 and side(b, c, p) < 0 and side(c, a, p) < 0
+
+
+def outline(node, segments=32):
+    """Return the outline of a 2D AST object as a clockwise ring of points.
+
+    :param node: A 2D AST object, optionally wrapped in transformations.
+    :type node: tangible.ast.AST
+    :param segments: Number of segments of a full circle (default 32).
+    :type segments: int
+    :returns: List of 2-tuples.
+    :raises: NotImplementedError if the node type is not supported.
+
+    """
+    if isinstance(node, ast.CircleSector):
+        ring = list(utils.circle_sector_points(node.radius, node.angle, segments))
+    elif isinstance(node, ast.Circle):
+        ring = utils.arc_points(node.radius, 0, 360, segments)[:-1]
+    elif isinstance(node, ast.Rectangle):
+        ring = [(0, 0), (0, node.height), (node.width, node.height), (node.width, 0)]
+    elif isinstance(node, ast.Polygon):
+        ring = [tuple(p) for p in node.points[:-1]]
+    elif isinstance(node, (ast.Translate, ast.Rotate, ast.Scale, ast.Mirror)):
+        (a, b, c, d), (e, f, g, h), _ = node.matrix()
+        ring = [(a * x + b * y + d, e * x + f * y + h) for x, y in outline(node.item, segments)]
+    else:
+        raise NotImplementedError('Tessellation of {} is not supported.'.format(
+            node.__class__.__name__))
+    if _signed_area(ring) > 0:
+        ring.reverse()
+    return ring
+
+
+def _prism(rings, heights):
+    """Connect clockwise rings at the specified heights to a closed mesh."""
+    n = len(rings[0])
+    points = []
+    for ring, z in zip(rings, heights):
+        points.extend((x, y, z) for x, y in ring)
+    triangles = []
+    for k in range(len(rings) - 1):
+        lower, upper = k * n, (k + 1) * n
+        for i in range(n):
+            j = (i + 1) % n
+            triangles.append((lower + i, lower + j, upper + j))
+            triangles.append((lower + i, upper + j, upper + i))
+    top = (len(rings) - 1) * n
+    for a, b, c in _triangulate(rings[0]):
+        triangles.append((a, c, b))
+    for a, b, c in _triangulate(rings[-1]):
+        triangles.append((top + a, top + b, top + c))
+    return Mesh(points, triangles)
+
+
+def _sphere(radius, segments):
+    stacks = max(2, segments // 2)
+    points = [(0, 0, -radius)]
+    for k in range(1, stacks):
+        phi = radians(180 * k / stacks - 90)
+        ring = utils.arc_points(radius * cos(phi), 0, 360, segments)[:-1]
+        points.extend((x, y, radius * sin(phi)) for x, y in ring)
+    points.append((0, 0, radius))
+    n, top = segments, len(points) - 1
+    triangles = [(0, 1 + (i + 1) % n, 1 + i) for i in range(n)]
+    for k in range(stacks - 2):
+        lower, upper = 1 + k * n, 1 + (k + 1) * n
+        for i in range(n):
+            j = (i + 1) % n
+            triangles.append((lower + i, lower + j, upper + j))
+            triangles.append((lower + i, upper + j, upper + i))
+    last = 1 + (stacks - 2) * n
+    triangles.extend((top, last + i, last + (i + 1) % n) for i in range(n))
+    return Mesh(points, triangles)
+
+
+def _surface(heights, base):
+    """Tessellate a height map like OpenSCAD: every cell is split into 4
+    triangles that meet at the mean height of the cell."""
+    rows, columns = len(heights), len(heights[0])
+    points = [(x, y, z) for y, row in enumerate(heights) for x, z in enumerate(row)]
+    points.extend((x, y, base) for y in range(rows) for x in range(columns))
+    bottom = rows * columns
+    triangles = []
+    for y in range(rows - 1):
+        for x in range(columns - 1):
+            a, b = y * columns + x, (y + 1) * columns + x
+            c, d = b + 1, a + 1
+            center = len(points)
+            z = (heights[y][x] + heights[y + 1][x] + heights[y + 1][x + 1] + heights[y][x + 1]) / 4
+            points.append((x + 0.5, y + 0.5, z))
+            triangles.extend([(a, b, center), (b, c, center), (c, d, center), (d, a, center)])
+            triangles.append((bottom + a, bottom + c, bottom + b))
+            triangles.append((bottom + a, bottom + d, bottom + c))
+    # The walls, clockwise when looking at the surface from above
+    ring = [y * columns for y in range(rows)]
+    ring += [(rows - 1) * columns + x for x in range(1, columns)]
+    ring += [y * columns + columns - 1 for y in range(rows - 2, -1, -1)]
+    ring += [x for x in range(columns - 2, 0, -1)]
+    for i, j in zip(ring, ring[1:] + ring[:1]):
+        triangles.append((bottom + i, bottom + j, j))
+        triangles.append((bottom + i, j, i))
+    return Mesh(points, triangles)
+
+
+def tessellate(node, segments=32):
+    """Convert an AST into a list of triangle meshes, one for each solid.
+
+    Transformations are applied to the meshes. Unions are represented by the
+    meshes of all their items. Since no boolean operations are performed, only
+    the first item of a difference or intersection is taken into account.
+
+    :param node: The AST.
+    :type node: tangible.ast.AST
+    :param segments: Number of segments of a full circle (default 32).
+    :type segments: int
+    :returns: List of :class:`Mesh` objects.
+    :raises: NotImplementedError if the AST contains unsupported node types.
+
+    """
+    meshes = []
+
+    def _tessellate(node, matrix):
+        if isinstance(node, list):
+            for item in node:
+                _tessellate(item, matrix)
+            return
+        mesh = None
+        if isinstance(node, ast.Cube):
+            rect = [(0, 0), (0, node.depth), (node.width, node.depth), (node.width, 0)]
+            mesh = _prism([rect, rect], [0, node.height])
+        elif isinstance(node, ast.Sphere):
+            mesh = _sphere(node.radius, segments)
+        elif isinstance(node, ast.Cylinder):
+            rings = [utils.arc_points(r, 0, 360, segments)[:-1]
+                     for r in (node.radius1, node.radius2)]
+            mesh = _prism(rings, [0, node.height])
+        elif isinstance(node, ast.Polyhedron):
+            mesh = Mesh.from_polyhedron(node)
+        elif isinstance(node, ast.Surface):
+            mesh = _surface(node.heights, node.base)
+        elif isinstance(node, ast.LinearExtrusion):
+            ring = outline(node.item, segments)
+            steps = max(1, int(abs(node.twist) // 5))
+            rings, heights = [], []
+            for k in range(steps + 1):
+                # A positive twist rotates clockwise
+                a = radians(-node.twist * k / steps)
+                s, c = sin(a), cos(a)
+                rings.append([(c * x - s * y, s * x + c * y) for x, y in ring])
+                heights.append(node.height * k / steps)
+            mesh = _prism(rings, heights)
+        elif isinstance(node, ast.RotateExtrusion):
+            ring = outline(node.item, segments)
+            points, triangles = [], []
+            n = len(ring)
+            for k in range(segments):
+                a = radians(360 * k / segments)
+                points.extend((x * cos(a), x * sin(a), y) for x, y in ring)
+            for k in range(segments):
+                lower, upper = k * n, ((k + 1) % segments) * n
+                for i in range(n):
+                    j = (i + 1) % n
+                    triangles.append((lower + i, upper + i, upper + j))
+                    triangles.append((lower + i, upper + j, lower + j))
+            mesh = Mesh(points, triangles)
+        elif isinstance(node, (ast.Translate, ast.Rotate, ast.Scale, ast.Mirror)):
+            _tessellate(node.item, _multiply(matrix, node.matrix()))
+        elif isinstance(node, ast.Union):
+            _tessellate(node.items, matrix)
+        elif isinstance(node, (ast.Difference, ast.Intersection)):
+            _tessellate(node.items[0], matrix)
+        else:
+            raise NotImplementedError('Tessellation of {} is not supported.'.format(
+                node.__class__.__name__))
+        if mesh is not None:
+            meshes.append(mesh if matrix == IDENTITY else mesh.transformed(matrix))
+
+    _tessellate(node, IDENTITY)
+    return meshes
+
+
+### Analysis ###
+
+def signed_volume(mesh):
+    """Return the volume enclosed by a mesh, using the divergence theorem.
+
+    The result is positive if the triangles are in clockwise order when
+    looking at them from outside, and negative if the mesh is inside out.
+
+    :param mesh: The mesh.
+    :type mesh: :class:`Mesh`
+    :rtype: float
+
+    """
+    p = mesh.points
+    volume = 0
+    for a, b, c in mesh.triangles:
+        (x1, y1, z1), (x2, y2, z2), (x3, y3, z3) = p[a], p[b], p[c]
+        volume -= x1 * (y2 * z3 - y3 * z2) - y1 * (x2 * z3 - x3 * z2) + z1 * (x2 * y3 - x3 * y2)
+    return volume / 6
+
+
+class MeshReport(object):
+    """Result of :func:`check`.
+
+    Edges are reported as 2-tuples of point coordinates.
+
+    """
+    def __init__(self):
+        #: Edges that are shared by more than two faces.
+        self.non_manifold_edges = []
+        #: Edges that belong to only one face (holes in the surface).
+        self.boundary_edges = []
+        #: Edges whose two faces have inconsistent winding order.
+        self.inconsistent_edges = []
+        #: Number of meshes whose faces all point inwards.
+        self.inverted_meshes = 0
+        #: Number of checked meshes.
+        self.mesh_count = 0
+
+    @property
+    def ok(self):
+        """Whether all meshes are closed 2-manifolds with consistent winding."""
+        return not (self.non_manifold_edges or self.boundary_edges or
+                    self.inconsistent_edges or self.inverted_meshes)
+
+    def __repr__(self):
+        return ('<MeshReport: {} meshes, {} non-manifold, {} boundary, {} inconsistent '
+                'edges, {} inverted meshes>').format(
+                    self.mesh_count, len(self.non_manifold_edges), len(self.boundary_edges),
+                    len(self.inconsistent_edges), self.inverted_meshes)
+
+
+def _check_mesh(mesh, report):
+    directed = Counter(chain.from_iterable(
+        ((a, b), (b, c), (c, a)) for a, b, c in mesh.triangles))
+    undirected = Counter()
+    for (a, b), count in directed.items():
+        undirected[(a, b) if a < b else (b, a)] += count
+    p = mesh.points
+    for (a, b), count in undirected.items():
+        if count == 1:
+            report.boundary_edges.append((p[a], p[b]))
+        elif count > 2:
+            report.non_manifold_edges.append((p[a], p[b]))
+        elif directed[(a, b)] != 1:
+            report.inconsistent_edges.append((p[a], p[b]))
+    if signed_volume(mesh) < 0:
+        report.inverted_meshes += 1
+    report.mesh_count += 1
+
+
+def check(target, segments=32):
+    """Check whether a polyhedron or all solids of an AST are closed, valid
+    2-manifolds with consistent face winding.
+
+    This detects most problems that would result in an "invalid 2-manifold"
+    error when rendering the model with a CAD tool, without actually rendering
+    it. Each solid is checked separately, intersections between different
+    solids are not detected.
+
+    :param target: The object to check.
+    :type target: :class:`Mesh`, :class:`tangible.ast.Polyhedron` or any
+        other AST object
+    :param segments: Number of segments of a full circle used to tessellate
+        round shapes (default 32).
+    :type segments: int
+    :returns: :class:`MeshReport`
+
+    """
+    if isinstance(target, Mesh):
+        meshes = [target]
+    else:
+        meshes = tessellate(target, segments)
+    report = MeshReport()
+    for mesh in meshes:
+        _check_mesh(mesh, report)
+    return report
+
+
+### Export ###
+
+_STL_FACET = struct.Struct('<12fH')
+
+
+def to_stl(meshes, header=b'tangible'):
+    """Encode meshes as binary STL file.
+
+    STL facets are in counter-clockwise order when looking at them from
+    outside, therefore the order of the points is reversed.
+
+    :param meshes: A mesh or a list of meshes.
+    :type meshes: :class:`Mesh` or list
+    :param header: The file header, at most 80 bytes.
+    :type header: bytes
+    :returns: The file contents.
+    :rtype: bytes
+
+    """
+    if isinstance(meshes, Mesh):
+        meshes = [meshes]
+    pack = _STL_FACET.pack
+    facets = []
+    for mesh in meshes:
+        p = mesh.points
+        for a, c, b in mesh.triangles:
+            (x1, y1, z1), (x2, y2, z2), (x3, y3, z3) = p[a], p[b], p[c]
+            ux, uy, uz = x2 - x1, y2 - y1, z2 - z1
+            vx, vy, vz = x3 - x1, y3 - y1, z3 - z1
+            nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+            length = sqrt(nx * nx + ny * ny + nz * nz) or 1
+            facets.append(pack(nx / length, ny / length, nz / length,
+                               x1, y1, z1, x2, y2, z2, x3, y3, z3, 0))
+    return header[:80].ljust(80, b' ') + struct.pack('<I', len(facets)) + b''.join(facets)
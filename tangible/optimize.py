@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Optimization module.
+
+This module provides passes that restructure an AST so that it can be rendered
+faster by a CAD tool, without changing the resulting geometry.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from . import ast, mesh
+
+
+EPSILON = 1e-9
+
+
+### Overlap analysis ###
+
+def overlapping_pairs(items, touching=False):
+    """Find all pairs of objects whose bounding boxes overlap.
+
+    The bounding boxes are sorted along the X axis and swept, so that only
+    objects that overlap on the X axis are compared. Objects whose bounding
+    boxes don't overlap are guaranteed to be disjoint.
+
+    :param items: List of AST objects.
+    :type items: list
+    :param touching: Whether objects that only touch each other (e.g. two
+        adjacent cubes) count as overlapping (default ``False``).
+    :type touching: bool
+    :returns: Sorted list of ``(i, j)`` index pairs with ``i < j``.
+    :rtype: list of 2-tuples
+
+    """
+    if touching:
+        before = lambda a, b: a <= b + EPSILON
+    else:
+        before = lambda a, b: a < b - EPSILON
+    boxes = [item.bounds() for item in items]
+    pairs = []
+    active = []
+    for i in sorted(range(len(boxes)), key=lambda i: boxes[i].xmin):
+        box = boxes[i]
+        active = [j for j in active if before(box.xmin, boxes[j].xmax)]
+        for j in active:
+            other = boxes[j]
+            if not (before(box.ymin, other.ymax) and before(other.ymin, box.ymax)):
+                continue
+            flat = box.zmin == box.zmax and other.zmin == other.zmax
+            if flat or (before(box.zmin, other.zmax) and before(other.zmin, box.zmax)):
+                pairs.append((min(i, j), max(i, j)))
+        active.append(i)
+    return sorted(pairs)
+
+
+### Disjoint unions ###
+
+def _is_polygonal(node):
+    """Whether a 2D object is bounded by straight lines only."""
+    if isinstance(node, (ast.Rectangle, ast.Polygon)):
+        return True
+    if isinstance(node, ast.TRANSFORMATIONS):
+        return _is_polygonal(node.item)
+    return False
+
+
+def _is_polyhedral(node):
+    """Whether a 3D object is bounded by flat faces only, so that it can be
+    converted into a polyhedron without approximation."""
+    if isinstance(node, (ast.Cube, ast.Polyhedron)):
+        return True
+    if isinstance(node, ast.TRANSFORMATIONS):
+        return _is_polyhedral(node.item)
+    if isinstance(node, ast.LinearExtrusion):
+        return not node.twist and _is_polygonal(node.item)
+    return False
+
+
+def _concatenate(items):
+    """Concatenate the meshes of the items into a single polyhedron."""
+    points = []
+    triangles = []
+    for m in mesh.tessellate(items):
+        offset = len(points)
+        points.extend(m.points)
+        triangles.extend((a + offset, b + offset, c + offset) for a, b, c in m.triangles)
+    return ast.Polyhedron(points=points, triangles=triangles)
+
+
+def _separated_groups(items):
+    """Split the items into groups of objects whose bounding boxes are
+    strictly separated, i.e. no two objects of a group touch each other.
+
+    The objects are colored greedily: Every object is put into the first
+    group that contains none of the objects it touches.
+
+    """
+    touching = [set() for item in items]
+    for i, j in overlapping_pairs(items, touching=True):
+        touching[i].add(j)
+        touching[j].add(i)
+    groups = []
+    for i in range(len(items)):
+        for group in groups:
+            if not touching[i].intersection(group):
+                group.append(i)
+                break
+        else:
+            groups.append([i])
+    return [[items[i] for i in group] for group in groups]
+
+
+def merge_disjoint(node):
+    """Remove unions whose children don't overlap.
+
+    CAD tools like OpenSCAD process unions with expensive boolean operations,
+    even if the children are disjoint, like adjacent bars or stacked tower
+    layers. This pass resolves such unions (and distributes transformations
+    over them) into a flat list of objects that only touch each other.
+
+    Objects with flat faces are concatenated into polyhedra. A polyhedron
+    only contains objects whose bounding boxes are strictly separated,
+    because touching objects would share faces and edges, which is not a
+    valid 2-manifold. For example, the bars of a row end up in two polyhedra
+    (every other bar). The remaining objects are returned as separate
+    objects.
+
+    Unions inside a difference or an intersection are not modified. Like in
+    OpenSCAD, the objects of the resulting list are implicitly unified. They
+    may touch each other, therefore the result is intended for tools that
+    don't apply boolean operations to top level objects, like slicers or
+    OpenSCAD with the *lazy-union* feature enabled.
+
+    :param node: The AST object.
+    :type node: :class:`tangible.ast.AST`
+    :returns: List of top level objects.
+    :rtype: list
+
+    """
+    items = _merge(node)
+    polyhedral = [item for item in items if _is_polyhedral(item)]
+    if len(polyhedral) < 2:
+        return items
+    merged = [group[0] if len(group) == 1 else _concatenate(group)
+              for group in _separated_groups(polyhedral)]
+    return merged + [item for item in items if not _is_polyhedral(item)]
+
+
+def _merge(node):
+    return ast.flatten_unions(node, lambda union: not overlapping_pairs(union.items))
+
+
+### Balanced boolean operations ###
+
+def _group(items, cls, fanin):
+    """Split the items into ``fanin`` spatially coherent groups, recursively.
+
+    The items are sorted by the center of their bounding box along the axis
+    with the largest spread and split into groups of equal size.
+
+    """
+    if len(items) <= fanin:
+        return items
+    centers = [item.bounds().center for item in items]
+    spread = lambda axis: max(c[axis] for c in centers) - min(c[axis] for c in centers)
+    axis = max(range(3), key=spread)
+    order = sorted(range(len(items)), key=lambda i: centers[i][axis])
+    edges = [i * len(items) // fanin for i in range(fanin + 1)]
+    groups = []
+    for a, b in zip(edges[:-1], edges[1:]):
+        group = [items[i] for i in order[a:b]]
+        groups.append(group[0] if len(group) == 1 else cls(_group(group, cls, fanin)))
+    return groups
+
+
+def balance(node, fanin=2):
+    """Regroup large boolean operations into balanced trees.
+
+    OpenSCAD processes the children of a boolean operation one after another,
+    every operation involves the accumulated result. For large operations it
+    is considerably faster to combine nearby objects first. This pass splits
+    unions and intersections with more than ``fanin`` children into balanced
+    subtrees of spatially coherent groups. For differences, the subtracted
+    objects are combined into a balanced union.
+
+    :param node: The AST object.
+    :type node: :class:`tangible.ast.AST`
+    :param fanin: The maximum number of children of a boolean operation
+        (default 2).
+    :type fanin: int
+    :returns: The restructured AST. Unmodified subtrees are shared with the
+        original AST.
+    :raises: ValueError if ``fanin`` is smaller than 2.
+
+    """
+    if fanin < 2:
+        raise ValueError('fanin must be >= 2.')
+    return _balance(node, fanin)
+
+
+def _balance(node, fanin):
+    if isinstance(node, ast._BooleanOperation):
+        items = [_balance(item, fanin) for item in node.items]
+        if isinstance(node, ast.Difference):
+            if len(items) - 1 > fanin:
+                items = [items[0], ast.Union(_group(items[1:], ast.Union, fanin))]
+            return ast.Difference(items)
+        return node.__class__(_group(items, node.__class__, fanin))
+    if hasattr(node, 'item'):
+        item = _balance(node.item, fanin)
+        return node if item is node.item else ast.with_item(node, item)
+    return node
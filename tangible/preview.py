@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Preview module.
+
+This module renders shaded PNG previews of a model without OpenSCAD. The AST
+is tessellated (see :mod:`tangible.mesh`), projected orthographically and
+rasterized with a z-buffer. Boolean operations are not evaluated, so
+differences and intersections are shown as their first item.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import multiprocessing
+import struct
+import zlib
+from math import sin, cos, radians, sqrt, ceil, floor
+
+from . import ast, mesh
+
+
+# OpenSCAD preview colors
+COLOR = (249, 215, 44)
+BACKGROUND = (255, 255, 255)
+
+# Direction of the light in view coordinates (from the top left, towards the
+# viewer)
+_LIGHT = (-0.3, 0.5, -1)
+
+
+### PNG encoding ###
+
+def _chunk(kind, data):
+    chunk = kind + data
+    return struct.pack('>I', len(data)) + chunk + struct.pack('>I', zlib.crc32(chunk) & 0xffffffff)
+
+
+def encode_png(width, height, pixels):
+    """Encode an RGB image as PNG file.
+
+    :param width: The image width.
+    :type width: int
+    :param height: The image height.
+    :type height: int
+    :param pixels: The pixels as ``width * height * 3`` bytes, row by row.
+    :type pixels: bytearray
+    :returns: The file contents.
+    :rtype: bytes
+
+    """
+    stride = width * 3
+    raw = b''.join(b'\x00' + bytes(pixels[y * stride:(y + 1) * stride]) for y in range(height))
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        _chunk(b'IDAT', zlib.compress(raw, 6)),
+        _chunk(b'IEND', b''),
+    ])
+
+
+### Rasterization ###
+
+def _project(points, azimuth, elevation):
+    """Project points into view coordinates ``(right, up, depth)``.
+
+    The camera looks at the model from the front (negative Y), rotated around
+    the Z axis by ``azimuth`` and tilted down by ``elevation`` degrees.
+
+    """
+    sa, ca = sin(radians(azimuth)), cos(radians(azimuth))
+    se, ce = sin(radians(elevation)), cos(radians(elevation))
+    projected = []
+    for x, y, z in points:
+        x, y = ca * x - sa * y, sa * x + ca * y
+        projected.append((x, z * ce + y * se, y * ce - z * se))
+    return projected
+
+
+def _shade(a, b, c):
+    """Return the brightness of a triangle in view coordinates, between 0.35
+    and 1. Both sides of a triangle are lit equally."""
+    ux, uy, uz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    vx, vy, vz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+    length = sqrt(nx * nx + ny * ny + nz * nz) * sqrt(sum(v * v for v in _LIGHT))
+    if not length:
+        return 0.35
+    return 0.35 + 0.65 * abs(nx * _LIGHT[0] + ny * _LIGHT[1] + nz * _LIGHT[2]) / length
+
+
+def _rasterize(triangles, width, height, color, background):
+    """Draw triangles given in pixel coordinates ``(x, y, depth)`` with a
+    z-buffer, using scanlines through the pixel centers.
+
+    :param triangles: List of ``(a, b, c, brightness)`` tuples.
+    :returns: The pixels as bytearray.
+
+    """
+    pixels = bytearray(bytes(bytearray(background)) * (width * height))
+    zbuffer = [float('inf')] * (width * height)
+    for a, b, c, brightness in triangles:
+        # Depth plane: depth = dx * x + dy * y + d0
+        ux, uy, uz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+        vx, vy, vz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+        det = ux * vy - uy * vx
+        if abs(det) < 1e-12:
+            continue  # Seen edge-on
+        dx = (uz * vy - vz * uy) / det
+        dy = (vz * ux - uz * vx) / det
+        d0 = a[2] - dx * a[0] - dy * a[1]
+        rgb = bytearray(int(channel * brightness) for channel in color)
+        edges = [(a, b), (b, c), (c, a)]
+        top = max(0, int(ceil(min(a[1], b[1], c[1]) - 0.5)))
+        bottom = min(height - 1, int(floor(max(a[1], b[1], c[1]) - 0.5)))
+        for row in range(top, bottom + 1):
+            yc = row + 0.5
+            xs = [p[0] + (yc - p[1]) * (q[0] - p[0]) / (q[1] - p[1])
+                  for p, q in edges if min(p[1], q[1]) <= yc <= max(p[1], q[1]) and p[1] != q[1]]
+            if not xs:
+                continue
+            left = max(0, int(ceil(min(xs) - 0.5)))
+            right = min(width - 1, int(floor(max(xs) - 0.5)))
+            depth = dx * (left + 0.5) + dy * yc + d0
+            offset = row * width
+            for column in range(left, right + 1):
+                i = offset + column
+                if depth < zbuffer[i]:
+                    zbuffer[i] = depth
+                    pixels[i * 3:i * 3 + 3] = rgb
+                depth += dx
+    return pixels
+
+
+def render(target, size=(400, 260), azimuth=-25, elevation=35, color=COLOR,
+           background=BACKGROUND, segments=24, margin=0.05):
+    """Render a shaded preview of a model as PNG image.
+
+    :param target: The shape or 3D AST object.
+    :param size: The ``(width, height)`` of the image in pixels (default
+        400x260, like the pictures in the documentation).
+    :type size: 2-tuple
+    :param azimuth: Rotation of the model around the Z axis in degrees
+        (default -25).
+    :type azimuth: int or float
+    :param elevation: Angle between the view direction and the XY plane in
+        degrees (default 35).
+    :type elevation: int or float
+    :param color: The RGB color of the model.
+    :type color: 3-tuple
+    :param background: The RGB background color.
+    :type background: 3-tuple
+    :param segments: Number of segments of a full circle (default 24).
+    :type segments: int
+    :param margin: The empty border around the model, relative to the image
+        size (default 0.05).
+    :type margin: float
+    :returns: The PNG file contents.
+    :rtype: bytes
+    :raises: NotImplementedError if the AST contains unsupported node types.
+
+    """
+    node = target if isinstance(target, ast.AST) else target._build_ast()
+    width, height = size
+    meshes = [(_project(m.points, azimuth, elevation), m.triangles)
+              for m in mesh.tessellate(node, segments)]
+
+    # Fit the model into the image
+    points = [p for projected, _ in meshes for p in projected]
+    if points:
+        left, right = min(p[0] for p in points), max(p[0] for p in points)
+        low, high = min(p[1] for p in points), max(p[1] for p in points)
+        scale = min(width * (1 - 2 * margin) / ((right - left) or 1),
+                    height * (1 - 2 * margin) / ((high - low) or 1))
+        x0 = (width - (right - left) * scale) / 2 - left * scale
+        y0 = (height - (high - low) * scale) / 2 + high * scale
+
+    triangles = []
+    for projected, indexes in meshes:
+        pixels = [(x0 + x * scale, y0 - y * scale, depth) for x, y, depth in projected]
+        for i, j, k in indexes:
+            a, b, c = projected[i], projected[j], projected[k]
+            triangles.append((pixels[i], pixels[j], pixels[k], _shade(a, b, c)))
+    return encode_png(width, height, _rasterize(triangles, width, height, color, background))
+
+
+def save(target, path, **kwargs):
+    """Render a preview (see :func:`render`) and write it to a file.
+
+    :param target: The shape or 3D AST object.
+    :param path: The path of the PNG file.
+    :type path: str
+
+    """
+    with open(path, 'wb') as f:
+        f.write(render(target, **kwargs))
+
+
+def _render_job(args):
+    target, kwargs = args
+    return render(target, **kwargs)
+
+
+def render_many(targets, processes=None, **kwargs):
+    """Render previews of many models in parallel worker processes.
+
+    :param targets: The shapes or 3D AST objects.
+    :type targets: list
+    :param processes: The number of worker processes (default: number of
+        CPUs).
+    :type processes: int
+    :param kwargs: Additional arguments for :func:`render`.
+    :returns: List of PNG file contents, in the order of the targets.
+    :rtype: list of bytes
+
+    """
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_render_job, [(target, kwargs) for target in targets])
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling module.
+
+This module records where the time goes when a shape is rendered. The render
+process is divided into phases:
+
+============ ==============================================================
+``init``     :class:`tangible.shapes.base.Shape` constructor: conversion
+             and downsampling of the data
+``build``    Building the AST, including the validation of the AST nodes
+``generate`` Code generation by the backend, in total
+``program``  OpenSCAD backend: building the program structure from the AST
+``code``     OpenSCAD backend: converting the program structure into code
+============ ==============================================================
+
+The ``init`` phase doesn't include the validation in the constructors of the
+shape classes and their mixins (e.g. the number of datasets), which runs
+before the base class constructor.
+
+Profiling is disabled by default and costs (almost) nothing in that case.
+It's enabled by registering a hook, which is called with a :class:`Profile`
+after every call to :meth:`tangible.shapes.base.BaseShape.render` (or
+:meth:`~tangible.shapes.base.BaseShape.save`), or with
+the :func:`profile` context manager.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import logging
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from timeit import default_timer
+
+
+_hooks = []
+_local = threading.local()
+
+
+class Profile(object):
+    """The recorded statistics of a render.
+
+    :ivar shape: Name of the shape class.
+    :ivar backend: Name of the backend class (or of the type of the backend
+        callable, e.g. ``partial``).
+    :ivar phases: Wall time in seconds per phase, in the order the phases were
+        entered. Phases that are entered repeatedly are summed up.
+    :ivar node_counts: Number of nodes per AST type.
+    :ivar output_bytes: Size of the generated code in bytes (UTF-8).
+    :ivar peak_memory: Peak size of the memory allocated while profiling in
+        bytes, if memory tracing was enabled. Otherwise ``None``.
+
+    """
+    def __init__(self):
+        self.shape = None
+        self.backend = None
+        self.phases = OrderedDict()
+        self.node_counts = Counter()
+        self.output_bytes = 0
+        self.peak_memory = None
+
+    @property
+    def total(self):
+        """Total time of the top level phases (``init``, ``build`` and
+        ``generate``) in seconds."""
+        return sum(t for name, t in self.phases.items() if name in ('init', 'build', 'generate'))
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def as_dict(self):
+        """Return the profile as a JSON serializable dictionary, e.g. for a
+        metrics sink."""
+        return {
+            'shape': self.shape,
+            'backend': self.backend,
+            'phases': dict(self.phases),
+            'nodes': sum(self.node_counts.values()),
+            'node_counts': dict(self.node_counts),
+            'output_bytes': self.output_bytes,
+            'peak_memory': self.peak_memory,
+        }
+
+    def __repr__(self):
+        phases = ', '.join('{} {:.3f}s'.format(name, t) for name, t in self.phases.items())
+        return '<Profile {}: {}, {} nodes, {} bytes>'.format(
+            self.shape, phases, sum(self.node_counts.values()), self.output_bytes)
+
+
+### Hooks ###
+
+def add_hook(callback, memory=False):
+    """Register a callback that is called with a :class:`Profile` after every
+    render.
+
+    :param callback: The callable.
+    :param memory: Whether to trace the peak memory allocation with
+        :mod:`tracemalloc` (default ``False``). This slows down rendering
+        considerably.
+    :type memory: bool
+
+    """
+    _hooks.append((callback, memory))
+
+
+def remove_hook(callback):
+    """Remove a previously registered callback."""
+    _hooks[:] = [(c, m) for c, m in _hooks if c != callback]
+
+
+def log_hook(logger=None, level=logging.INFO):
+    """Return a hook that writes every profile to a logger.
+
+    Example::
+
+        >>> profiling.add_hook(profiling.log_hook())
+
+    :param logger: The logger (default: ``tangible.profiling``).
+    :type logger: :class:`logging.Logger`
+    :param level: The log level (default ``INFO``).
+    :type level: int
+
+    """
+    logger = logger or logging.getLogger(__name__)
+
+    def hook(profile):
+        logger.log(level, '%r', profile)
+    return hook
+
+
+def enabled():
+    """Whether profiling is enabled in the current thread."""
+    return bool(_hooks) or getattr(_local, 'profile', None) is not None
+
+
+### Recording ###
+
+class _Phase(object):
+    """Context manager that records the wall time of a phase."""
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = default_timer()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profile.add_phase(self.name, default_timer() - self.start)
+
+
+class _NullPhase(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(name):
+    """Return a context manager that records the wall time of a phase in the
+    current profile. Does nothing if profiling is disabled.
+
+    :param name: The name of the phase.
+    :type name: str
+
+    """
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return _NULL_PHASE
+    return _Phase(profile, name)
+
+
+def _start_memory_trace():
+    import tracemalloc
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    elif hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    return started
+
+
+def _stop_memory_trace(started):
+    import tracemalloc
+    peak = tracemalloc.get_traced_memory()[1]
+    if started:
+        tracemalloc.stop()
+    return peak
+
+
+@contextmanager
+def profile(memory=False):
+    """Record a profile of everything that happens within the context in the
+    current thread, including the initialization of shapes::
+
+        >>> with profiling.profile() as p:
+        ...     shape = BarsND(data, 5, 5)
+        ...     code = shape.render(OpenScadBackend)
+        >>> p.phases
+        OrderedDict([('init', 0.001), ('build', 0.01), ...])
+
+    The registered hooks are called with the profile at the end.
+
+    :param memory: Whether to trace the peak memory allocation with
+        :mod:`tracemalloc` (default ``False``).
+    :type memory: bool
+    :returns: The :class:`Profile`.
+
+    """
+    if getattr(_local, 'profile', None) is not None:
+        raise RuntimeError('Profiles cannot be nested.')
+    result = Profile()
+    memory = memory or any(m for _, m in _hooks)
+    started = _start_memory_trace() if memory else None
+    _local.profile = result
+    try:
+        yield result
+    finally:
+        _local.profile = None
+        if memory:
+            result.peak_memory = _stop_memory_trace(started)
+    for callback, _ in list(_hooks):
+        callback(result)
+
+
+def _count_nodes(node, counter):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        counter[node.__class__.__name__] += 1
+        if hasattr(node, 'items'):
+            stack.extend(node.items)
+        elif hasattr(node, 'item'):
+            stack.append(node.item)
+
+
+def _render(shape, backend):
+    """Build the AST of a shape and generate code with profiling, see
+    :meth:`tangible.shapes.base.BaseShape._generate`.
+
+    :returns: The backend instance and the source code.
+
+    """
+    current = getattr(_local, 'profile', None)
+    if current is None:
+        with profile() as current:
+            return _render(shape, backend)
+    current.shape = shape.__class__.__name__
+    current.backend = getattr(backend, '__name__', type(backend).__name__)
+    with phase('build'):
+        tree = shape._build_ast()
+    _count_nodes(tree, current.node_counts)
+    with phase('generate'):
+        instance = backend(tree)
+        code = instance.generate()
+    current.output_bytes += len(code.encode('utf-8'))
+    return instance, code
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Runner module.
+
+This module renders generated programs with an external tool like OpenSCAD.
+The number of concurrently running renderer processes is bounded, slow
+renders can be aborted with a timeout, and the outputs are cached by the hash
+of the program.
+
+On Python 2, the ``futures`` backport of :mod:`concurrent.futures` is
+required.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import hashlib
+import io
+import multiprocessing
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+DEFAULT_COMMAND = 'openscad -o {output} {input}'
+
+
+class RenderError(Exception):
+    """Raised if the renderer fails.
+
+    :ivar returncode: The exit status of the renderer.
+    :ivar stderr: The error output of the renderer.
+
+    """
+    def __init__(self, message, returncode=None, stderr=''):
+        super(RenderError, self).__init__(message)
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+class RenderTimeout(RenderError):
+    """Raised if the renderer doesn't finish in time."""
+
+
+def _chain(job, future):
+    """Copy the outcome of a finished job to the future of a caller, unless
+    the caller has cancelled it."""
+    if job.cancelled():
+        future.cancel()
+    elif future.set_running_or_notify_cancel():
+        if job.exception() is not None:
+            future.set_exception(job.exception())
+        else:
+            future.set_result(job.result())
+
+
+def _encode(content):
+    return content if isinstance(content, bytes) else content.encode('utf-8')
+
+
+def _program(program):
+    """Return the code and the sidecar files of a program, which is either
+    source code or a backend instance."""
+    if hasattr(program, 'generate'):
+        code = program.generate()
+        return code, dict(getattr(program, 'sidecars', {}))
+    return program, {}
+
+
+class Runner(object):
+    """Render programs with an external command in a bounded pool of worker
+    processes.
+
+    Example::
+
+        >>> with Runner(timeout=60) as runner:
+        ...     stl = runner.run(OpenScadBackend(shape._build_ast()))
+
+    :ivar hits: Number of programs served from the cache (including programs
+        that were being rendered already).
+    :ivar misses: Number of rendered programs.
+
+    """
+    def __init__(self, command=DEFAULT_COMMAND, suffix='.stl', workers=None, timeout=None,
+                 cache_size=128):
+        """
+        :param command: The render command. ``{input}`` is replaced by the
+            path of the program file and ``{output}`` by the path of the
+            output file. The command is run in the directory of the program.
+        :type command: str
+        :param suffix: The suffix of the output file (default ``.stl``).
+        :type suffix: str
+        :param workers: The maximum number of concurrently running renderer
+            processes (default: number of CPUs).
+        :type workers: int
+        :param timeout: The maximum render time in seconds (default ``None``,
+            no timeout).
+        :type timeout: int or float
+        :param cache_size: The maximum number of cached outputs (default
+            128). The least recently used outputs are evicted first.
+        :type cache_size: int
+        :raises: ValueError if validation fails.
+
+        """
+        if workers is not None and workers < 1:
+            raise ValueError('workers must be >= 1.')
+        if timeout is not None and timeout <= 0:
+            raise ValueError('timeout must be > 0.')
+        if cache_size < 0:
+            raise ValueError('cache_size must be >= 0.')
+        self.command = command
+        self.suffix = suffix
+        self.workers = workers or multiprocessing.cpu_count()
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Wait for all running renders and shut the pool down."""
+        self._executor.shutdown(wait=True)
+
+    def clear_cache(self):
+        """Remove all outputs from the cache."""
+        with self._lock:
+            self._cache.clear()
+
+    def _key(self, code, sidecars):
+        """Return the hash of a program, including the render settings."""
+        sha = hashlib.sha1()
+        for part in [self.command, self.suffix, code]:
+            sha.update(_encode(part) + b'\0')
+        for filename, content in sorted(sidecars.items()):
+            sha.update(_encode(filename) + b'\0' + _encode(content) + b'\0')
+        return sha.hexdigest()
+
+    def submit(self, program):
+        """Schedule a program for rendering.
+
+        :param program: The source code, or a backend instance with a
+            ``generate()`` method. The sidecar files of a backend (see
+            :class:`tangible.backends.openscad.OpenScadBackend`) are written
+            next to the program.
+        :returns: A future of the output file contents. Its result raises
+            :class:`RenderError` if rendering failed.
+        :rtype: :class:`concurrent.futures.Future`
+
+        """
+        code, sidecars = _program(program)
+        key = self._key(code, sidecars)
+        future = Future()
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                output = self._cache.pop(key)
+                self._cache[key] = output
+                future.set_result(output)
+                return future
+            pending = key in self._pending
+            if pending:
+                self.hits += 1
+                job = self._pending[key]
+                self._waiters[key] += 1
+            else:
+                self.misses += 1
+                job = self._executor.submit(self._render, code, sidecars)
+                self._pending[key] = job
+                self._waiters[key] = 1
+        if not pending:
+            job.add_done_callback(lambda f: self._finish(key, f))
+        # Every caller gets its own future, so that cancelling it doesn't
+        # affect the other callers of the same job.
+        future.add_done_callback(lambda f: f.cancelled() and self._cancel(key, job))
+        job.add_done_callback(lambda f: _chain(f, future))
+        return future
+
+    def _cancel(self, key, job):
+        """Cancel a job once all of its callers have cancelled their
+        futures."""
+        with self._lock:
+            if self._pending.get(key) is not job:
+                return
+            self._waiters[key] -= 1
+            if self._waiters[key]:
+                return
+            del self._pending[key], self._waiters[key]
+        job.cancel()
+
+    def _finish(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key], self._waiters[key]
+            if future.cancelled() or future.exception() is not None or not self.cache_size:
+                return
+            self._cache[key] = future.result()
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _render(self, code, sidecars):
+        directory = tempfile.mkdtemp(prefix='tangible-')
+        try:
+            source = os.path.join(directory, 'model.scad')
+            output = os.path.join(directory, 'model' + self.suffix)
+            with io.open(source, 'wb') as f:
+                f.write(_encode(code))
+            for filename, content in sidecars.items():
+                with io.open(os.path.join(directory, filename), 'wb') as f:
+                    f.write(_encode(content))
+
+            args = [arg.format(input=source, output=output) for arg in shlex.split(self.command)]
+            try:
+                process = subprocess.Popen(args, cwd=directory,
+                                           stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except OSError as e:
+                raise RenderError('Could not start renderer: {}'.format(e))
+            timed_out = []
+            timer = None
+            if self.timeout is not None:
+                def kill():
+                    timed_out.append(True)
+                    process.kill()
+                timer = threading.Timer(self.timeout, kill)
+                timer.start()
+            try:
+                _, stderr = process.communicate()
+            finally:
+                if timer is not None:
+                    timer.cancel()
+            stderr = stderr.decode('utf-8', 'replace')
+
+            if timed_out:
+                raise RenderTimeout('Rendering took longer than {} seconds.'.format(
+                    self.timeout), process.returncode, stderr)
+            if process.returncode != 0:
+                raise RenderError('Renderer exited with status {}.'.format(process.returncode),
+                                  process.returncode, stderr)
+            if not os.path.exists(output):
+                raise RenderError('Renderer did not create an output file.', 0, stderr)
+            with io.open(output, 'rb') as f:
+                return f.read()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run(self, program):
+        """Render a program and wait for the result.
+
+        :param program: See :meth:`submit`.
+        :returns: The contents of the output file.
+        :rtype: bytes
+        :raises: :class:`RenderError` if rendering failed.
+
+        """
+        return self.submit(program).result()
+
+    def map(self, programs):
+        """Render several programs concurrently and wait for the results.
+
+        :param programs: See :meth:`submit`.
+        :type programs: list
+        :returns: List of output file contents, in the order of the programs.
+        :rtype: list of bytes
+        :raises: :class:`RenderError` if rendering of a program failed.
+
+        """
+        futures = [self.submit(program) for program in programs]
+        return [future.result() for future in futures]
+
+    def run_async(self, program):
+        """Render a program without blocking the asyncio event loop.
+
+        Must be called from a running event loop. Cancelling the returned
+        future cancels the render job only if no other caller waits for the
+        same program and the job hasn't started yet::
+
+            >>> stl = await runner.run_async(code)
+
+        :param program: See :meth:`submit`.
+        :returns: An awaitable future of the output file contents.
+        :rtype: :class:`asyncio.Future`
+
+        """
+        import asyncio
+        return asyncio.wrap_future(self.submit(program))
@@ -1 +1 @@
-from . import base, vertical, bars, pie
+from . import base, vertical, bars, pie, surface
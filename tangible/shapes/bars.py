@@ -18,13 +18,27 @@ class BarsShape(Shape):
     :type bar_width: int or float
     :param bar_depth: The depth of each bar.
     :type bar_depth: int or float
+    :param max_elements: Maximum number of bars per dataset. Longer datasets
+        are downsampled (default ``None``).
+    :type max_elements: int
+    :param downsampling: The downsampling method (default ``mean``).
+    :type downsampling: str
 
     """
-    def __init__(self, data, bar_width, bar_depth):
-        super(BarsShape, self).__init__(data)
+    def __init__(self, data, bar_width, bar_depth, max_elements=None, downsampling='mean'):
+        super(BarsShape, self).__init__(data, max_elements=max_elements,
+                downsampling=downsampling)
         self.bar_width = bar_width
         self.bar_depth = bar_depth
 
+    def _build_bars(self, dataset):
+        """Return a union of bars for a single dataset, aligned next to each
+        other along the X axis."""
+        width, depth = self.bar_width, self.bar_depth
+        Translate, Cube = ast.Translate, ast.Cube
+        return ast.Union([Translate(i * width, 0, 0, Cube(width, datapoint, depth))
+                          for i, datapoint in enumerate(dataset)])
+
 
 ### SHAPE CLASSES ###
 
@@ -32,12 +46,7 @@ class Bars1D(Data1DMixin, BarsShape):
     """Vertical bars aligned next to each other horizontally. Datapoints are
     mapped to bar height."""
     def _build_ast(self):
-        bars = []
-        for i, datapoint in enumerate(self.data[0]):
-            bar = ast.Cube(width=self.bar_width, height=datapoint, depth=self.bar_depth)
-            translated_bar = ast.Translate(x=i * self.bar_width, y=0, z=0, item=bar)
-            bars.append(translated_bar)
-        model = ast.Union(items=bars)
+        model = self._build_bars(self.data[0])
         # Center model
         x_offset = len(self.data) / 2 * self.bar_width
         return ast.Translate(x=-x_offset, y=0, z=0, item=model)
@@ -47,23 +56,26 @@ class BarsND(DataNDMixin, BarsShape):
     """Vertical bars aligned next to each other horizontally. Datapoints are
     mapped to bar height. Multiple layers of bars (matching number of
     datasets)."""
-    def __init__(self, data, bar_width, bar_depth, center_layers=False):
+    def __init__(self, data, bar_width, bar_depth, center_layers=False,
+                 max_elements=None, downsampling='mean'):
         """
         :param center_layers: Whether or not to center the layers
             horizontally (default False).
         :type center_layers: bool
 
         """
-        super(BarsND, self).__init__(data, bar_width, bar_depth)
+        super(BarsND, self).__init__(data, bar_width, bar_depth,
+                max_elements=max_elements, downsampling=downsampling)
         self.center_layers = center_layers
 
     def _build_ast(self):
+        # The layers are built directly instead of through a Bars1D shape per
+        # dataset, which would validate the data again for every layer.
         layers = []
-        for i, month in enumerate(self.data):
-            bars1d = Bars1D(month, self.bar_width, self.bar_depth)
-            layer = bars1d._build_ast()
-            if not self.center_layers:
-                layer = layer.item
+        for i, dataset in enumerate(self.data):
+            layer = self._build_bars(dataset)
+            if self.center_layers:
+                layer = ast.Translate(x=-self.bar_width / 2, y=0, z=0, item=layer)
 
             # Hack: Used to prevent "invalid 2-manifold" error
             # TODO: should probably be in backend
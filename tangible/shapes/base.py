@@ -1,7 +1,108 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import, unicode_literals
 
-from .. import utils
+import io
+import os
+
+from .. import profiling, utils
+from ..downsample import downsample_datasets
+
+
+def _render(shape, backend):
+    """Render a shape. Defined at module level, so that it can be run in a
+    process pool."""
+    return shape.render(backend)
+
+
+def _check_sidecars(backend):
+    """Make sure that the generated code doesn't reference sidecar files,
+    which would be lost."""
+    sidecars = getattr(backend, 'sidecars', None)
+    if sidecars:
+        msg = 'The code references sidecar files ({}), use save() to write them.'
+        raise ValueError(msg.format(', '.join(sorted(sidecars))))
+
+
+class _ChunkStream(object):
+    """Asynchronous iterator over the generated code of a shape, see
+    :meth:`BaseShape.render_stream`.
+
+    The chunks are generated one after another in an executor. Generation
+    stops as soon as the iteration is cancelled.
+
+    """
+    def __init__(self, shape, backend, executor, chunk_size):
+        self._shape = shape
+        self._backend = backend
+        self._executor = executor
+        self._chunk_size = chunk_size
+        self._instance = None
+        self._pieces = None
+        self._stopped = False
+
+    def __aiter__(self):
+        return self
+
+    def _next_chunk(self):
+        """Generate the next chunk of code, an empty string at the end."""
+        if self._pieces is None:
+            self._instance = self._backend(self._shape._build_ast())
+            if hasattr(self._instance, 'iter_generate'):
+                self._pieces = iter(self._instance.iter_generate())
+            else:
+                self._pieces = iter([self._instance.generate()])
+        chunk = []
+        size = 0
+        for piece in self._pieces:
+            if self._stopped:
+                break
+            chunk.append(piece)
+            size += len(piece)
+            if size >= self._chunk_size:
+                break
+        else:
+            _check_sidecars(self._instance)
+        return ''.join(chunk)
+
+    def __anext__(self):
+        import asyncio
+        loop = asyncio.get_event_loop()
+        result = loop.create_future()
+        if self._stopped:
+            result.set_exception(StopAsyncIteration())
+            return result
+        job = loop.run_in_executor(self._executor, self._next_chunk)
+
+        def done(job):
+            if result.cancelled():
+                return
+            if job.cancelled():
+                result.cancel()
+            elif job.exception() is not None:
+                self._stopped = True
+                result.set_exception(job.exception())
+            elif not job.result():
+                self._stopped = True
+                result.set_exception(StopAsyncIteration())
+            else:
+                result.set_result(job.result())
+
+        def cancelled(result):
+            if result.cancelled():
+                self._stopped = True
+                job.cancel()
+
+        job.add_done_callback(done)
+        result.add_done_callback(cancelled)
+        return result
+
+    def aclose(self):
+        """Stop generating code."""
+        import asyncio
+        self._stopped = True
+        result = asyncio.get_event_loop().create_future()
+        result.set_result(None)
+        return result
 
 
 class BaseShape(object):
@@ -14,16 +115,161 @@ class BaseShape(object):
     def _build_ast(self):
         raise NotImplementedError('_build_ast method not implemented.')
 
+    def _generate(self, backend):
+        """Build the AST_ and generate code, with profiling if enabled.
+
+        :returns: The backend instance and the source code.
+
+        """
+        if profiling.enabled():
+            return profiling._render(self, backend)
+        instance = backend(self._build_ast())
+        return instance, instance.generate()
+
     def render(self, backend):
         """Build the AST_ and generate code using the selected backend_.
 
         :param backend: The backend_ class used to process the AST_. Must accept
             the AST as constructor argument and provide a ``generate()`` method.
         :returns: The resulting source code as a string.
+        :raises: ValueError if the code references sidecar files (e.g. the data
+            file of a surface), use :meth:`save` in that case.
+
+        """
+        instance, code = self._generate(backend)
+        _check_sidecars(instance)
+        return code
+
+    def save(self, path, backend):
+        """Build the AST_, generate code using the selected backend_ and write
+        it to a file.
+
+        The sidecar files of the backend (see
+        :class:`tangible.backends.openscad.OpenScadBackend`) are written into
+        the same directory.
+
+        :param path: The path of the output file.
+        :type path: str
+        :param backend: The backend_ class, see :meth:`render`. To write the
+            sidecar files, it must provide a ``write_sidecars(directory)``
+            method.
+
+        """
+        instance, code = self._generate(backend)
+        with io.open(path, 'wb') as f:
+            f.write(code.encode('utf-8'))
+        if hasattr(instance, 'write_sidecars'):
+            instance.write_sidecars(os.path.dirname(path) or '.')
+        else:
+            _check_sidecars(instance)
+
+    def render_async(self, backend, executor=None):
+        """Build the AST_ and generate code in an executor, without blocking
+        the asyncio event loop.
+
+        Must be called from a running event loop::
+
+            >>> code = await shape.render_async(OpenScadBackend, executor=pool)
+
+        Cancelling the returned future cancels the job if it hasn't started
+        yet.
+
+        :param backend: The backend_ class, see :meth:`render`.
+        :param executor: A :class:`concurrent.futures.ThreadPoolExecutor` or
+            :class:`concurrent.futures.ProcessPoolExecutor` (default ``None``,
+            the default executor of the event loop). A process pool avoids
+            blocking other threads, but the shape and the backend must be
+            picklable.
+        :returns: An awaitable future of the source code.
+        :rtype: :class:`asyncio.Future`
+
+        """
+        import asyncio
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(executor, _render, self, backend)
+
+    def render_stream(self, backend, executor=None, chunk_size=65536):
+        """Build the AST_ and generate code in an executor, chunk by chunk.
+
+        Returns an asynchronous iterator, to be used within a running event
+        loop::
+
+            >>> async for chunk in shape.render_stream(OpenScadBackend):
+            ...     await response.write(chunk.encode('utf-8'))
+
+        Backends with an ``iter_generate()`` method (like
+        :class:`tangible.backends.openscad.OpenScadBackend`) generate the code
+        lazily, so the complete code is never held in memory. Generation stops
+        when the iteration is cancelled. If the code references sidecar files,
+        the last iteration raises ValueError, see :meth:`render`.
+
+        :param backend: The backend_ class, see :meth:`render`.
+        :param executor: A :class:`concurrent.futures.ThreadPoolExecutor`
+            (default ``None``, the default executor of the event loop).
+        :param chunk_size: The minimum size of a chunk in characters (default
+            65536), except for the last one.
+        :type chunk_size: int
+        :returns: Asynchronous iterator over the chunks of source code.
+        :raises: ValueError if ``chunk_size`` is not positive, or if the
+            executor is a process pool.
+
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be > 0.')
+        if isinstance(executor, ProcessPoolExecutor):
+            raise ValueError('Code can only be streamed from a thread executor.')
+        return _ChunkStream(self, backend, executor, chunk_size)
+
+    def __setattr__(self, name, value):
+        # Assigning a public attribute invalidates the cached AST
+        if name[0] != '_':
+            self.__dict__.pop('_ast', None)
+        super(BaseShape, self).__setattr__(name, value)
+
+    def _cached_ast(self):
+        """Return the AST_, built on the first call and cached on the shape.
+
+        The cache is cleared whenever a public attribute of the shape is
+        assigned. Attributes that are modified in place (e.g. appending to a
+        list) don't clear it, therefore they should be replaced instead.
+
+        """
+        try:
+            return self._ast
+        except AttributeError:
+            self._ast = self._build_ast()
+            return self._ast
+
+    def bounds(self):
+        """Return the bounding box of the AST_.
+
+        The AST and its bounding box are cached, repeated calls are cheap (see
+        :meth:`_cached_ast`).
+
+        :returns: The axis aligned bounding box of the shape.
+        :rtype: :class:`tangible.ast.BoundingBox`
+
+        """
+        return self._cached_ast().bounds()
+
+    def estimate_volume(self):
+        """Return the volume of the AST_. Like :meth:`bounds`, the result is
+        cached.
+
+        See :meth:`tangible.ast.AST.estimate_volume`.
+
+        """
+        return self._cached_ast().estimate_volume()
+
+    def estimate_material(self, density, infill=1.0):
+        """Return the mass of a print in grams. The volume of the AST_ is
+        cached, see :meth:`estimate_volume`.
+
+        See :meth:`tangible.ast.AST.estimate_material`.
 
         """
-        ast = self._build_ast()
-        return backend(ast).generate()
+        return self._cached_ast().estimate_material(density, infill)
 
 
 class Shape(BaseShape):
@@ -33,12 +279,23 @@ class Shape(BaseShape):
     <ast.html>`_ and render it using the selected `backend <backends.html>`_.
 
     """
-    def __init__(self, data):
+    def __init__(self, data, max_elements=None, downsampling='mean'):
         """
         :param data: The data.
         :type data: sequence type
+        :param max_elements: If specified, each dataset is reduced to at most
+            this many datapoints before the AST is built (default ``None``).
+            The datasets stay aligned, see
+            :func:`tangible.downsample.downsample_datasets`.
+        :type max_elements: int
+        :param downsampling: The reduction method used for ``max_elements``,
+            see :func:`tangible.downsample.downsample` (default ``mean``).
+        :type downsampling: str
         :raises: ValueError if data is empty.
         """
-        self.data = utils._ensure_list_of_lists(data)
-        if len(self.data[0]) == 0:
-            raise ValueError('Data may not be empty.')
+        with profiling.phase('init'):
+            self.data = utils._ensure_list_of_lists(data)
+            if len(self.data[0]) == 0:
+                raise ValueError('Data may not be empty.')
+            if max_elements is not None:
+                self.data = downsample_datasets(self.data, max_elements, downsampling)
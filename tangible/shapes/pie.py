@@ -9,7 +9,7 @@ try:
 except:  # This import fails in python3 because zip is now a builtin
     pass
 
-from .. import ast, scales
+from .. import ast, scales, utils
 from .base import Shape
 from .mixins import SameLengthDatasetMixin, Data1DMixin, Data2DMixin, Data3DMixin
 
@@ -30,7 +30,24 @@ class PieShape(SameLengthDatasetMixin, Shape):
     :param explode: By how much to explode the sectors (default 0).
     :type explode: int or float
 
+    If an inner radius is specified, each slice is built directly as an
+    extruded annular sector polyhedron, so that no boolean operations are
+    needed to cut out the center. The curved sides of these slices are
+    approximated with :attr:`segments` segments per full circle. Exploded
+    slices are moved as a whole, so their inner arcs are centered on the
+    moved apex of the slice instead of the origin, and all gaps between the
+    slices have the same width. Slices whose radius is not larger than the
+    inner radius are left out, even if they are exploded. If that applies to
+    all slices, a ValueError is raised.
+
+    Unlike the other shapes, pies have no ``max_elements`` argument. Every
+    datapoint is a slice, and reducing the datapoints would distort the share
+    of the slices. Aggregate the data before instead.
+
     """
+    #: Number of segments per full circle for slices with an inner radius.
+    segments = 64
+
     def __init__(self, data, height=2, outer_radius=10, inner_radius=0, explode=0):
         super(PieShape, self).__init__(data)
         self.inner_radius = inner_radius
@@ -39,8 +56,20 @@ class PieShape(SameLengthDatasetMixin, Shape):
         self.angles = [360 / self.count] * self.count
         self.heights = [height] * self.count
         self.explode = explode
+        self._validate_radii()
+
+    def _validate_radii(self):
+        """Make sure that at least one slice reaches beyond the inner radius.
+
+        :raises: ValueError if all slices would be left out.
+
+        """
+        if self.inner_radius and max(self.radii) <= self.inner_radius:
+            raise ValueError('inner_radius must be smaller than the largest slice radius.')
 
     def _build_ast(self):
+        if self.inner_radius:
+            return self._build_annular_ast()
         slices = []
         total_angle = 0
         for i, (radius, angle, height) in enumerate(zip(self.radii, self.angles, self.heights)):
@@ -57,12 +86,26 @@ class PieShape(SameLengthDatasetMixin, Shape):
             # Extrude
             s = ast.LinearExtrusion(height, s)
             slices.append(s)
-        union = ast.Union(slices)
-        if self.inner_radius:
-            r = self.inner_radius
-            center = ast.Cylinder(max(self.heights), r, r)
-            return ast.Difference([union, center])
-        return union
+        return ast.Union(slices)
+
+    def _build_annular_ast(self):
+        slices = []
+        total_angle = 0
+        for radius, angle, height in zip(self.radii, self.angles, self.heights):
+            if radius <= self.inner_radius:
+                # The slice has no area outside of its inner arc
+                total_angle += angle
+                continue
+            # Explode along the bisector of the slice
+            bisector = radians(total_angle + angle / 2)
+            offset = (self.explode * sin(bisector), self.explode * cos(bisector))
+            s = utils.annular_sector(self.inner_radius, radius, total_angle, angle,
+                                     height, self.segments, offset)
+            total_angle += angle
+            slices.append(s)
+        if len(slices) == 1:
+            return slices[0]
+        return ast.Union(slices)
 
 
 ### MIXINS ###
@@ -85,6 +128,7 @@ class RadiusMixin(object):
         super(RadiusMixin, self).__init__(*args, **kwargs)
         data = self.data[index]
         self.radii = data
+        self._validate_radii()
 
 
 class HeightMixin(object):
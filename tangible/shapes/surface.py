@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Surface shapes."""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from .. import ast
+from .base import Shape
+from .mixins import DataNDMixin, SameLengthDatasetMixin
+
+
+### SHAPE CLASSES ###
+
+class Surface2D(DataNDMixin, SameLengthDatasetMixin, Shape):
+    """A height map of a 2 dimensional data matrix. Every dataset is a row
+    along the X axis, datapoints are mapped to height.
+
+    In contrast to :class:`tangible.shapes.bars.BarsND`, the whole matrix
+    results in a single primitive. With the OpenSCAD backend, the heights are
+    written to a separate data file instead of the source code.
+
+    :param data: The data matrix, at least 2 datasets with at least 2
+        datapoints each.
+    :type data: list of lists
+    :param cell_width: The distance between two datapoints on the X axis
+        (default 1).
+    :type cell_width: int or float
+    :param cell_depth: The distance between two datasets on the Y axis
+        (default 1).
+    :type cell_depth: int or float
+    :param max_elements: Maximum number of datapoints per dataset. Longer
+        datasets are downsampled (default ``None``).
+    :type max_elements: int
+    :param downsampling: The downsampling method (default ``mean``).
+    :type downsampling: str
+
+    """
+    def __init__(self, data, cell_width=1, cell_depth=1, max_elements=None,
+                 downsampling='mean'):
+        super(Surface2D, self).__init__(data, max_elements=max_elements,
+                downsampling=downsampling)
+        if len(self.data) < 2 or len(self.data[0]) < 2:
+            raise ValueError('Data must contain at least 2 datasets with 2 datapoints each.')
+        self.cell_width = cell_width
+        self.cell_depth = cell_depth
+
+    def _build_ast(self):
+        model = ast.Surface(self.data)
+        if (self.cell_width, self.cell_depth) != (1, 1):
+            model = ast.Scale(x=self.cell_width, y=self.cell_depth, z=1, item=model)
+        # Center model
+        x_offset = (len(self.data[0]) - 1) / 2 * self.cell_width
+        y_offset = (len(self.data) - 1) / 2 * self.cell_depth
+        return ast.Translate(x=-x_offset, y=-y_offset, z=0, item=model)
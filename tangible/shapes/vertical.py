@@ -21,27 +21,62 @@ class VerticalShape(Shape):
     :type data: sequence type
     :param layer_height: The height of each layer in the vertical shape.
     :type layer_height: int or float
+    :param max_elements: Maximum number of layers per dataset. Longer datasets
+        are downsampled (default ``None``).
+    :type max_elements: int
+    :param downsampling: The downsampling method (default ``mean``).
+    :type downsampling: str
+    :param weld: Whether to build the shape as a single polyhedron with shared
+        vertices between the layers, instead of a union of layers (default
+        ``False``). See :func:`tangible.utils.weld_polyhedra`.
+    :type weld: bool
 
     """
-    def __init__(self, data, layer_height):
-        super(VerticalShape, self).__init__(data)
+    def __init__(self, data, layer_height, max_elements=None, downsampling='mean', weld=False):
+        super(VerticalShape, self).__init__(data, max_elements=max_elements,
+                downsampling=downsampling)
         self.layer_height = layer_height
+        self.weld = weld
 
 
 ### SHAPE CLASSES ###
 
 class CircleTower1D(Data1DMixin, VerticalShape):
     """Round vertical tower. Datapoints are mapped to radius."""
+    def __init__(self, data, layer_height, loft=False, segments=64, **kwargs):
+        """
+        :param loft: If ``True``, the tower is built as a single continuous
+            polyhedron instead of a union of stacked cylinders (default
+            ``False``). This avoids the boolean union in the CAD tool and
+            results in a predictable number of triangles. Enabling ``weld``
+            has the same effect for circle towers.
+        :type loft: bool
+        :param segments: Number of segments per circle if ``loft`` is enabled
+            (default 64).
+        :type segments: int
+
+        """
+        super(CircleTower1D, self).__init__(data, layer_height, **kwargs)
+        self.loft = loft
+        self.segments = segments
+
     def _build_ast(self):
+        if self.loft or self.weld:
+            # Validate like ast.Circle, a ring of a single point isn't a
+            # valid part of a manifold
+            if any(d <= 0 for d in self.data[0]):
+                raise ValueError('Radius of a circle must be > 0.')
+            rings = [utils.arc_points(d, 0, 360, self.segments)[:-1] for d in self.data[0]]
+            return utils.loft(rings, self.layer_height)
         layers = [ast.Circle(radius=d) for d in self.data[0]]
-        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical')
+        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical', self.weld)
 
 
 class SquareTower1D(Data1DMixin, VerticalShape):
     """Vertical tower made of squares. Datapoints are mapped to square side length."""
     def _build_ast(self):
         layers = [ast.Rectangle(width=d, height=d) for d in self.data[0]]
-        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical')
+        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical', self.weld)
 
 
 class RectangleTower2D(Data2DMixin, SameLengthDatasetMixin, VerticalShape):
@@ -49,7 +84,7 @@ class RectangleTower2D(Data2DMixin, SameLengthDatasetMixin, VerticalShape):
     height of rectangle."""
     def _build_ast(self):
         layers = [ast.Rectangle(width=a, height=b) for a, b in zip(*self.data)]
-        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical')
+        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical', self.weld)
 
 
 class RhombusTower2D(Data2DMixin, SameLengthDatasetMixin, VerticalShape):
@@ -60,7 +95,7 @@ class RhombusTower2D(Data2DMixin, SameLengthDatasetMixin, VerticalShape):
         for a, b in zip(*self.data):
             rhombus = ast.Polygon([(0, a / 2), (b / 2, 0), (0, -a / 2), (-b / 2, 0), (0, a / 2)])
             layers.append(rhombus)
-        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical')
+        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical', self.weld)
 
 
 class QuadrilateralTower4D(Data4DMixin, SameLengthDatasetMixin, VerticalShape):
@@ -71,6 +106,6 @@ class QuadrilateralTower4D(Data4DMixin, SameLengthDatasetMixin, VerticalShape):
         for a, b, c, d in zip(*self.data):
             quadrilateral = ast.Polygon([(0, a), (b, 0), (0, -c), (-d, 0), (0, a)])
             layers.append(quadrilateral)
-        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical')
+        return utils.connect_2d_shapes(layers, self.layer_height, 'vertical', self.weld)
 
 # TODO: PolygonTowerND
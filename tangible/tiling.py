@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Tiling module.
+
+Models that are larger than the print bed have to be printed in several
+pieces. This module splits a model into tiles without cutting any geometry:
+Unions are resolved into their parts (e.g. the bars of a bar chart or the
+layers of a tower), and the parts are distributed to tiles along the X and Y
+axes. Tiles can optionally be provided with holes for alignment pegs.
+
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import multiprocessing
+import os
+from itertools import chain
+
+from . import ast, optimize
+from .backends.openscad import OpenScadBackend
+from .shapes.base import BaseShape
+
+
+def _partition(parts, axis, size):
+    """Split parts into groups along an axis, so that each group is at most
+    ``size`` long. Parts are never split, each group starts at the beginning
+    of its first part."""
+    low = lambda part: part.bounds()[axis]
+    high = lambda part: part.bounds()[axis + 3]
+    groups = []
+    start = None
+    for part in sorted(parts, key=low):
+        if high(part) - low(part) > size + optimize.EPSILON:
+            raise ValueError('Part is larger than the tile size: {!r}'.format(part))
+        if start is None or high(part) > start + size + optimize.EPSILON:
+            start = low(part)
+            groups.append([])
+        groups[-1].append(part)
+    return groups
+
+
+def _union_bounds(parts):
+    return ast.Union(parts).bounds() if len(parts) > 1 else parts[0].bounds()
+
+
+class Tile(BaseShape):
+    """A tile of a model, see :func:`split`.
+
+    The AST of a tile is moved so that its bounding box starts at the origin.
+
+    :ivar column: The column of the tile (along the X axis).
+    :ivar row: The row of the tile (along the Y axis).
+    :ivar parts: The AST objects of the tile, in model coordinates.
+    :ivar holes: The holes for alignment pegs, in model coordinates.
+
+    """
+    def __init__(self, column, row, parts):
+        self.column = column
+        self.row = row
+        self.parts = parts
+        self.holes = []
+
+    @property
+    def origin(self):
+        """The position of the tile in the model, as ``(x, y, z)`` tuple."""
+        box = _union_bounds(self.parts)
+        return box.xmin, box.ymin, box.zmin
+
+    def _build_ast(self):
+        model = self.parts[0] if len(self.parts) == 1 else ast.Union(self.parts)
+        if self.holes:
+            model = ast.Difference([model] + self.holes)
+        x, y, z = self.origin
+        return ast.Translate(x=-x, y=-y, z=-z, item=model)
+
+    def __repr__(self):
+        return '<Tile {}/{}: {} parts>'.format(self.column, self.row, len(self.parts))
+
+
+def peg(radius, length):
+    """Return an alignment peg that fits the holes created by :func:`split`.
+
+    The peg is slightly thinner than the holes and lies on the X axis, ready
+    for printing.
+
+    :param radius: The radius of the holes.
+    :type radius: int or float
+    :param length: The total length of the peg, at most twice the hole depth.
+    :type length: int or float
+
+    """
+    cylinder = ast.Cylinder(height=length, radius1=radius * 0.95, radius2=radius * 0.95)
+    return ast.Rotate(degrees=90, vector=(0, 1, 0), item=cylinder)
+
+
+def _drill(first, second, axis, radius, depth):
+    """Add a hole for an alignment peg at the cut between two tiles."""
+    a, b = _union_bounds(first.parts), _union_bounds(second.parts)
+    other = 1 - axis
+    low, high = max(a[other], b[other]), min(a[other + 3], b[other + 3])
+    if high - low < 4 * radius:
+        return
+    cut = b[axis]
+    center = [0, 0, max(a.zmin, b.zmin) + 2 * radius]
+    center[axis] = cut - depth
+    center[other] = (low + high) / 2
+    if max(a.zmax, b.zmax) < center[2] + 2 * radius:
+        return
+    cylinder = ast.Cylinder(height=2 * depth, radius1=radius, radius2=radius)
+    if axis == 0:
+        rotated = ast.Rotate(degrees=90, vector=(0, 1, 0), item=cylinder)
+    else:
+        rotated = ast.Rotate(degrees=-90, vector=(1, 0, 0), item=cylinder)
+    hole = ast.Translate(*center, item=rotated)
+    # Replace the lists instead of appending, to clear the cached AST
+    first.holes = first.holes + [hole]
+    second.holes = second.holes + [hole]
+
+
+def split(target, tile_size, peg_radius=None, peg_depth=None):
+    """Split a model into tiles of at most the specified size.
+
+    The model is split at the boundaries of its parts, no geometry is cut.
+    First, the parts are distributed to columns along the X axis, then every
+    column is split into rows along the Y axis.
+
+    If a peg radius is specified, a hole for an alignment peg (see
+    :func:`peg`) is drilled into both tiles at every cut, close to the bottom
+    of the model.
+
+    :param target: The shape or AST object.
+    :param tile_size: The maximum ``(width, depth)`` of a tile, usually the
+        size of the print bed.
+    :type tile_size: 2-tuple
+    :param peg_radius: The radius of the peg holes (default ``None``, no
+        holes).
+    :type peg_radius: int or float
+    :param peg_depth: The depth of the peg holes (default: 3 times the radius).
+    :type peg_depth: int or float
+    :returns: List of tiles, ordered by column and row.
+    :rtype: list of :class:`Tile`
+    :raises: ValueError if a part of the model is larger than a tile.
+
+    """
+    node = target if isinstance(target, ast.AST) else target._build_ast()
+    width, depth = tile_size
+    columns = []
+    for column, parts in enumerate(_partition(ast.flatten_unions(node), 0, width)):
+        rows = _partition(parts, 1, depth)
+        columns.append([Tile(column, row, items) for row, items in enumerate(rows)])
+
+    if peg_radius is not None:
+        peg_depth = peg_depth or 3 * peg_radius
+        for column in columns:
+            for first, second in zip(column, column[1:]):
+                _drill(first, second, 1, peg_radius, peg_depth)
+        for column1, column2 in zip(columns, columns[1:]):
+            for first in column1:
+                for second in column2:
+                    _drill(first, second, 0, peg_radius, peg_depth)
+
+    return list(chain.from_iterable(columns))
+
+
+def _generate_tile(args):
+    tile, path, backend, options = args
+    backend(tile._build_ast(), **options).save(path)
+    return path
+
+
+def generate(tiles, directory, backend=OpenScadBackend, processes=None, **options):
+    """Generate the code of all tiles in parallel worker processes.
+
+    Every tile is written to a file called ``tile-<column>-<row>.scad`` in
+    the directory, together with its sidecar files.
+
+    :param tiles: The tiles.
+    :type tiles: list of :class:`Tile`
+    :param directory: The output directory.
+    :type directory: str
+    :param backend: The backend class, must provide a ``save(path)`` method
+        (default :class:`tangible.backends.openscad.OpenScadBackend`).
+    :param processes: The number of worker processes (default: number of
+        CPUs).
+    :type processes: int
+    :param options: Additional arguments for the backend.
+    :returns: List of file paths, in the order of the tiles.
+    :rtype: list of str
+
+    """
+    jobs = [(tile, os.path.join(directory, 'tile-{}-{}.scad'.format(tile.column, tile.row)),
+             backend, options) for tile in tiles]
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_generate_tile, jobs)
+    finally:
+        pool.close()
+        pool.join()
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import, unicode_literals
 
-from itertools import tee
+from itertools import tee, chain, product
+from math import sin, cos, radians, ceil, floor
 
 try:
     from itertools import izip as zip
@@ -82,7 +83,7 @@ def reduceby(iterable, keyfunc, reducefunc, init):
     yield accum_value
 
 
-def connect_2d_shapes(shapes, layer_distance, orientation):
+def connect_2d_shapes(shapes, layer_distance, orientation, weld=False):
     """Convert a list of 2D shapes to a 3D shape.
 
     Take a list of 2D shapes and create a 3D shape from it. Each layer is
@@ -94,7 +95,13 @@ def connect_2d_shapes(shapes, layer_distance, orientation):
     :type layer_distance: int or float
     :param orientation: Either 'horizontal' or 'vertical'
     :type orientation: str or unicode
-    :returns: :class:`ast.Union`
+    :param weld: Whether to merge the layers into a single polyhedron using
+        :func:`weld` (default ``False``). Shared vertices between the layers
+        are merged and the internal faces are removed. This is not supported
+        for circles.
+    :type weld: bool
+    :returns: :class:`ast.Union`, or :class:`ast.Polyhedron` if ``weld`` is
+        enabled.
 
     """
     assert orientation in ['horizontal', 'vertical'], \
@@ -113,6 +120,8 @@ def connect_2d_shapes(shapes, layer_distance, orientation):
         # Circle
         # Implemented by joining cylinders.
         if isinstance(first, Circle):
+            if weld:
+                raise ValueError('Circles cannot be welded, use a lofted polyhedron instead.')
             r1, r2 = first.radius, second.radius
             layer = Cylinder(height=layer_distance, radius1=r1, radius2=r2)
 
@@ -180,11 +189,249 @@ def connect_2d_shapes(shapes, layer_distance, orientation):
         else:
             raise ValueError('Unsupported shape: {!r}'.format(first))
 
-        layers.append(Translate(0, 0, i * layer_distance, item=layer))
-    union = Union(items=layers)
+        if weld:
+            z = i * layer_distance
+            points = [[x, y, h + z] for x, y, h in layer.points]
+            layers.append(Polyhedron(points, layer.triangles, layer.quads))
+        else:
+            layers.append(Translate(0, 0, i * layer_distance, item=layer))
+    model = weld_polyhedra(layers) if weld else Union(items=layers)
     if orientation == 'horizontal':
-        return Rotate(degrees=90, vector=[0, 1, 0], item=union)
-    return union
+        return Rotate(degrees=90, vector=[0, 1, 0], item=model)
+    return model
+
+
+def weld_polyhedra(polyhedra, tolerance=1e-9):
+    """Merge a list of polyhedra into a single polyhedron.
+
+    Coincident vertices are merged: A vertex is mapped to the first previous
+    vertex whose coordinates all differ by at most the tolerance. The lookup
+    uses a hash grid with cells of twice the tolerance, for every vertex the
+    own cell and the nearer neighbour cell along each axis are checked. Pairs
+    of faces that consist of the same vertices (for example
+    the top face of a layer and the bottom face of the layer above) are
+    internal faces and are removed, as well as faces that degenerated because
+    some of their vertices were merged.
+
+    This is useful to join polyhedra that touch at a shared face into a single
+    manifold polyhedron, without a boolean union operation.
+
+    :param polyhedra: List of polyhedra.
+    :type polyhedra: list of :class:`ast.Polyhedron`
+    :param tolerance: Vertices closer than this are merged (default ``1e-9``).
+    :type tolerance: float
+    :returns: :class:`ast.Polyhedron`
+
+    """
+    size = 2 * tolerance
+    grid = {}
+    points = []
+    faces = []
+
+    def find(point):
+        """Return the index of a previous vertex within the tolerance of the
+        point, and the grid cell of the point."""
+        cells = [floor(v / size) for v in point]
+        # A vertex within the tolerance is in the same cell or in the nearer
+        # neighbour cell along each axis
+        sides = [[c, c - 1 if v / size - c < 0.5 else c + 1] for c, v in zip(cells, point)]
+        for key in product(*sides):
+            for index in grid.get(key, ()):
+                if all(abs(a - b) <= tolerance for a, b in zip(points[index], point)):
+                    return index, cells
+        return None, cells
+
+    for polyhedron in polyhedra:
+        mapping = []
+        for point in polyhedron.points:
+            index, cells = find(point)
+            if index is None:
+                index = len(points)
+                grid.setdefault(tuple(cells), []).append(index)
+                points.append(list(point))
+            mapping.append(index)
+        for face in chain(polyhedron.triangles, polyhedron.quads):
+            faces.append([mapping[i] for i in face])
+
+    # Remove merged vertices from faces, drop degenerated and internal faces
+    faces = [[v for k, v in enumerate(f) if v != f[k - 1]] for f in faces]
+    faces = [f for f in faces if len(f) >= 3 and len(set(f)) == len(f)]
+    counts = {}
+    for face in faces:
+        key = tuple(sorted(face))
+        counts[key] = counts.get(key, 0) + 1
+    faces = [f for f in faces if counts[tuple(sorted(f))] == 1]
+
+    # Remove unused points
+    used = sorted(set(chain.from_iterable(faces)))
+    reindex = dict((old, new) for new, old in enumerate(used))
+    triangles = [[reindex[i] for i in f] for f in faces if len(f) == 3]
+    quads = [[reindex[i] for i in f] for f in faces if len(f) == 4]
+    return Polyhedron([points[i] for i in used], triangles, quads)
+
+
+def arc_points(radius, start, angle, segments):
+    """Return the points of a circular arc around the origin.
+
+    Angles are measured in degrees, clockwise, starting at the positive Y
+    axis. This matches the orientation of :class:`ast.CircleSector`.
+
+    The arc is divided into ``segments * angle / 360`` (at least 1) segments,
+    therefore the resolution is the same for all arcs with the same
+    ``segments`` value.
+
+    :param radius: The radius of the arc.
+    :type radius: int or float
+    :param start: The start angle in degrees.
+    :type start: int or float
+    :param angle: The central angle of the arc in degrees.
+    :type angle: int or float
+    :param segments: Number of segments of a full circle.
+    :type segments: int
+    :returns: List of points, including both end points.
+    :rtype: list of 2-tuples
+
+    """
+    count = max(1, int(ceil(segments * angle / 360 - 1e-9)))
+    step = angle / count
+    angles = [radians(start + i * step) for i in range(count + 1)]
+    # Rounding removes floating point noise like ``cos(90) == 6e-17``
+    return [(round(sin(a) * radius, 12), round(cos(a) * radius, 12)) for a in angles]
+
+
+_sector_cache = {}
+
+
+def circle_sector_points(radius, angle, segments):
+    """Return the vertices of a :class:`ast.CircleSector` polygon.
+
+    The first point is the center of the circle, followed by the points of the
+    arc. If the angle is 360 degrees, only the points of the circle are
+    returned. The results are cached per ``(radius, angle, segments)``.
+
+    :param radius: The radius of the circle.
+    :type radius: int or float
+    :param angle: The central angle in degrees.
+    :type angle: int or float
+    :param segments: Number of segments of a full circle.
+    :type segments: int
+    :returns: Points of the polygon, not closed.
+    :rtype: tuple of 2-tuples
+
+    """
+    key = (radius, angle, segments)
+    try:
+        return _sector_cache[key]
+    except KeyError:
+        pass
+    if angle >= 360:
+        points = tuple(arc_points(radius, 0, 360, segments)[:-1])
+    else:
+        points = tuple([(0, 0)] + arc_points(radius, 0, angle, segments))
+    if len(_sector_cache) >= 4096:
+        _sector_cache.clear()
+    _sector_cache[key] = points
+    return points
+
+
+def loft(rings, layer_distance):
+    """Connect a list of 2D rings to a single continuous polyhedron.
+
+    Each ring is placed ``layer_distance`` above the previous one. Adjacent
+    rings share their vertices, there are no internal faces. The bottom and
+    the top ring are closed with a triangle fan, therefore the rings must be
+    convex. The resulting polyhedron consists of exactly ``2 * n * (l - 1) + 2
+    * (n - 2)`` triangles, where ``n`` is the number of points per ring and
+    ``l`` is the number of rings.
+
+    :param rings: List of rings. Each ring is a list of 2D points in clockwise
+        order (when looking from above), all rings must have the same number
+        of points. The rings must not be closed.
+    :type rings: list of lists of 2-tuples
+    :param layer_distance: The distance between two rings.
+    :type layer_distance: int or float
+    :returns: :class:`ast.Polyhedron`
+    :raises: ValueError if the rings don't have the same number of points.
+
+    """
+    n = len(rings[0])
+    if any(len(ring) != n for ring in rings):
+        raise ValueError('All rings need to have the same number of points.')
+    points = []
+    for k, ring in enumerate(rings):
+        z = k * layer_distance
+        points.extend([x, y, z] for x, y in ring)
+    quads = []
+    for k in range(len(rings) - 1):
+        lower, upper = k * n, (k + 1) * n
+        for i in range(n):
+            j = (i + 1) % n
+            quads.append([lower + i, lower + j, upper + j, upper + i])
+    top = (len(rings) - 1) * n
+    triangles = []
+    for i in range(1, n - 1):
+        triangles.append([0, i + 1, i])  # Bottom
+        triangles.append([top, top + i, top + i + 1])  # Top
+    return Polyhedron(points=points, triangles=triangles, quads=quads)
+
+
+def annular_sector(inner_radius, outer_radius, start, angle, height, segments, offset=(0, 0)):
+    """Create an extruded annular sector (a pie slice with a hole) as a single
+    polyhedron.
+
+    Angles are measured in degrees, clockwise, starting at the positive Y
+    axis. The curved sides are approximated like in :func:`arc_points`.
+
+    :param inner_radius: The inner radius.
+    :type inner_radius: int or float
+    :param outer_radius: The outer radius.
+    :type outer_radius: int or float
+    :param start: The start angle in degrees.
+    :type start: int or float
+    :param angle: The central angle in degrees.
+    :type angle: int or float
+    :param height: The height of the extrusion.
+    :type height: int or float
+    :param segments: Number of segments of a full circle.
+    :type segments: int
+    :param offset: Translation of the sector in the XY plane (default
+        ``(0, 0)``).
+    :type offset: 2-tuple
+    :returns: :class:`ast.Polyhedron`
+    :raises: ValueError if the inner radius is not smaller than the outer
+        radius.
+
+    """
+    if not 0 < inner_radius < outer_radius:
+        raise ValueError('Inner radius must be > 0 and smaller than the outer radius.')
+    closed = angle >= 360
+    outer = arc_points(outer_radius, start, min(angle, 360), segments)
+    inner = arc_points(inner_radius, start, min(angle, 360), segments)
+    if closed:
+        outer, inner = outer[:-1], inner[:-1]
+    m = len(outer)
+    ox, oy = offset
+    points = []
+    for z in (0, height):
+        points.extend([x + ox, y + oy, z] for x, y in outer)
+        points.extend([x + ox, y + oy, z] for x, y in inner)
+
+    quads = []
+    for i in range(m if closed else m - 1):
+        j = (i + 1) % m
+        bo1, bo2, bi1, bi2 = i, j, m + i, m + j
+        to1, to2, ti1, ti2 = 2 * m + i, 2 * m + j, 3 * m + i, 3 * m + j
+        quads.extend([
+            [to1, to2, ti2, ti1],  # Top
+            [bo1, bi1, bi2, bo2],  # Bottom
+            [bo1, bo2, to2, to1],  # Outer wall
+            [bi1, ti1, ti2, bi2],  # Inner wall
+        ])
+    if not closed:
+        n = m - 1
+        quads.append([m, 0, 2 * m, 3 * m])  # Start
+        quads.append([n, m + n, 3 * m + n, 2 * m + n])  # End
+    return Polyhedron(points=points, quads=quads)
 
 
 def _quads_to_triangles(quads):
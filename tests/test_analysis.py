@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import pytest
+
+from tangible import analysis, ast, shapes
+
+
+@pytest.mark.parametrize('radius, expected', [
+    (0, 3),
+    (0.5, 5),  # minimum of 5 fragments
+    (2, 7),
+    (10, 30),  # limited by $fa
+])
+def test_fragments(radius, expected):
+    assert analysis.fragments(radius) == expected
+
+
+def test_analyze_counts():
+    node = ast.Union([
+        ast.Cube(1, 1, 1),
+        ast.Translate(2, 0, 0, ast.Cube(1, 1, 1)),
+        ast.Difference([ast.Cube(2, 2, 2), ast.Translate(1, 1, 1, ast.Cube(2, 2, 2))]),
+    ])
+    result = analysis.analyze(node)
+    assert result.nodes == 8
+    assert result.node_counts == {'Union': 1, 'Difference': 1, 'Translate': 2, 'Cube': 4}
+    assert result.depth == 4
+    assert result.booleans == 2
+    assert result.max_fanin == 3
+    assert result.facets == 24
+    # Difference: 6 + 6, union: (6 + 6) + (12 + 12)
+    assert result.cost == 12 + 12 + 24
+
+
+def test_analyze_polyhedron():
+    node = ast.Polyhedron(points=[(0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1)],
+                          triangles=[(0, 1, 2), (0, 1, 3), (0, 2, 3), (1, 2, 3)])
+    result = analysis.analyze(node)
+    assert result.polyhedron_faces == 4
+    assert result.cost == 0
+
+
+def test_analyze_extrusion():
+    polygon = ast.Polygon([(0, 0), (1, 1), (1, 0), (0, 0)])
+    node = ast.LinearExtrusion(5, ast.Union([ast.Rectangle(1, 1), polygon]))
+    result = analysis.analyze(node)
+    # 2D booleans don't involve CGAL
+    assert result.booleans == 0
+    assert result.node_counts == {'LinearExtrusion': 1, 'Union': 1, 'Rectangle': 1, 'Polygon': 1}
+    assert result.facets == 7 + 2
+
+
+def test_analyze_shape():
+    bars = shapes.bars.BarsND([[1, 2, 3], [4, 5, 6]], bar_width=1, bar_depth=1)
+    result = analysis.analyze(bars)
+    assert result.node_counts['Cube'] == 6
+    assert result.as_dict()['cost'] == result.cost > 0
+    assert result.estimated_seconds(0.5) == result.cost / 2
+
+
+def test_analyze_welded_tower_is_cheaper():
+    data = list(range(1, 20))
+    unioned = analysis.analyze(shapes.vertical.SquareTower1D(data, layer_height=1))
+    welded = analysis.analyze(shapes.vertical.SquareTower1D(data, layer_height=1, weld=True))
+    assert welded.cost < unioned.cost
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import, unicode_literals
 
+import math
+
 import pytest
 
 from tangible import ast
@@ -226,6 +228,24 @@ def test_bad_polyhedron(points, triangles, quads):
         ast.Polyhedron(points, triangles, quads)
 
 
+def test_good_surface():
+    try:
+        surface = ast.Surface([[1, 2, 3], [4, 5, 6]])
+    except ValueError:
+        pytest.fail()
+    assert surface.heights == [[1, 2, 3], [4, 5, 6]]
+
+
+@pytest.mark.parametrize('heights', [
+    [[1, 2, 3]],  # single row
+    [[1], [2]],  # single column
+    [[1, 2], [3, 4, 5]],  # different lengths
+])
+def test_bad_surface(heights):
+    with pytest.raises(ValueError):
+        ast.Surface(heights)
+
+
 ### Transformations ###
 
 def test_good_translate():
@@ -377,3 +397,134 @@ def test_good_rotate_extrusion():
 def test_bad_rotate_extrusion(item):
     with pytest.raises(ValueError):
         ast.RotateExtrusion(item)
+
+
+### Bounding boxes ###
+
+def _rounded(box):
+    return tuple(round(v, 9) for v in box)
+
+
+@pytest.mark.parametrize('node, expected', [
+    (ast.Circle(2), (-2, -2, 0, 2, 2, 0)),
+    (ast.CircleSector(2, 90), (0, 0, 0, 2, 2, 0)),
+    (ast.CircleSector(2, 180), (0, -2, 0, 2, 2, 0)),
+    (ast.CircleSector(2, 45), (0, 0, 0, 1.414213562, 2, 0)),
+    (ast.Rectangle(3, 4), (0, 0, 0, 3, 4, 0)),
+    (ast.Polygon([(1, 2), (-1, 5), (3, -2), (1, 2)]), (-1, -2, 0, 3, 5, 0)),
+    (ast.Cube(1, 2, 3), (0, 0, 0, 1, 3, 2)),
+    (ast.Sphere(2), (-2, -2, -2, 2, 2, 2)),
+    (ast.Cylinder(5, 1, 3), (-3, -3, 0, 3, 3, 5)),
+    (ast.Surface([[1, 2, 3], [4, 5, 6]]), (0, 0, 0, 2, 1, 6)),
+    (ast.Surface([[-1, 2], [4, 0.5]]), (0, 0, -2, 1, 1, 4)),
+    (ast.Translate(1, 2, 3, ast.Cube(1, 1, 1)), (1, 2, 3, 2, 3, 4)),
+    (ast.Rotate(90, (0, 0, 1), ast.Cube(1, 2, 3)), (-3, 0, 0, 0, 1, 2)),
+    (ast.Scale(2, -1, 1, ast.Cube(1, 1, 1)), (0, -1, 0, 2, 0, 1)),
+    (ast.Mirror((1, 0, 0), ast.Cube(1, 1, 1)), (-1, 0, 0, 0, 1, 1)),
+    (ast.Union([ast.Cube(1, 1, 1), ast.Translate(2, 0, 0, ast.Sphere(1))]), (0, -1, -1, 3, 1, 1)),
+    (ast.Difference([ast.Cube(2, 2, 2), ast.Sphere(5)]), (0, 0, 0, 2, 2, 2)),
+    (ast.Intersection([ast.Cube(2, 2, 2), ast.Sphere(1)]), (0, 0, 0, 1, 1, 1)),
+    (ast.LinearExtrusion(5, ast.Rectangle(1, 2)), (0, 0, 0, 1, 2, 5)),
+    (ast.RotateExtrusion(ast.Translate(2, 1, 0, ast.Circle(1))), (-3, -3, 0, 3, 3, 2)),
+])
+def test_bounds(node, expected):
+    assert _rounded(node.bounds()) == pytest.approx(expected)
+
+
+def test_bounds_twisted_extrusion():
+    box = ast.LinearExtrusion(2, ast.Rectangle(3, 4), twist=90).bounds()
+    assert _rounded(box) == (-5, -5, 0, 5, 5, 2)
+
+
+def test_bounds_cached():
+    node = ast.Translate(1, 0, 0, ast.Circle(1))
+    assert node.bounds() is node.bounds()
+    assert node == ast.Translate(1, 0, 0, ast.Circle(1))
+
+
+def test_bounding_box_properties():
+    box = ast.BoundingBox(0, 0, 0, 2, 4, 6)
+    assert box.size == (2, 4, 6)
+    assert box.center == (1, 2, 3)
+    assert len(box.corners()) == 8
+    assert box.union(ast.BoundingBox(-1, 1, 1, 1, 5, 2)) == (-1, 0, 0, 2, 5, 6)
+    assert box.intersection(ast.BoundingBox(-1, 1, 1, 1, 5, 2)) == (0, 1, 1, 1, 4, 2)
+
+
+### Volume ###
+
+@pytest.mark.parametrize('node', [
+    ast.Cube(1, 2, 3),
+    ast.Sphere(2),
+    ast.Cylinder(5, 1, 3),
+    ast.Polyhedron(points=[(0, 0, 0), (0, 0, 2), (0, 2, 0), (2, 0, 0)],
+                   triangles=[(0, 1, 2), (0, 3, 1), (0, 2, 3), (1, 3, 2)]),
+    ast.Translate(1, 2, 3, ast.Cube(1, 1, 1)),
+    ast.Rotate(30, (1, 1, 0), ast.Scale(2, 1, 3, ast.Cylinder(2, 1, 0.5))),
+    ast.Mirror((1, 0, 1), ast.Sphere(1)),
+    ast.LinearExtrusion(2, ast.CircleSector(3, 120)),
+    ast.LinearExtrusion(2, ast.Polygon([(0, 0), (0, 2), (3, 0), (0, 0)])),
+    ast.RotateExtrusion(ast.Translate(3, 0, 0, ast.Circle(1))),
+    ast.RotateExtrusion(ast.Rotate(90, (0, 0, 1), ast.Translate(0, -4, 0, ast.Rectangle(1, 2)))),
+    ast.Union([ast.Cube(1, 1, 1), ast.Translate(3, 0, 0, ast.Sphere(1))]),
+])
+def test_estimate_volume(node):
+    """The closed form volume must match the volume of a fine tessellation."""
+    from tangible import mesh
+    meshes = mesh.tessellate(node, segments=256)
+    expected = sum(abs(mesh.signed_volume(m)) for m in meshes)
+    assert node.estimate_volume() == pytest.approx(expected, rel=2e-3)
+
+
+@pytest.mark.parametrize('node, expected', [
+    (ast.Circle(1), 0),
+    (ast.Surface([[1, 2, 3], [2, 3, 4]]), 2 + 3),
+    (ast.Surface([[0, 0], [0, 2]]), 1 / 2 + 1),
+    (ast.LinearExtrusion(2, ast.Union([ast.Rectangle(1, 2),
+                                       ast.Translate(3, 0, 0, ast.Circle(1))])), 4 + 2 * math.pi),
+    (ast.Difference([ast.Cube(2, 2, 2), ast.Sphere(1)]), 8),
+    (ast.Intersection([ast.Cube(2, 2, 2), ast.Cube(1, 1, 1)]), 1),
+])
+def test_estimate_volume_other(node, expected):
+    assert node.estimate_volume() == pytest.approx(expected)
+
+
+def test_estimate_material():
+    cube = ast.Cube(10, 10, 10)
+    assert cube.estimate_material(1.25) == pytest.approx(1.25)
+    assert cube.estimate_material(1.25, infill=0.2) == pytest.approx(0.25)
+
+
+@pytest.mark.parametrize('density, infill', [
+    (0, 1),
+    (1, 1.5),
+    (1, -0.1),
+])
+def test_bad_estimate_material(density, infill):
+    with pytest.raises(ValueError):
+        ast.Cube(1, 1, 1).estimate_material(density, infill)
+
+
+### Tree manipulation ###
+
+def test_flatten_unions():
+    cubes = [ast.Cube(1, 1, 1), ast.Cube(2, 2, 2), ast.Cube(3, 3, 3)]
+    node = ast.Translate(5, 0, 0, ast.Union([cubes[0], ast.Union(cubes[1:])]))
+    assert ast.flatten_unions(node) == [ast.Translate(5, 0, 0, cube) for cube in cubes]
+
+
+def test_flatten_unions_predicate():
+    """Only the unions matching the predicate are resolved."""
+    inner = ast.Union([ast.Cube(2, 2, 2), ast.Cube(3, 3, 3)])
+    node = ast.Union([ast.Cube(1, 1, 1), inner])
+    parts = ast.flatten_unions(node, lambda union: union is node)
+    assert parts == [ast.Cube(1, 1, 1), inner]
+    assert parts[1] is inner
+
+
+def test_with_item():
+    node = ast.Translate(1, 2, 3, ast.Cube(1, 1, 1))
+    node.bounds()
+    clone = ast.with_item(node, ast.Sphere(1))
+    assert clone == ast.Translate(1, 2, 3, ast.Sphere(1))
+    assert clone.bounds() == (0, 1, 2, 2, 3, 4)
@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import, unicode_literals
 
+import gzip
+import io
+from functools import partial
+
 import pytest
 
 from tangible import ast
 from tangible.backends.openscad import OpenScadBackend as Backend
+from tangible.shapes.base import BaseShape
 
 
 def verify(shape, code):
@@ -44,7 +49,35 @@ def test_polygon():
     verify(shape, code)
 
 
-# TODO test_polyhedron
+def test_polyhedron():
+    shape = ast.Polyhedron(points=[(0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1)],
+                           triangles=[(0, 1, 2), (0, 3, 1), (1, 3, 2), (0, 2, 3)])
+    code = 'polyhedron(\npoints=[[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]],\n' \
+           '    triangles=[[0, 1, 2], [0, 3, 1], [1, 3, 2], [0, 2, 3]]\n);'
+    verify(shape, code)
+
+
+@pytest.mark.parametrize(('shape', 'precision', 'code'), [
+    (ast.Circle(radius=10 / 3), 2, 'circle(3.33);'),
+    (ast.Circle(radius=10 / 3), 0, 'circle(3);'),
+    (ast.Circle(radius=10.5), 3, 'circle(10.5);'),
+    (ast.Circle(radius=10), 3, 'circle(10);'),
+    (ast.Cube(width=1 / 3, height=2, depth=100), 2, 'cube([0.33, 100, 2]);'),
+    (ast.Translate(-0.0001, 0.25, 1.999, ast.Circle(1)), 2,
+        'translate([0, 0.25, 2])\n{\n    circle(1);\n};'),
+    (ast.Polygon(points=[(0, 0), (0, 2 / 3), (10.1, 2), (0, 0)]), 3,
+        'polygon([[0, 0], [0, 0.667], [10.1, 2]]);'),
+])
+def test_precision(shape, precision, code):
+    assert Backend(shape, precision=precision).generate() == code
+
+
+def test_polyhedron_precision():
+    shape = ast.Polyhedron(points=[(0, 0, 0), (1 / 3, 0, 0), (0, 100.5, 0), (0, 0, -1 / 3)],
+                           triangles=[(0, 1, 2), (0, 3, 1), (1, 3, 2), (0, 2, 3)])
+    code = 'polyhedron(\npoints=[[0, 0, 0], [0.3, 0, 0], [0, 100.5, 0], [0, 0, -0.3]],\n' \
+           '    triangles=[[0, 1, 2], [0, 3, 1], [1, 3, 2], [0, 2, 3]]\n);'
+    assert Backend(shape, precision=1).generate() == code
 
 
 circle_sector_module = """module circle_sector(r, a) {
@@ -86,3 +119,209 @@ def test_circle_sector():
     ])
     raw_code = '%s\ndifference()\n{\n    circle_sector(10, 180);\n    circle_sector(8, 135);\n};'
     verify(shape, raw_code % circle_sector_module)
+
+
+@pytest.mark.parametrize(('shape', 'code'), [
+    (ast.CircleSector(radius=10, angle=180), 'polygon([[0, 0], [0, 10], [10, 0], [0, -10]]);'),
+    (ast.CircleSector(radius=10, angle=90), 'polygon([[0, 0], [0, 10], [10, 0]]);'),
+    (ast.CircleSector(radius=1, angle=360), 'polygon([[0, 1], [1, 0], [0, -1], [-1, 0]]);'),
+    (ast.Difference([ast.CircleSector(radius=10, angle=180), ast.Circle(1)]),
+        'difference()\n{\n    polygon([[0, 0], [0, 10], [10, 0], [0, -10]]);\n'
+        '    circle(1);\n};'),
+])
+def test_circle_sector_polygon(shape, code):
+    assert Backend(shape, precision=3, sector_segments=4).generate() == code
+
+
+@pytest.mark.parametrize(('shape', 'code'), [
+    (ast.Cube(width=1, height=2, depth=3), 'cube([1,3,2]);'),
+    (ast.Translate(1, 2, 3, ast.Circle(1)), 'translate([1,2,3]){circle(1);};'),
+    (ast.Union([ast.Mirror([0, 1, 1], ast.Circle(1)), ast.Rotate(30, (0, 1, 0), ast.Sphere(2))]),
+        'union(){mirror([0,1,1]){circle(1);};rotate(30,[0,1,0]){sphere(2);};};'),
+    (ast.LinearExtrusion(height=7, item=ast.Circle(1.5)),
+        'linear_extrude(7,twist=0){circle(1.5);};'),
+    (ast.Polyhedron(points=[(0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1.5)],
+                    triangles=[(0, 1, 2), (0, 3, 1), (1, 3, 2), (0, 2, 3)]),
+        'polyhedron(points=[[0,0,0],[1,0,0],[0,1,0],[0,0,1.5]],'
+        'triangles=[[0,1,2],[0,3,1],[1,3,2],[0,2,3]]);'),
+])
+def test_compact(shape, code):
+    assert Backend(shape, compact=True).generate() == code
+
+
+def test_compact_preamble():
+    code = Backend(ast.CircleSector(radius=10, angle=90), compact=True).generate()
+    preamble, body = code.split('\n')
+    assert preamble.startswith('module circle_sector(r, a) {a1 = a % 360;')
+    assert body == 'circle_sector(10,90);'
+
+
+shape_with_preamble = ast.Union([
+    ast.Translate(1, 2, 3, ast.CircleSector(radius=10, angle=180)),
+    ast.Cube(width=1, height=2, depth=3),
+])
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_write(compact):
+    backend = Backend(shape_with_preamble, compact=compact)
+    fileobj = io.BytesIO()
+    backend.write(fileobj, chunk_lines=2)
+    assert fileobj.getvalue().decode('utf-8') == backend.generate()
+
+
+def test_write_gzip():
+    backend = Backend(shape_with_preamble)
+    fileobj = io.BytesIO()
+    backend.write(fileobj, compression='gzip')
+    assert gzip.GzipFile(fileobj=io.BytesIO(fileobj.getvalue())).read().decode('utf-8') \
+        == backend.generate()
+
+
+def test_write_zstd():
+    zstandard = pytest.importorskip('zstandard')
+    backend = Backend(shape_with_preamble)
+    fileobj = io.BytesIO()
+    backend.write(fileobj, compression='zstd')
+    data = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(fileobj.getvalue())).read()
+    assert data.decode('utf-8') == backend.generate()
+
+
+def test_write_invalid_compression():
+    with pytest.raises(ValueError):
+        Backend(ast.Circle(1)).write(io.BytesIO(), compression='rar')
+
+
+@pytest.mark.parametrize(('shape', 'code'), [
+    (ast.Union([ast.Sphere(1), ast.Translate(0, 0, 1, ast.Sphere(1))]),
+        'union(){sphere(1);translate([0,0,1]){sphere(1);};};'),
+    (ast.Union([ast.Circle(1), ast.Translate(3, 0, 0, ast.Circle(1))]),
+        'circle(1);translate([3,0,0]){circle(1);};'),
+    (ast.Union([ast.Cube(1, 1, 1), ast.Translate(1, 0, 0, ast.Cube(1, 1, 1))]),
+        'cube([1,1,1]);translate([1,0,0]){cube([1,1,1]);};'),
+    (ast.Union([ast.Cube(1, 1, 1), ast.Translate(2, 0, 0, ast.Cube(1, 1, 1))]),
+        'polyhedron(points=[[0,0,0],[0,1,0],[1,1,0],[1,0,0],[0,0,1],[0,1,1],[1,1,1],[1,0,1],'
+        '[2,0,0],[2,1,0],[3,1,0],[3,0,0],[2,0,1],[2,1,1],[3,1,1],[3,0,1]],'
+        'triangles=[[0,1,5],[0,5,4],[1,2,6],[1,6,5],[2,3,7],[2,7,6],[3,0,4],[3,4,7],'
+        '[0,2,1],[0,3,2],[4,5,6],[4,6,7],[8,9,13],[8,13,12],[9,10,14],[9,14,13],'
+        '[10,11,15],[10,15,14],[11,8,12],[11,12,15],[8,10,9],[8,11,10],[12,13,14],'
+        '[12,14,15]]);'),
+])
+def test_merge_disjoint(shape, code):
+    assert Backend(shape, precision=3, compact=True, merge_disjoint=True).generate() == code
+
+
+def test_surface():
+    backend = Backend(ast.Surface([[1, 2.5, 3], [4, 5, 6.25]]), precision=1)
+    code = backend.generate()
+    assert list(backend.sidecars) == ['surface-c927ab984998.dat']
+    assert backend.sidecars['surface-c927ab984998.dat'] == '1 2.5 3\n4 5 6.2\n'
+    assert code == 'surface(file="surface-c927ab984998.dat");'
+
+
+def test_surface_deduplicated():
+    surface = ast.Surface([[1, 2], [3, 4]])
+    backend = Backend(ast.Union([surface, ast.Translate(5, 0, 0, surface)]))
+    backend.generate()
+    assert list(backend.sidecars.values()) == ['1 2\n3 4\n']
+
+
+def test_save(tmpdir):
+    backend = Backend(ast.Union([ast.Surface([[1, 2], [3, 4]]), ast.Cube(1, 1, 1)]))
+    path = str(tmpdir.join('model.scad'))
+    backend.save(path)
+    assert sorted(f.basename for f in tmpdir.listdir()) == \
+        ['model.scad', 'surface-963dd6211440.dat']
+    assert tmpdir.join('model.scad').read() == backend.generate()
+    assert tmpdir.join('surface-963dd6211440.dat').read() == '1 2\n3 4\n'
+
+
+tetrahedron = ast.Polyhedron(points=[(0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1)],
+                             triangles=[(0, 1, 2), (0, 3, 1), (1, 3, 2), (0, 2, 3)])
+
+
+def test_mesh_threshold():
+    backend = Backend(ast.Union([tetrahedron, ast.Cube(1, 1, 1)]), mesh_threshold=3)
+    code = backend.generate()
+    filename, = backend.sidecars
+    assert filename.startswith('polyhedron-') and filename.endswith('.stl')
+    assert code == 'union()\n{\n    import("%s");\n    cube([1, 1, 1]);\n};' % filename
+    assert len(backend.sidecars[filename]) == 84 + 4 * 50
+
+
+class PolyhedronShape(BaseShape):
+    def _build_ast(self):
+        return tetrahedron
+
+
+def test_mesh_threshold_shape(tmpdir):
+    """The STL files of a shape are written by save(), render() refuses to
+    drop them."""
+    backend = partial(Backend, mesh_threshold=3)
+    with pytest.raises(ValueError):
+        PolyhedronShape().render(backend)
+    path = tmpdir.join('model.scad')
+    PolyhedronShape().save(str(path), backend)
+    filename = path.read().split('"')[1]
+    assert len(tmpdir.join(filename).read_binary()) == 84 + 4 * 50
+
+
+def test_mesh_threshold_small():
+    backend = Backend(tetrahedron, mesh_threshold=4)
+    assert backend.generate().startswith('polyhedron(')
+    assert backend.sidecars == {}
+
+
+### Scenes ###
+
+def test_scene():
+    sector = ast.CircleSector(radius=10, angle=90)
+    scene = [
+        (sector, (0, 0, 0)),
+        (ast.Cube(1, 1, 1), [20, 0, 0]),
+        (ast.CircleSector(radius=10, angle=90), (40, 0, 0)),
+        ast.Sphere(1),
+    ]
+    code = Backend(scene, compact=True).generate()
+    preamble, body = code.split('\n')
+    assert preamble.startswith('module circle_sector(r, a) {')
+    assert body == ('module part1(){circle_sector(10,90);};'
+                    'translate([0,0,0]){part1();};'
+                    'translate([20,0,0]){cube([1,1,1]);};'
+                    'translate([40,0,0]){part1();};'
+                    'sphere(1);')
+
+
+def test_scene_shapes():
+    from tangible.shapes.bars import Bars1D
+    bars = Bars1D([1, 2], bar_width=1, bar_depth=1)
+    code = Backend([(bars, (0, 0, 0)), bars]).generate()
+    assert code.startswith('module part1()\n{\n    translate([-0.5, 0, 0])\n')
+    assert code.endswith('translate([0, 0, 0])\n{\n    part1();\n};\npart1();')
+
+
+def test_scene_equal_objects():
+    """Equal objects are deduplicated, objects that differ in a nested
+    attribute are not."""
+    make = lambda height: ast.Union([ast.Cube(1, height, 1),
+                                     ast.Translate(2, 0, 0, ast.Sphere(1))])
+    scene = [(make(1), (i * 5, 0, 0)) for i in range(3)] + [(make(1.5), (20, 0, 0))]
+    code = Backend(scene, compact=True).generate()
+    assert code.count('module part') == 1
+    assert code.count('part1();') == 3
+    assert code.count('cube([1,1,1.5]);') == 1
+
+
+@pytest.mark.parametrize('scene', [
+    [(ast.Cube(1, 1, 1), (0, 0))],
+    [(ast.Cube(1, 1, 1), (0, 0, 0), 1)],
+    ['cube'],
+])
+def test_bad_scene(scene):
+    with pytest.raises(ValueError):
+        Backend(scene).generate()
+
+
+def test_iter_generate():
+    backend = Backend(shape_with_preamble)
+    assert ''.join(backend.iter_generate()) == backend.generate()
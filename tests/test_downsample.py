@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import pytest
+
+from tangible import downsample
+
+
+@pytest.mark.parametrize(('values', 'max_elements', 'expected'), [
+    ([1, 3, 5, 7, 9, 11], 3, [2, 6, 10]),
+    ([1, 3, 5, 7, 9, 11], 2, [3, 9]),
+    ([1, 2, 3, 4, 5], 2, [1.5, 4]),
+    ([1, 2, 3], 3, [1, 2, 3]),
+    ([1, 2, 3], 10, [1, 2, 3]),
+])
+def test_bucket_mean(values, max_elements, expected):
+    assert downsample.bucket_mean(values, max_elements) == expected
+
+
+@pytest.mark.parametrize(('values', 'max_elements', 'expected'), [
+    ([1, 3, 5, 7, 9, 11], 3, [3, 7, 11]),
+    ([4, 1, 8, 2, 9, 3], 2, [8, 9]),
+    ([1, 2, 3], 5, [1, 2, 3]),
+])
+def test_bucket_max(values, max_elements, expected):
+    assert downsample.bucket_max(values, max_elements) == expected
+
+
+@pytest.mark.parametrize(('values', 'max_elements', 'expected'), [
+    ([1, 9, 5, 2, 8, 3, 7, 4], 4, [1, 9, 8, 3]),
+    ([1, 9, 5, 2, 8, 3, 7, 4], 2, [1, 9]),
+    ([5, 5, 5, 5], 2, [5, 5]),
+    ([1, 2], 2, [1, 2]),
+])
+def test_minmax(values, max_elements, expected):
+    assert downsample.minmax(values, max_elements) == expected
+
+
+def test_lttb_keeps_extremes():
+    values = [0, 1, 5, 1, 0, 0, 0, -4, 0, 0]
+    assert downsample.lttb(values, 4) == [0, 5, -4, 0]
+
+
+def test_lttb_length():
+    values = [(i * 7) % 13 for i in range(1000)]
+    result = downsample.lttb(values, 50)
+    assert len(result) == 50
+    assert result[0] == values[0]
+    assert result[-1] == values[-1]
+
+
+@pytest.mark.parametrize(('method', 'max_elements'), [
+    ('mean', 0),
+    ('max', 0),
+    ('minmax', 1),
+    ('lttb', 2),
+    ('median', 10),
+])
+def test_invalid_arguments(method, max_elements):
+    with pytest.raises(ValueError):
+        downsample.downsample(range(100), max_elements, method)
+
+
+@pytest.mark.parametrize('method', ['mean', 'max', 'minmax', 'lttb'])
+def test_downsample_caps_length(method):
+    values = list(range(1001))
+    assert len(downsample.downsample(values, 100, method)) <= 100
+
+
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_downsample_datasets_aligned(method):
+    """The same datapoints are selected in all datasets, the peaks of both
+    are kept."""
+    first, second = downsample.downsample_datasets([[0, 10, 0, 0, 0], [0, 0, 0, 10, 0]], 4,
+                                                   method)
+    assert len(first) == len(second) == 4
+    assert first.index(10) < second.index(10)
+    assert first.count(0) == second.count(0) == 3
+
+
+@pytest.mark.parametrize('method', ['mean', 'max', 'minmax', 'lttb'])
+def test_downsample_datasets_single(method):
+    values = [(i * 7) % 13 for i in range(100)]
+    assert downsample.downsample_datasets([values], 10, method) == \
+        [downsample.downsample(values, 10, method)]
+
+
+def test_downsample_datasets_lengths():
+    """Datasets of different lengths are reduced separately."""
+    result = downsample.downsample_datasets([[1, 9, 5, 2], [1, 2, 9, 5, 3, 4]], 2, 'minmax')
+    assert result == [[1, 9], [1, 9]]
+
+
+def test_downsample_datasets_invalid():
+    with pytest.raises(ValueError):
+        downsample.downsample_datasets([[1, 2, 3], [4, 5, 6]], 2, 'lttb')
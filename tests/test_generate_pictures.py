@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'docs'))
+import generate_pictures  # NOQA
+
+
+# Instead of a picture, the fake renderer writes the OpenSCAD code
+FAKE_RENDERER = '''
+import shutil, sys
+if 'fail' in sys.argv[1]:
+    sys.exit(1)
+shutil.copy(sys.argv[1], sys.argv[2])
+'''
+
+
+@pytest.fixture
+def command(tmpdir):
+    script = tmpdir.join('fake_openscad.py')
+    script.write(FAKE_RENDERER)
+    return '{} {} {{input}} {{output}}'.format(sys.executable, script)
+
+
+@pytest.fixture
+def pictures(tmpdir):
+    return tmpdir.mkdir('pictures')
+
+
+def test_example_names():
+    names = generate_pictures.example_names()
+    assert 'bars_1d' in names
+    assert 'angle_radius_height_pie_3d' in names
+
+
+def test_generate_code():
+    code = generate_pictures.generate_code('bars_1d')
+    assert 'cube(' in code
+
+
+def test_generate(command, pictures):
+    names = ['bars_1d', 'circle_tower_1d', 'no_such_example']
+    status = generate_pictures.generate(names, str(pictures), command=command, processes=2)
+    assert status == {
+        'bars_1d': 'rendered',
+        'circle_tower_1d': 'rendered',
+        'no_such_example': 'missing',
+    }
+    assert pictures.join('bars_1d.png').read() == generate_pictures.generate_code('bars_1d')
+    hashes = json.loads(pictures.join(generate_pictures.HASHES).read())
+    assert sorted(hashes) == ['bars_1d', 'circle_tower_1d']
+
+    # Unchanged pictures are skipped
+    status = generate_pictures.generate(names[:2], str(pictures), command=command)
+    assert status == {'bars_1d': 'skipped', 'circle_tower_1d': 'skipped'}
+
+    # Missing pictures and changed hashes are rendered again
+    pictures.join('bars_1d.png').remove()
+    hashes['circle_tower_1d'] = 'outdated'
+    pictures.join(generate_pictures.HASHES).write(json.dumps(hashes))
+    status = generate_pictures.generate(names[:2], str(pictures), command=command)
+    assert status == {'bars_1d': 'rendered', 'circle_tower_1d': 'rendered'}
+
+    # Everything is rendered when forced
+    status = generate_pictures.generate(names[:2], str(pictures), command=command, force=True)
+    assert status == {'bars_1d': 'rendered', 'circle_tower_1d': 'rendered'}
+
+
+def test_generate_failed(command, pictures):
+    command = command.replace('{input}', '{input}-fail')
+    messages = []
+    status = generate_pictures.generate(['bars_1d'], str(pictures), command=command,
+                                        log=messages.append)
+    assert status == {'bars_1d': 'failed'}
+    assert len(messages) == 1
+    assert json.loads(pictures.join(generate_pictures.HASHES).read()) == {}
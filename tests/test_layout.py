@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import random
+
+import pytest
+
+from tangible import ast, layout, optimize, shapes
+
+
+def placed(plate):
+    return [ast.Translate(x, y, z, item if isinstance(item, ast.AST) else item._build_ast())
+            for item, (x, y, z) in plate]
+
+
+def test_skyline():
+    skyline = layout._Skyline(10, 10)
+    assert skyline.insert(4, 2) == (0, 0)
+    assert skyline.insert(4, 3) == (4, 0)
+    assert skyline.insert(2, 5) == (8, 0)
+    assert skyline.insert(6, 1) == (0, 3)
+    assert skyline.segments == [[0, 4, 6], [6, 3, 2], [8, 5, 2]]
+    assert skyline.insert(11, 1) is None
+    assert skyline.insert(2, 8) is None
+
+
+def test_pack():
+    cubes = [ast.Cube(6, 1, 4), ast.Cube(4, 1, 6), ast.Cube(4, 1, 4), ast.Cube(6, 1, 6)]
+    plates = layout.pack(cubes, (10, 10))
+    assert len(plates) == 1
+    assert plates[0] == [
+        (cubes[3], (0, 0, 0)),
+        (cubes[1], (6, 0, 0)),
+        (cubes[0], (0, 6, 0)),
+        (cubes[2], (6, 6, 0)),
+    ]
+
+
+def test_pack_offset():
+    """Shapes are moved to the plate origin and onto z=0."""
+    tower = shapes.vertical.CircleTower1D([1, 2, 3], layer_height=10)
+    sphere = ast.Sphere(2)
+    plates = layout.pack([sphere, tower], (12, 10), spacing=1)
+    assert plates == [[(tower, (3, 3, 0)), (sphere, (9, 2, 2))]]
+    assert len(layout.pack([sphere, tower], (10, 10), spacing=1)) == 2
+
+
+def test_pack_plates():
+    rand = random.Random(42)
+    cubes = [ast.Cube(rand.uniform(1, 10), 1, rand.uniform(1, 10)) for i in range(200)]
+    plates = layout.pack(cubes, (30, 20), spacing=0.5)
+    assert sum(len(plate) for plate in plates) == 200
+    for plate in plates:
+        nodes = placed(plate)
+        assert optimize.overlapping_pairs(nodes) == []
+        for node in nodes:
+            box = node.bounds()
+            assert box.xmin >= 0 and box.ymin >= 0
+            assert box.xmax <= 30 + 1e-9 and box.ymax <= 20 + 1e-9
+
+
+def test_pack_too_large():
+    with pytest.raises(ValueError):
+        layout.pack([ast.Cube(1, 1, 1), ast.Cube(11, 1, 1)], (10, 10))
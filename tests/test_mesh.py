@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import math
+import struct
+
+import pytest
+
+from tangible import ast, mesh
+from tangible.shapes.bars import BarsND
+from tangible.shapes.pie import AnglePie1D
+
+
+tetrahedron = ast.Polyhedron(
+    points=[(0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1)],
+    triangles=[(0, 1, 2), (0, 3, 1), (1, 3, 2), (0, 2, 3)],
+)
+
+
+### Tessellation ###
+
+@pytest.mark.parametrize(('node', 'volume'), [
+    (ast.Cube(1, 2, 3), 6),
+    (tetrahedron, 1 / 6),
+    (ast.Cylinder(3, 2, 2), math.pi * 4 * 3),
+    (ast.Sphere(2), 4 / 3 * math.pi * 8),
+    (ast.LinearExtrusion(2, ast.Rectangle(3, 4)), 24),
+    (ast.LinearExtrusion(2, ast.CircleSector(10, 90)), math.pi * 100 / 4 * 2),
+    (ast.LinearExtrusion(2, ast.Polygon([(0, 0), (2, 0), (2, 2), (1, 1), (0, 2), (0, 0)])), 6),
+    (ast.RotateExtrusion(ast.Translate(5, 0, 0, ast.Circle(1))), 2 * math.pi ** 2 * 5),
+    (ast.Surface([[1, 2, 3], [4, 5, 0.5], [2, 2, 2]]), 13.25),
+    (ast.Surface([[1, 2], [4, -5]]), 6.5),
+    (ast.Translate(1, 2, 3, ast.Cube(1, 2, 3)), 6),
+    (ast.Mirror([1, 1, 0], ast.Cube(1, 2, 3)), 6),
+    (ast.Rotate(30, [1, 1, 0], ast.Cube(1, 2, 3)), 6),
+    (ast.Scale(2, -1, 1, ast.Cube(1, 2, 3)), 12),
+    (ast.Union([ast.Cube(1, 2, 3), ast.Sphere(1)]), 6 + 4 / 3 * math.pi),
+    (ast.Difference([ast.Cube(1, 2, 3), ast.Sphere(1)]), 6),
+])
+def test_tessellate(node, volume):
+    meshes = mesh.tessellate(node, segments=256)
+    assert sum(mesh.signed_volume(m) for m in meshes) == pytest.approx(volume, rel=1e-3)
+
+
+def test_tessellate_count():
+    model = BarsND([[1, 2, 3], [4, 5, 6]], 1, 1)._build_ast()
+    meshes = mesh.tessellate(model)
+    assert len(meshes) == 6
+    assert all(len(m.triangles) == 12 for m in meshes)
+
+
+def test_tessellate_unsupported():
+    with pytest.raises(NotImplementedError):
+        mesh.tessellate(ast.LinearExtrusion(2, ast.Union([ast.Circle(1), ast.Circle(2)])))
+
+
+def test_transformed_translate():
+    matrix = ast.Translate(1, 2, 3, ast.Circle(1)).matrix()
+    assert mesh.Mesh([(1, 1, 1)], []).transformed(matrix).points == [(2, 3, 4)]
+
+
+def test_transformed_rotate():
+    matrix = ast.Rotate(90, [0, 0, 1], ast.Circle(1)).matrix()
+    point = mesh.Mesh([(1, 0, 0)], []).transformed(matrix).points[0]
+    assert point == pytest.approx((0, 1, 0))
+
+
+### Checks ###
+
+@pytest.mark.parametrize('node', [
+    tetrahedron,
+    ast.Cube(1, 2, 3),
+    ast.Surface([[1, 2, 3], [4, 5, 0.5], [2, 2, 2]]),
+    AnglePie1D([1, 2, 3], inner_radius=3)._build_ast(),
+    BarsND([[1, 2, 3], [4, 5, 6]], 1, 1)._build_ast(),
+])
+def test_check_ok(node):
+    report = mesh.check(node)
+    assert report.ok
+    assert report.mesh_count >= 1
+
+
+def test_check_boundary():
+    # Tetrahedron without bottom
+    polyhedron = ast.Polyhedron(points=tetrahedron.points, triangles=tetrahedron.triangles[1:])
+    report = mesh.check(polyhedron)
+    assert not report.ok
+    assert set(frozenset(edge) for edge in report.boundary_edges) == set([
+        frozenset([(0, 0, 0), (0, 1, 0)]),
+        frozenset([(0, 1, 0), (1, 0, 0)]),
+        frozenset([(1, 0, 0), (0, 0, 0)]),
+    ])
+
+
+def test_check_inconsistent_winding():
+    triangles = [(0, 2, 1)] + tetrahedron.triangles[1:]
+    report = mesh.check(ast.Polyhedron(points=tetrahedron.points, triangles=triangles))
+    assert not report.ok
+    assert len(report.inconsistent_edges) == 3
+    assert report.boundary_edges == []
+
+
+def test_check_non_manifold():
+    # Two tetrahedra sharing the edge (0, 3)
+    points = tetrahedron.points + [(-1, 0, 0), (0, -1, 0)]
+    triangles = tetrahedron.triangles + [(0, 5, 4), (0, 3, 5), (5, 3, 4), (0, 4, 3)]
+    report = mesh.check(ast.Polyhedron(points=points, triangles=triangles))
+    assert report.non_manifold_edges == [((0, 0, 0), (0, 0, 1))]
+
+
+def test_check_inverted():
+    triangles = [(a, c, b) for a, b, c in tetrahedron.triangles]
+    report = mesh.check(ast.Polyhedron(points=tetrahedron.points, triangles=triangles))
+    assert report.inverted_meshes == 1
+    assert not report.ok
+
+
+### Export ###
+
+def test_to_stl():
+    cube = mesh.tessellate(ast.Translate(-1, -1, -1, ast.Cube(2, 2, 2)))[0]
+    data = mesh.to_stl([cube, cube], header=b'cube')
+    assert data[:80] == b'cube'.ljust(80)
+    count, = struct.unpack('<I', data[80:84])
+    assert count == 24
+    assert len(data) == 84 + 50 * 24
+    for i in range(count):
+        facet = struct.unpack('<12fH', data[84 + 50 * i:134 + 50 * i])
+        normal, a, b, c = facet[0:3], facet[3:6], facet[6:9], facet[9:12]
+        # Normals point outwards, facets are counter-clockwise
+        assert sum(n * v for n, v in zip(normal, a)) == pytest.approx(1)
+        u = [b[k] - a[k] for k in range(3)]
+        v = [c[k] - a[k] for k in range(3)]
+        cross = (u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0])
+        assert sum(n * x for n, x in zip(normal, cross)) > 0
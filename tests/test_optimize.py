@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import pytest
+
+from tangible import ast, optimize, shapes
+
+
+def cube_at(x, y=0, z=0, size=1):
+    return ast.Translate(x, y, z, ast.Cube(size, size, size))
+
+
+@pytest.mark.parametrize(('items', 'touching', 'pairs'), [
+    ([cube_at(0), cube_at(2), cube_at(4)], False, []),
+    ([cube_at(0), cube_at(1), cube_at(2)], False, []),
+    ([cube_at(0), cube_at(1), cube_at(2)], True, [(0, 1), (1, 2)]),
+    ([cube_at(0), cube_at(0.5), cube_at(3), cube_at(0.5, 0, 0.5)], False,
+        [(0, 1), (0, 3), (1, 3)]),
+    ([cube_at(0), cube_at(0.5, 2), cube_at(0.5, 0, 2)], False, []),
+    ([ast.Circle(1), ast.Translate(1, 0, 0, ast.Circle(1))], False, [(0, 1)]),
+])
+def test_overlapping_pairs(items, touching, pairs):
+    assert optimize.overlapping_pairs(items, touching) == pairs
+
+
+def test_merge_disjoint_overlapping():
+    node = ast.Union([cube_at(0), cube_at(0.5)])
+    assert optimize.merge_disjoint(node) == [node]
+
+
+def test_merge_disjoint_mixed():
+    sphere = ast.Translate(5, 0, 0, ast.Sphere(1))
+    extrusion = ast.LinearExtrusion(1, ast.Rectangle(1, 1))
+    node = ast.Translate(1, 0, 0, ast.Union([
+        ast.Union([cube_at(0), cube_at(1)]),
+        ast.Translate(0, 2, 0, extrusion),
+        sphere,
+    ]))
+    items = optimize.merge_disjoint(node)
+    assert len(items) == 3
+    polyhedron, cube, rest = items
+    # The touching cubes are kept apart
+    assert isinstance(polyhedron, ast.Polyhedron)
+    assert len(polyhedron.points) == 16
+    assert cube == ast.Translate(1, 0, 0, cube_at(1))
+    assert rest == ast.Translate(1, 0, 0, sphere)
+    assert rest.bounds() == (5, -1, -1, 7, 1, 1)
+
+
+def test_merge_disjoint_difference():
+    """Unions inside differences are kept."""
+    node = ast.Difference([ast.Union([cube_at(0), cube_at(2)]), cube_at(0.5, size=0.2)])
+    assert optimize.merge_disjoint(node) == [node]
+
+
+def shells(polyhedron):
+    """Split a polyhedron into its connected shells, as polyhedra."""
+    parent = list(range(len(polyhedron.points)))
+
+    def root(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for a, b, c in polyhedron.triangles:
+        parent[root(b)] = parent[root(c)] = root(a)
+    groups = {}
+    for i in range(len(parent)):
+        groups.setdefault(root(i), []).append(polyhedron.points[i])
+    return [ast.Polyhedron(points=points, triangles=[(0, 1, 2)]) for points in groups.values()]
+
+
+def test_merge_disjoint_shape():
+    """Touching bars are never merged into the same polyhedron."""
+    bars = shapes.bars.BarsND([[1, 2, 3], [2, 3, 4]], bar_width=1, bar_depth=1)
+    items = optimize.merge_disjoint(bars._build_ast())
+    assert 1 < len(items) < 6
+    polyhedra = [item for item in items if isinstance(item, ast.Polyhedron)]
+    assert polyhedra
+    for item in polyhedra:
+        assert optimize.overlapping_pairs(shells(item), touching=True) == []
+    assert sum(len(shells(item)) for item in polyhedra) + len(items) - len(polyhedra) == 6
+    assert sum(item.estimate_volume() for item in items) == pytest.approx(1 + 2 + 3 + 2 + 3 + 4)
+
+
+def test_merge_disjoint_separated():
+    """Strictly separated objects are merged into a single polyhedron."""
+    items = optimize.merge_disjoint(ast.Union([cube_at(0), cube_at(2), cube_at(4)]))
+    assert len(items) == 1
+    assert len(shells(items[0])) == 3
+
+
+def test_balance_union():
+    cubes = [cube_at(x) for x in [5, 0, 3, 1, 4, 2]]
+    node = optimize.balance(ast.Union(cubes))
+    assert node.bounds() == ast.Union(cubes).bounds()
+    # Sorted along the X axis and split in halves
+    left, right = node.items
+    assert left.items[0] == cube_at(0)
+    assert left.items[1] == ast.Union([cube_at(1), cube_at(2)])
+    assert right.items[0] == cube_at(3)
+    assert right.items[1] == ast.Union([cube_at(4), cube_at(5)])
+
+
+@pytest.mark.parametrize('fanin', [2, 3, 4])
+def test_balance_fanin(fanin):
+    node = optimize.balance(ast.Union([cube_at(x) for x in range(30)]), fanin)
+
+    def check(node):
+        if isinstance(node, ast.Union):
+            assert 2 <= len(node.items) <= fanin
+            for item in node.items:
+                check(item)
+    check(node)
+    assert node.estimate_volume() == 30
+
+
+def test_balance_difference():
+    holes = [cube_at(x, size=0.5) for x in range(5)]
+    node = optimize.balance(ast.Difference([ast.Cube(5, 1, 1)] + holes))
+    assert len(node.items) == 2
+    assert node.items[0] == ast.Cube(5, 1, 1)
+    assert isinstance(node.items[1], ast.Union)
+
+
+def test_balance_small():
+    node = ast.Translate(1, 0, 0, ast.Union([cube_at(0), cube_at(1)]))
+    assert optimize.balance(node) == node
+
+
+def test_balance_reduces_cost():
+    from tangible import analysis
+    tower = shapes.vertical.SquareTower1D(list(range(1, 30)), layer_height=1)
+    original = tower._build_ast()
+    assert analysis.analyze(optimize.balance(original)).cost < analysis.analyze(original).cost
+
+
+def test_balance_bad_fanin():
+    with pytest.raises(ValueError):
+        optimize.balance(ast.Cube(1, 1, 1), fanin=1)
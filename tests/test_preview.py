@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import struct
+import zlib
+
+import pytest
+
+from tangible import ast, preview
+from tangible.shapes.bars import BarsND
+
+
+def decode_png(data):
+    """Decode a PNG file written by the preview module into a list of rows of
+    RGB tuples."""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks = {}
+    position = 8
+    while position < len(data):
+        length, = struct.unpack('>I', data[position:position + 4])
+        kind = data[position + 4:position + 8]
+        chunk = data[position + 8:position + 8 + length]
+        crc, = struct.unpack('>I', data[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(kind + chunk) & 0xffffffff
+        chunks[kind] = chunk
+        position += length + 12
+    width, height, depth, color_type = struct.unpack('>IIBB', chunks[b'IHDR'][:10])
+    assert (depth, color_type) == (8, 2)
+    raw = bytearray(zlib.decompress(chunks[b'IDAT']))
+    rows = []
+    for y in range(height):
+        line = raw[y * (width * 3 + 1):(y + 1) * (width * 3 + 1)]
+        assert line[0] == 0
+        rows.append([tuple(line[1 + x * 3:4 + x * 3]) for x in range(width)])
+    return rows
+
+
+def test_encode_png():
+    pixels = bytearray([255, 0, 0, 0, 255, 0, 0, 0, 255, 1, 2, 3])
+    rows = decode_png(preview.encode_png(2, 2, pixels))
+    assert rows == [[(255, 0, 0), (0, 255, 0)], [(0, 0, 255), (1, 2, 3)]]
+
+
+def test_render():
+    rows = decode_png(preview.render(ast.Cube(10, 10, 10), size=(40, 30)))
+    assert len(rows) == 30 and len(rows[0]) == 40
+    # The corners are empty, the center shows the cube
+    assert rows[0][0] == rows[-1][-1] == preview.BACKGROUND
+    r, g, b = rows[15][20]
+    assert (r, g, b) != preview.BACKGROUND
+    assert r / preview.COLOR[0] == pytest.approx(g / preview.COLOR[1], abs=0.02)
+
+
+def test_render_front():
+    """A cube seen from the front fills the image except for the margin."""
+    rows = decode_png(preview.render(ast.Cube(10, 10, 10), size=(20, 20), azimuth=0,
+                                     elevation=0, margin=0.1))
+    filled = [[pixel != preview.BACKGROUND for pixel in row] for row in rows]
+    assert filled == [[2 <= x < 18 and 2 <= y < 18 for x in range(20)] for y in range(20)]
+    assert len(set(rows[y][x] for x in range(2, 18) for y in range(2, 18))) == 1
+
+
+def test_render_depth():
+    """Nearer triangles hide triangles behind them, regardless of their
+    order."""
+    near = ((0, 0, 1), (0, 4, 1), (4, 0, 1), 1)
+    far = ((0, 0, 2), (0, 4, 2), (4, 0, 2), 0.5)
+    for triangles in [[near, far], [far, near]]:
+        pixels = preview._rasterize(triangles, 4, 4, (200, 100, 50), (0, 0, 0))
+        assert pixels[:3] == bytearray([200, 100, 50])
+        assert pixels[-3:] == bytearray([0, 0, 0])
+
+
+def test_shade():
+    assert preview._shade((0, 0, 0), (0, 1, 0), (1, 0, 0)) == \
+        preview._shade((0, 0, 0), (1, 0, 0), (0, 1, 0))
+    assert 0.35 <= preview._shade((0, 0, 0), (0, 0, 1), (1, 0, 0)) <= 1
+    assert preview._shade((0, 0, 0), (1, 0, 0), (2, 0, 0)) == 0.35
+
+
+def test_save(tmpdir):
+    path = str(tmpdir.join('bars.png'))
+    shape = BarsND([[1, 2, 3], [4, 5, 6]], 1, 1)
+    preview.save(shape, path, size=(50, 40))
+    with open(path, 'rb') as f:
+        assert f.read() == preview.render(shape, size=(50, 40))
+
+
+def test_render_many():
+    shapes = [ast.Cube(1, 2, 3), ast.Sphere(2), BarsND([[1, 2], [3, 4]], 1, 1)]
+    images = preview.render_many(shapes, processes=2, size=(30, 20))
+    assert images == [preview.render(shape, size=(30, 20)) for shape in shapes]
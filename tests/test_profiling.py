@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import logging
+from functools import partial
+
+import pytest
+
+from tangible import ast, profiling
+from tangible.backends.openscad import OpenScadBackend
+from tangible.shapes.bars import BarsND
+
+
+@pytest.fixture
+def hooks():
+    """Remove all hooks after the test."""
+    yield profiling._hooks
+    del profiling._hooks[:]
+
+
+def test_disabled():
+    assert not profiling.enabled()
+    with profiling.phase('build'):
+        pass
+
+
+def test_profile():
+    with profiling.profile() as p:
+        assert profiling.enabled()
+        shape = BarsND([[1, 2, 3], [4, 5, 6]], 1, 1)
+        code = shape.render(OpenScadBackend)
+    assert not profiling.enabled()
+    assert list(p.phases) == ['init', 'build', 'program', 'code', 'generate']
+    assert all(t >= 0 for t in p.phases.values())
+    assert p.phases['generate'] >= p.phases['program']
+    assert p.total == pytest.approx(p.phases['init'] + p.phases['build'] + p.phases['generate'])
+    assert (p.shape, p.backend) == ('BarsND', 'OpenScadBackend')
+    assert p.node_counts == {'Union': 3, 'Translate': 9, 'Cube': 6}
+    assert p.output_bytes == len(code.encode('utf-8'))
+    assert p.peak_memory is None
+    assert p.as_dict()['nodes'] == 18
+
+
+def test_profile_partial_backend():
+    """Backends without a name, e.g. partials, are named after their type."""
+    shape = BarsND([[1, 2, 3], [4, 5, 6]], 1, 1)
+    with profiling.profile() as p:
+        code = shape.render(partial(OpenScadBackend, precision=2))
+    assert p.backend == 'partial'
+    assert code == OpenScadBackend(shape._build_ast(), precision=2).generate()
+
+
+def test_profile_generate():
+    """Calling a backend directly records the backend phases only."""
+    with profiling.profile() as p:
+        OpenScadBackend(ast.Cube(1, 2, 3)).generate()
+    assert list(p.phases) == ['program', 'code']
+    assert p.shape is None
+
+
+def test_profile_memory():
+    with profiling.profile(memory=True) as p:
+        BarsND([[1, 2, 3], [4, 5, 6]], 1, 1).render(OpenScadBackend)
+    assert p.peak_memory > 0
+
+
+def test_profile_nested():
+    with profiling.profile():
+        with pytest.raises(RuntimeError):
+            with profiling.profile():
+                pass
+
+
+def test_hooks(hooks):
+    profiles = []
+    profiling.add_hook(profiles.append)
+    shape = BarsND([[1, 2, 3], [4, 5, 6]], 1, 1)
+    shape.render(OpenScadBackend)
+    shape.render(OpenScadBackend)
+    assert len(profiles) == 2
+    assert list(profiles[0].phases) == ['build', 'program', 'code', 'generate']
+
+    # Within a profile, the hooks are called once at the end
+    with profiling.profile() as p:
+        shape.render(OpenScadBackend)
+        shape.render(OpenScadBackend)
+    assert profiles[2] is p
+    assert p.node_counts['Cube'] == 12
+
+    profiling.remove_hook(profiles.append)
+    assert not profiling.enabled()
+    shape.render(OpenScadBackend)
+    assert len(profiles) == 3
+
+
+def test_hooks_memory(hooks):
+    profiles = []
+    profiling.add_hook(profiles.append, memory=True)
+    BarsND([[1, 2, 3], [4, 5, 6]], 1, 1).render(OpenScadBackend)
+    assert profiles[0].peak_memory > 0
+
+
+def test_hooks_error(hooks):
+    """Failed renders are not reported."""
+    profiles = []
+    profiling.add_hook(profiles.append)
+
+    class BrokenBackend(object):
+        def __init__(self, ast):
+            raise ValueError('Broken')
+
+    with pytest.raises(ValueError):
+        BarsND([[1, 2, 3], [4, 5, 6]], 1, 1).render(BrokenBackend)
+    assert profiles == []
+    assert getattr(profiling._local, 'profile', None) is None
+
+
+def test_log_hook(hooks, caplog):
+    caplog.set_level(logging.INFO, logger='tangible.profiling')
+    profiling.add_hook(profiling.log_hook())
+    BarsND([[1, 2, 3], [4, 5, 6]], 1, 1).render(OpenScadBackend)
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().startswith('<Profile BarsND: build ')
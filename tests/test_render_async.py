@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import pytest
+
+from tangible.backends.openscad import OpenScadBackend
+from tangible.shapes.bars import BarsND
+from tangible.shapes.surface import Surface2D
+
+
+class CountingBackend(object):
+    """Backend that generates ten pieces of code and counts them."""
+    generated = 0
+
+    def __init__(self, ast):
+        pass
+
+    def iter_generate(self):
+        for i in range(10):
+            CountingBackend.generated += 1
+            yield '{};'.format(i)
+
+
+class PlainBackend(object):
+    def __init__(self, ast):
+        pass
+
+    def generate(self):
+        return 'code'
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+@pytest.fixture
+def shape():
+    return BarsND([[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]], 1, 1)
+
+
+def collect(stream, loop):
+    chunks = []
+    while True:
+        try:
+            chunks.append(loop.run_until_complete(stream.__anext__()))
+        except StopAsyncIteration:
+            return chunks
+
+
+@pytest.mark.parametrize('executor_class', [None, ThreadPoolExecutor, ProcessPoolExecutor])
+def test_render_async(loop, shape, executor_class):
+    executor = executor_class(2) if executor_class else None
+    try:
+        future = shape.render_async(OpenScadBackend, executor=executor)
+        assert loop.run_until_complete(future) == shape.render(OpenScadBackend)
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def test_render_stream(loop, shape):
+    chunks = collect(shape.render_stream(OpenScadBackend, chunk_size=100), loop)
+    assert ''.join(chunks) == shape.render(OpenScadBackend)
+    assert len(chunks) > 1
+    assert all(len(chunk) >= 100 for chunk in chunks[:-1])
+
+
+def test_render_stream_executor(loop, shape):
+    with ThreadPoolExecutor(1) as executor:
+        stream = shape.render_stream(OpenScadBackend, executor=executor)
+        assert collect(stream, loop) == [shape.render(OpenScadBackend)]
+
+
+def test_render_stream_generate(loop, shape):
+    """Backends without iter_generate are supported."""
+    assert collect(shape.render_stream(PlainBackend), loop) == ['code']
+
+
+def test_render_stream_sidecars(loop):
+    surface = Surface2D([[1, 2, 3], [2, 3, 4]])
+    with pytest.raises(ValueError):
+        collect(surface.render_stream(OpenScadBackend), loop)
+
+
+def test_render_stream_cancel(loop, shape):
+    CountingBackend.generated = 0
+    stream = shape.render_stream(CountingBackend, chunk_size=1)
+    assert loop.run_until_complete(stream.__anext__()) == '0;'
+    future = stream.__anext__()
+    future.cancel()
+    loop.run_until_complete(asyncio.sleep(0))
+    with pytest.raises(StopAsyncIteration):
+        loop.run_until_complete(stream.__anext__())
+    assert CountingBackend.generated <= 2
+
+
+def test_render_stream_aclose(loop, shape):
+    stream = shape.render_stream(OpenScadBackend, chunk_size=1)
+    loop.run_until_complete(stream.__anext__())
+    loop.run_until_complete(stream.aclose())
+    assert collect(stream, loop) == []
+
+
+def test_render_stream_invalid(shape):
+    with pytest.raises(ValueError):
+        shape.render_stream(OpenScadBackend, chunk_size=0)
+    with ProcessPoolExecutor(1) as executor:
+        with pytest.raises(ValueError):
+            shape.render_stream(OpenScadBackend, executor=executor)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import asyncio
+import sys
+
+import pytest
+
+from tangible import ast, runner
+from tangible.backends.openscad import OpenScadBackend
+
+
+# The stub renderer writes the program and the names of the other files in
+# its directory into the output file, and logs every call.
+STUB = '''
+import os, sys, time
+source, output, log = sys.argv[1:4]
+with open(log, 'a') as f:
+    f.write('x')
+with open(source) as f:
+    code = f.read()
+if 'sleep' in code:
+    time.sleep(float(code.split()[1]))
+if 'fail' in code:
+    sys.stderr.write('syntax error')
+    sys.exit(2)
+if 'nothing' in code:
+    sys.exit(0)
+others = sorted(set(os.listdir('.')) - {'model.scad'})
+with open(output, 'w') as f:
+    f.write(code + '|' + ','.join(others))
+'''
+
+
+@pytest.fixture
+def log(tmpdir):
+    return tmpdir.join('calls.log')
+
+
+@pytest.fixture
+def command(tmpdir, log):
+    script = tmpdir.join('stub.py')
+    script.write(STUB)
+    return '{} {} {{input}} {{output}} {}'.format(sys.executable, script, log)
+
+
+def calls(log):
+    return len(log.read()) if log.exists() else 0
+
+
+def test_run(command, log):
+    with runner.Runner(command) as r:
+        assert r.run('cube(1);') == b'cube(1);|'
+        assert r.run('cube(1);') == b'cube(1);|'
+        assert r.run('cube(2);') == b'cube(2);|'
+    assert calls(log) == 2
+    assert (r.hits, r.misses) == (1, 2)
+
+
+def test_run_sidecars(command):
+    backend = OpenScadBackend(ast.Surface([[1, 2], [3, 4]]))
+    with runner.Runner(command) as r:
+        output = r.run(backend)
+    assert output == backend.generate().encode('utf-8') + b'|surface-963dd6211440.dat'
+
+
+def test_map(command, log):
+    programs = ['a', 'b', 'a', 'c']
+    with runner.Runner(command, workers=2) as r:
+        assert r.map(programs) == [b'a|', b'b|', b'a|', b'c|']
+    assert calls(log) == 3
+
+
+def test_cache_eviction(command, log):
+    with runner.Runner(command, cache_size=2) as r:
+        for program in ['a', 'b', 'a', 'c', 'a', 'b']:
+            r.run(program)
+    # 'b' is evicted when 'c' is added, because 'a' was used more recently
+    assert calls(log) == 4
+    assert len(r._cache) == 2
+
+
+def test_cache_disabled(command, log):
+    with runner.Runner(command, cache_size=0) as r:
+        r.run('a')
+        r.run('a')
+    assert calls(log) == 2
+
+
+def test_clear_cache(command, log):
+    with runner.Runner(command) as r:
+        r.run('a')
+        r.clear_cache()
+        r.run('a')
+    assert calls(log) == 2
+
+
+def test_pending(command, log):
+    """A program is rendered only once, even if it is submitted again while
+    rendering."""
+    with runner.Runner(command) as r:
+        first = r.submit('sleep 0.3')
+        second = r.submit('sleep 0.3')
+        assert first is not second
+        assert first.result() == second.result() == b'sleep 0.3|'
+    assert calls(log) == 1
+
+
+def test_workers(command):
+    """The number of concurrent renderer processes is bounded."""
+    with runner.Runner(command, workers=1) as r:
+        futures = [r.submit('sleep 0.3 {}'.format(i)) for i in range(2)]
+        futures[0].result()
+        assert not futures[1].done()
+        assert [f.result() for f in futures] == [b'sleep 0.3 0|', b'sleep 0.3 1|']
+
+
+def test_timeout(command):
+    with runner.Runner(command, timeout=0.2) as r:
+        with pytest.raises(runner.RenderTimeout):
+            r.run('sleep 5')
+
+
+def test_error(command):
+    with runner.Runner(command) as r:
+        with pytest.raises(runner.RenderError) as excinfo:
+            r.run('fail')
+        assert excinfo.value.returncode == 2
+        assert excinfo.value.stderr == 'syntax error'
+        with pytest.raises(runner.RenderError):
+            r.run('nothing')
+        # Errors are not cached
+        with pytest.raises(runner.RenderError):
+            r.run('fail')
+        assert r.misses == 3
+
+
+def test_missing_command():
+    with runner.Runner('no-such-renderer-executable {input} {output}') as r:
+        with pytest.raises(runner.RenderError):
+            r.run('cube(1);')
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'workers': 0},
+    {'timeout': 0},
+    {'cache_size': -1},
+])
+def test_invalid(kwargs):
+    with pytest.raises(ValueError):
+        runner.Runner(**kwargs)
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def test_run_async(command, log, loop):
+    with runner.Runner(command) as r:
+        futures = [r.run_async(program) for program in ['a', 'b', 'a']]
+        results = loop.run_until_complete(asyncio.gather(*futures))
+    assert results == [b'a|', b'b|', b'a|']
+    assert calls(log) == 2
+
+
+def test_run_async_cancel(command, log, loop):
+    with runner.Runner(command, workers=1) as r:
+        first = r.run_async('sleep 0.2')
+        second = r.run_async('b')
+        second.cancel()
+        assert loop.run_until_complete(first) == b'sleep 0.2|'
+        with pytest.raises(asyncio.CancelledError):
+            loop.run_until_complete(second)
+    assert calls(log) == 1
+
+
+def test_run_async_cancel_shared(command, log, loop):
+    """Cancelling one of several callers of the same program doesn't cancel
+    the others."""
+    with runner.Runner(command, workers=1) as r:
+        blocker = r.run_async('sleep 0.2')
+        first = r.run_async('b')
+        second = r.run_async('b')
+        first.cancel()
+        assert loop.run_until_complete(second) == b'b|'
+        with pytest.raises(asyncio.CancelledError):
+            loop.run_until_complete(first)
+        loop.run_until_complete(blocker)
+    assert calls(log) == 2
+
+
+def test_cancel_all_callers(command, log):
+    """The job is cancelled once all of its callers have cancelled."""
+    with runner.Runner(command, workers=1) as r:
+        blocker = r.submit('sleep 0.2')
+        futures = [r.submit('b'), r.submit('b')]
+        assert all(future.cancel() for future in futures)
+        assert blocker.result() == b'sleep 0.2|'
+        assert r.run('b') == b'b|'
+    assert calls(log) == 2
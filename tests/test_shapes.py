@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import, unicode_literals
 
+import math
+
 import pytest
 
-from tangible import shapes
+from tangible import shapes, ast
+from tangible.backends.openscad import OpenScadBackend
 from tangible.shapes.base import Shape
 
 
@@ -39,3 +42,167 @@ def test_base_pie(data, angle):
     assert len(my_pie.angles) == len(data), "# of angles should equal # of datapoints."
     assert my_pie.angles[0] == angle, "Angle should be 360/len(datapoints)."
     assert len(set(my_pie.angles)) == 1, "All angles should be the same."
+
+
+def test_pie_inner_radius():
+    pie = shapes.pie.AnglePie1D([1, 2, 1], inner_radius=4, explode=1)
+    model = pie._build_ast()
+    assert isinstance(model, ast.Union)
+    assert [type(s) for s in model.items] == [ast.Polyhedron] * 3
+    # The second slice covers the lower half and is exploded downwards
+    ys = [p[1] for p in model.items[1].points]
+    assert min(ys) == pytest.approx(-11)
+    assert max(ys) == pytest.approx(-1)
+
+
+def test_pie_inner_radius_skips_small_slices():
+    pie = shapes.pie.RadiusPie1D([10, 3, 10, 2], inner_radius=4)
+    model = pie._build_ast()
+    assert len(model.items) == 2
+
+
+def test_pie_inner_radius_explode():
+    """Exploded slices are moved as a whole, including their inner arc."""
+    pie = shapes.pie.AnglePie1D([1, 1], inner_radius=4, explode=2, outer_radius=10)
+    first = pie._build_ast().items[0]
+    xs = [p[0] for p in first.points]
+    assert min(xs) == pytest.approx(2)
+    assert max(xs) == pytest.approx(12)
+
+
+@pytest.mark.parametrize('make', [
+    lambda: shapes.pie.RadiusPie1D([1, 1, 1], inner_radius=20),
+    lambda: shapes.pie.AnglePie1D([1, 2], outer_radius=5, inner_radius=5),
+])
+def test_pie_inner_radius_too_large(make):
+    """A pie without any slice outside of the inner radius is rejected."""
+    with pytest.raises(ValueError) as e:
+        make()
+    assert 'inner_radius' in str(e.value)
+
+
+def test_pie_inner_radius_single_slice():
+    pie = shapes.pie.AnglePie1D([1], inner_radius=4)
+    assert isinstance(pie._build_ast(), ast.Polyhedron)
+
+
+def test_circle_tower_loft():
+    tower = shapes.vertical.CircleTower1D([3, 8, 5], 10, loft=True, segments=32)
+    model = tower._build_ast()
+    assert isinstance(model, ast.Polyhedron)
+    assert len(model.points) == 3 * 32
+    assert len(model.quads) * 2 + len(model.triangles) == 2 * 32 * 2 + 2 * 30
+
+
+@pytest.mark.parametrize('options', [{}, {'loft': True}, {'weld': True}])
+def test_circle_tower_zero_radius(options):
+    """Non-positive radii are rejected, with and without loft."""
+    tower = shapes.vertical.CircleTower1D([0, 3, 4], 2, **options)
+    with pytest.raises(ValueError) as e:
+        tower._build_ast()
+    assert 'Radius' in str(e.value)
+
+
+def test_max_elements_bars():
+    bars = shapes.bars.Bars1D(list(range(1, 1001)), 1, 1, max_elements=10)
+    assert len(bars.data[0]) == 10
+    assert len(bars._build_ast().item.items) == 10
+
+
+def test_max_elements_tower():
+    tower = shapes.vertical.CircleTower1D(list(range(1, 1001)), 1, max_elements=10)
+    assert len(tower.data[0]) == 10
+    assert len(tower._build_ast().items) == 9
+
+
+def test_max_elements_nd():
+    data = [list(range(1, 101)), list(range(101, 201))]
+    bars = shapes.bars.BarsND(data, 1, 1, max_elements=4, downsampling='max')
+    assert bars.data == [[25, 50, 75, 100], [125, 150, 175, 200]]
+
+
+@pytest.mark.parametrize('downsampling', ['minmax', 'lttb'])
+def test_max_elements_tower_2d(downsampling):
+    """The layers of a multi-dimensional tower stay aligned."""
+    data = [[1, 10, 2, 3, 4], [5, 6, 7, 60, 8]]
+    tower = shapes.vertical.RectangleTower2D(data, 1, max_elements=4, downsampling=downsampling)
+    layers = list(zip(*tower.data))
+    assert len(layers) == 4
+    assert set(layers) <= set(zip(*data))
+    assert (10, 6) in layers and (3, 60) in layers
+
+
+def test_shape_bounds():
+    tower = shapes.vertical.CircleTower1D([1, 2, 3], layer_height=10)
+    assert tower.bounds() == (-3, -3, 0, 3, 3, 20)
+    bars = shapes.bars.Bars1D([1, 2, 3], bar_width=2, bar_depth=1)
+    assert bars.bounds() == (-1, 0, 0, 5, 1, 3)
+
+
+def test_shape_bounds_cached():
+    """The AST is built once for repeated queries, assigning an attribute
+    rebuilds it."""
+    tower = shapes.vertical.CircleTower1D([1, 2, 3], layer_height=10)
+    builds = []
+    build_ast = tower._build_ast
+    tower._build_ast = lambda: builds.append(1) or build_ast()
+    tower.bounds()
+    tower.bounds()
+    tower.estimate_volume()
+    tower.estimate_material(1.2)
+    assert len(builds) == 1
+    tower.layer_height = 20
+    assert tower.bounds() == (-3, -3, 0, 3, 3, 40)
+    assert len(builds) == 2
+
+
+def test_shape_estimate_volume():
+    tower = shapes.vertical.CircleTower1D([1, 2, 3], layer_height=10)
+    assert tower.estimate_volume() == pytest.approx(math.pi * 10 * 26 / 3)
+    assert tower.estimate_material(2, 0.5) == pytest.approx(tower.estimate_volume() / 1000)
+
+
+@pytest.mark.parametrize('center_layers', [False, True])
+def test_bars_nd_layers(center_layers):
+    """Each layer of BarsND matches the corresponding Bars1D shape."""
+    data = [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    bars = shapes.bars.BarsND(data, 2, 3, center_layers=center_layers)
+    layers = bars._build_ast().item.items
+    for i, layer in enumerate(layers):
+        expected = shapes.bars.Bars1D(data[i], 2, 3)._build_ast()
+        if not center_layers:
+            expected = expected.item
+        assert layer == ast.Translate((i % 2) * 0.1, i * 3, 0, expected)
+
+
+def test_surface_2d():
+    surface = shapes.surface.Surface2D([[1, 2, 3], [2, 3, 4]], cell_width=2)
+    assert surface.bounds() == (-2, -0.5, 0, 2, 0.5, 4)
+    assert surface.estimate_volume() == 10
+    assert surface._build_ast().item.item == ast.Surface([[1, 2, 3], [2, 3, 4]])
+
+
+def test_surface_2d_render():
+    """The data file of a surface can't be returned by render()."""
+    surface = shapes.surface.Surface2D([[1, 2, 3], [2, 3, 4]])
+    with pytest.raises(ValueError) as e:
+        surface.render(OpenScadBackend)
+    assert 'surface-' in str(e.value)
+
+
+def test_surface_2d_save(tmpdir):
+    surface = shapes.surface.Surface2D([[1, 2, 3], [2, 3, 4]])
+    path = tmpdir.join('surface.scad')
+    surface.save(str(path), OpenScadBackend)
+    filename = path.read().split('file="')[1].split('"')[0]
+    assert tmpdir.join(filename).read() == '1 2 3\n2 3 4\n'
+
+
+@pytest.mark.parametrize('data', [
+    [[1, 2, 3]],
+    [[1], [2]],
+    [[1, 2], [3, 4, 5]],
+])
+def test_bad_surface_2d(data):
+    with pytest.raises(ValueError):
+        shapes.surface.Surface2D(data)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import pytest
+
+from tangible import ast, shapes, tiling
+from tangible.backends.openscad import OpenScadBackend
+
+
+@pytest.fixture
+def wall():
+    data = [[(x * y) % 5 + 1 for x in range(12)] for y in range(3)]
+    return shapes.bars.BarsND(data, 5, 5)
+
+
+@pytest.mark.parametrize(('size', 'expected'), [
+    (10, [[0, 1], [2, 3]]),
+    (6, [[0], [1], [2], [3]]),
+    (100, [[0, 1, 2, 3]]),
+])
+def test_partition(size, expected):
+    cubes = [ast.Translate(i * 5, 0, 0, ast.Cube(5, 1, 1)) for i in range(4)]
+    groups = tiling._partition(cubes, 0, size)
+    assert groups == [[cubes[i] for i in group] for group in expected]
+
+
+def test_split(wall):
+    tiles = tiling.split(wall, (20, 10))
+    # Every other layer of the wall is shifted by 0.1, so the 60.1 wide wall
+    # needs four columns.
+    assert [(tile.column, tile.row) for tile in tiles] == \
+        [(column, row) for column in range(4) for row in range(2)]
+    for tile in tiles:
+        box = tile.bounds()
+        assert (box.xmin, box.ymin, box.zmin) == (0, 0, 0)
+        assert box.xmax <= 20 and box.ymax <= 10
+    assert sum(len(tile.parts) for tile in tiles) == len(ast.flatten_unions(wall._build_ast()))
+    assert sum(tile.estimate_volume() for tile in tiles) == \
+        pytest.approx(wall.estimate_volume())
+
+
+def test_split_origin(wall):
+    """Tiles can be put back together at their origin."""
+    tiles = tiling.split(wall, (30, 15))
+    for tile in tiles:
+        moved = ast.Translate(*tile.origin, item=tile._build_ast())
+        assert moved.bounds() == ast.Union(tile.parts).bounds()
+
+
+def test_split_too_large(wall):
+    with pytest.raises(ValueError):
+        tiling.split(wall, (20, 4))
+
+
+def test_split_pegs(wall):
+    tiles = tiling.split(wall, (30, 10), peg_radius=0.5)
+    assert [len(tile.holes) for tile in tiles] == [2, 2, 3, 3, 2, 2]
+    for tile in tiles:
+        assert isinstance(tile._build_ast().item, ast.Difference)
+
+    # Between the rows of the first column
+    hole = tiles[0].holes[0].bounds()
+    assert tiles[1].holes[0] is tiles[0].holes[0]
+    assert (hole.xmin, hole.xmax) == pytest.approx((14.5, 15.5))
+    assert (hole.ymin, hole.ymax) == pytest.approx((1, 4))
+    assert (hole.zmin, hole.zmax) == pytest.approx((0.5, 1.5))
+
+    # Between the first two columns
+    hole = tiles[0].holes[1].bounds()
+    assert tiles[2].holes[1] is tiles[0].holes[1]
+    assert (hole.xmin, hole.xmax) == pytest.approx((25.1 - 1.5, 25.1 + 1.5))
+    assert (hole.ymin, hole.ymax) == pytest.approx((-3, -2))
+
+    assert tiling.peg(0.5, 3).bounds().xmax == pytest.approx(3)
+
+
+def test_generate(wall, tmpdir):
+    tiles = tiling.split(wall, (30, 10))
+    paths = tiling.generate(tiles, str(tmpdir), processes=2, precision=3)
+    assert paths == [str(tmpdir.join('tile-{}-{}.scad'.format(t.column, t.row)))
+                     for t in tiles]
+    for tile, path in zip(tiles, paths):
+        with open(path) as f:
+            assert f.read() == OpenScadBackend(tile._build_ast(), precision=3).generate()
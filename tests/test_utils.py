@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import, unicode_literals
 
+import math
+
 import pytest
 
 from tangible import utils, ast
@@ -189,3 +191,145 @@ def test_connect_invalid_arguments():
 ])
 def test_ensure_list_of_lists(data, result):
     assert utils._ensure_list_of_lists(data) == result
+
+
+def _rounded(points):
+    return [(round(x, 6), round(y, 6)) for x, y in points]
+
+
+@pytest.mark.parametrize(('radius', 'start', 'angle', 'segments', 'points'), [
+    (10, 0, 90, 4, [(0, 10), (10, 0)]),
+    (10, 0, 90, 8, [(0, 10), (7.071068, 7.071068), (10, 0)]),
+    (2, 90, 180, 4, [(2, 0), (0, -2), (-2, 0)]),
+    (2, 0, 10, 4, [(0, 2), (0.347296, 1.969616)]),
+])
+def test_arc_points(radius, start, angle, segments, points):
+    assert _rounded(utils.arc_points(radius, start, angle, segments)) == points
+
+
+def test_circle_sector_points():
+    points = utils.circle_sector_points(10, 90, 8)
+    assert _rounded(points) == [(0, 0), (0, 10), (7.071068, 7.071068), (10, 0)]
+    assert utils.circle_sector_points(10, 90, 8) is points, 'Result should be cached.'
+
+
+def test_circle_sector_points_full_circle():
+    points = utils.circle_sector_points(1, 360, 4)
+    assert points == ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+
+def _signed_volume(polyhedron):
+    volume = 0
+    for a, b, c in utils._quads_to_triangles(polyhedron.quads) + polyhedron.triangles:
+        (x1, y1, z1), (x2, y2, z2), (x3, y3, z3) = [polyhedron.points[i] for i in (a, b, c)]
+        volume += x1 * (y2 * z3 - y3 * z2) - y1 * (x2 * z3 - x3 * z2) + z1 * (x2 * y3 - x3 * y2)
+    return volume / 6
+
+
+@pytest.mark.parametrize('angle', [45, 180, 270, 360])
+def test_annular_sector(angle):
+    sector = utils.annular_sector(2, 5, 30, angle, 3, 3600, offset=(1, 2))
+    expected = math.pi * (5 ** 2 - 2 ** 2) * angle / 360 * 3
+    # Faces are in clockwise order, so the signed volume is negative
+    assert -_signed_volume(sector) == pytest.approx(expected, rel=1e-4)
+
+
+def test_annular_sector_closed():
+    sector = utils.annular_sector(2, 5, 0, 360, 3, 8)
+    assert len(sector.points) == 4 * 8
+    assert len(sector.quads) == 4 * 8
+
+
+@pytest.mark.parametrize(('inner', 'outer'), [(0, 5), (5, 5), (6, 5)])
+def test_annular_sector_invalid(inner, outer):
+    with pytest.raises(ValueError):
+        utils.annular_sector(inner, outer, 0, 90, 3, 8)
+
+
+def test_loft():
+    rings = [
+        [(1, 1), (1, -1), (-1, -1), (-1, 1)],
+        [(2, 2), (2, -2), (-2, -2), (-2, 2)],
+        [(1, 1), (1, -1), (-1, -1), (-1, 1)],
+    ]
+    polyhedron = utils.loft(rings, 3)
+    assert len(polyhedron.points) == 12
+    assert len(polyhedron.quads) * 2 + len(polyhedron.triangles) == 2 * 4 * 2 + 2 * 2
+    # Two frustums with a volume of h/3 * (A1 + A2 + sqrt(A1 * A2)) each
+    assert -_signed_volume(polyhedron) == pytest.approx(2 * 3 / 3 * (4 + 16 + 8))
+
+
+def test_loft_invalid_rings():
+    with pytest.raises(ValueError):
+        utils.loft([[(1, 1), (1, -1), (-1, -1)], [(1, 1), (1, -1), (-1, -1), (-1, 1)]], 3)
+
+
+def _directed_edges(polyhedron):
+    edges = []
+    for face in polyhedron.triangles + polyhedron.quads:
+        edges.extend(zip(face, face[1:] + face[:1]))
+    return edges
+
+
+class TestWeld(object):
+
+    def test_rectangles(self):
+        shapes = [ast.Rectangle(6, 6), ast.Rectangle(10, 6), ast.Rectangle(6, 22)]
+        result = utils.connect_2d_shapes(shapes, 10, 'vertical', weld=True)
+        assert isinstance(result, ast.Polyhedron)
+        assert len(result.points) == 12
+        assert len(result.quads) == 2 + 2 * 4
+        assert result.triangles == []
+        # Every edge is shared by exactly two faces with opposite orientation
+        edges = _directed_edges(result)
+        assert len(set(edges)) == len(edges)
+        assert set((b, a) for a, b in edges) == set(edges)
+        # Prismatoid volumes: h / 6 * (A1 + 4 * Amid + A2)
+        expected = 10 / 6 * (36 + 4 * 48 + 60) + 10 / 6 * (60 + 4 * 112 + 132)
+        assert -_signed_volume(result) == pytest.approx(expected)
+
+    def test_polygons(self):
+        shapes = TestPolygonConnect.shapes
+        result = utils.connect_2d_shapes(shapes, 5, 'vertical', weld=True)
+        assert len(result.points) == 15
+        assert len(result.triangles) == 2 * 3
+        assert len(result.quads) == 2 * 5
+        edges = _directed_edges(result)
+        assert len(set(edges)) == len(edges)
+        assert set((b, a) for a, b in edges) == set(edges)
+
+    def test_horizontal(self):
+        shapes = [ast.Rectangle(6, 6), ast.Rectangle(10, 6)]
+        result = utils.connect_2d_shapes(shapes, 10, 'horizontal', weld=True)
+        assert isinstance(result, ast.Rotate)
+        assert isinstance(result.item, ast.Polyhedron)
+
+    def test_circles(self):
+        with pytest.raises(ValueError):
+            utils.connect_2d_shapes([ast.Circle(5), ast.Circle(2)], 10, 'vertical', weld=True)
+
+    def test_degenerated_faces(self):
+        # The top of the pyramid is welded into a single point
+        polyhedron = ast.Polyhedron(
+            points=[[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                    [0.5, 0.5, 1], [0.5, 0.5, 1], [0.5, 0.5, 1], [0.5, 0.5, 1]],
+            quads=[[0, 1, 2, 3], [4, 7, 6, 5],
+                   [0, 4, 5, 1], [1, 5, 6, 2], [2, 6, 7, 3], [3, 7, 4, 0]])
+        result = utils.weld_polyhedra([polyhedron])
+        assert len(result.points) == 5
+        assert result.quads == [[0, 1, 2, 3]]
+        assert result.triangles == [[0, 4, 1], [1, 4, 2], [2, 4, 3], [3, 4, 0]]
+
+    @pytest.mark.parametrize(('x1', 'x2', 'merged'), [
+        (0.14, 0.16, True),
+        (0.19, 0.21, True),
+        (0.1, 0.25, False),
+    ])
+    def test_tolerance(self, x1, x2, merged):
+        """Vertices are merged if they are within the tolerance, regardless
+        of the grid cells they fall into."""
+        polyhedron = ast.Polyhedron(
+            points=[[0, 0, 0], [1, 0, 0], [0, 1, 0], [x1, 0, 1], [x2, 0, 1]],
+            triangles=[[0, 1, 2], [0, 4, 1], [1, 3, 2], [0, 2, 3]])
+        result = utils.weld_polyhedra([polyhedron], tolerance=0.1)
+        assert len(result.points) == (4 if merged else 5)